@@ -0,0 +1,98 @@
+"""
+Compares the per-page parse time of the BeautifulSoup backends, for "html.parser"
+with and without restricting the tree to the subtrees the extractors need (lxml
+always builds the full tree), and checks that every combination extracts exactly
+the same DataFrames as a full "html.parser" tree.
+
+    python benchmarks/bench_backends.py [--archive pages.zip]
+"""
+
+import argparse
+import re
+import time
+
+import pandas as pd
+from common import get_archive
+
+from scraper.parsers import lzvcup
+from scraper.parsers.lzvcup import LZVCupParser
+from scraper.utils.archive import HTMLArchive
+from scraper.utils.cache import URL_CLASSES
+
+PAGE_TYPES = {
+    "competition": ("ONLY_COMPETITION", lzvcup._parse_competition_page),
+    "team": ("ONLY_TEAM", lzvcup._parse_team_page),
+}
+
+
+def extract(parser, parse_page, html, strainer):
+    """Parses a page with or without restriction to its subtrees."""
+    strainer_default = getattr(lzvcup, strainer)
+    if not parser.subtrees:
+        setattr(lzvcup, strainer, None)
+    try:
+        return parse_page(parser, html)
+    finally:
+        setattr(lzvcup, strainer, strainer_default)
+
+
+def assert_identical(result, reference):
+    """Checks that two extractor outputs are exactly the same."""
+    for res, ref in zip(result, reference):
+        if isinstance(ref, pd.DataFrame):
+            pd.testing.assert_frame_equal(res, ref)
+        else:
+            assert res == ref
+
+
+if __name__ == "__main__":
+    argparser = argparse.ArgumentParser(description=__doc__)
+    argparser.add_argument("--archive", help="archive recorded with --record")
+    argparser.add_argument("--repeat", type=int, default=3)
+    args = argparser.parse_args()
+
+    archive = HTMLArchive(get_archive(args.archive))
+    pages = {name: [] for name in PAGE_TYPES}
+    for url in archive.index:
+        for name, pattern in URL_CLASSES.items():
+            if name in PAGE_TYPES and re.search(pattern, url):
+                pages[name].append(archive.get(url)[0].decode())
+                break
+
+    rows = []
+    for backend, subtrees in [
+        ("html.parser", False),
+        ("html.parser", True),
+        ("lxml", False),
+    ]:
+        parser = LZVCupParser(
+            {"url_base": "https://www.lzvcup.be", "parsing": {"backend": backend}}
+        )
+        parser.subtrees = subtrees
+        for name, (strainer, parse_page) in PAGE_TYPES.items():
+            reference = LZVCupParser({"url_base": "https://www.lzvcup.be"})
+            reference.subtrees = False
+            start = time.perf_counter()
+            for _ in range(args.repeat):
+                results = [
+                    extract(parser, parse_page, html, strainer) for html in pages[name]
+                ]
+            secs = (time.perf_counter() - start) / args.repeat
+            for html, result in zip(pages[name], results):
+                assert_identical(result, extract(reference, parse_page, html, strainer))
+            rows.append(
+                {
+                    "page": name,
+                    "backend": backend,
+                    "subtrees": subtrees,
+                    "pages": len(pages[name]),
+                    "ms/page": 1000 * secs / max(len(pages[name]), 1),
+                    "identical": True,
+                }
+            )
+
+    df = pd.DataFrame(rows).set_index(["page", "backend", "subtrees"]).sort_index()
+    df["speedup"] = df.groupby(level="page")["ms/page"].transform(
+        lambda x: x.loc[(x.name, "html.parser", False)] / x
+    )
+    print(df.round(2).to_string())
@@ -0,0 +1,119 @@
+"""
+Benchmarks loading the scraped tables into SQLite row-by-row through the ORM
+versus in bulk with executemany and the build pragmas, in rows per second. The
+tables of a replayed scrape are repeated 'scale' times to get realistic sizes.
+Then compares the size of the database and the cost of a join between players
+and teams before and after interning the dimensions.
+
+    python benchmarks/bench_db.py [--archive pages.zip] [--scale 20]
+"""
+
+import argparse
+import logging
+import os
+import shutil
+import tempfile
+
+import pandas as pd
+from common import AREA, DIR_ROOT, URL_AREA, get_archive, timer
+
+from scraper.db.dimensions import normalize_database
+from scraper.db.sqlitedb import BUILD_PRAGMAS, SQLiteDB
+from scraper.db.update import Tables
+from scraper.main import process_data, scrape
+from scraper.utils.archive import HTMLArchive, ReplayTransport
+from scraper.utils.base import DataStorage
+from scraper.utils.logger import Logger
+
+
+def load_tables(archive, scale):
+    """Replays a scrape of the archive and returns its processed tables."""
+    dir_tmp = tempfile.mkdtemp()
+    config = DataStorage.load_json(f"{DIR_ROOT}/scraper/config/config.json")
+    config.update(
+        {
+            "url_base": "https://www.lzvcup.be",
+            "areas": {AREA: URL_AREA},
+            "cache": {"enabled": False},
+            "incremental": {},
+            "checkpoint": {},
+        }
+    )
+    log = Logger.get_logger(
+        log_name="bench_db", log_file=f"{dir_tmp}/main.log", level=logging.WARNING
+    )
+    transport = ReplayTransport(HTMLArchive(archive))
+    dict_tables = scrape(config, log_main=log, transport=transport, dir_logs=dir_tmp)
+    dict_tables = process_data(config, dict_tables, log_main=log, geocode=False)
+    return {
+        name: pd.concat([df] * scale, ignore_index=True)
+        for name, df in dict_tables.items()
+    }
+
+
+if __name__ == "__main__":
+    argparser = argparse.ArgumentParser(description=__doc__)
+    argparser.add_argument("--archive", help="archive recorded with --record")
+    argparser.add_argument("--scale", type=int, default=20)
+    args = argparser.parse_args()
+
+    dict_tables = load_tables(get_archive(args.archive), args.scale)
+
+    secs = {}
+    for mode, pragmas in [("orm", {}), ("bulk", BUILD_PRAGMAS)]:
+        path2db = os.path.join(tempfile.mkdtemp(), f"{mode}.db")
+        db = SQLiteDB(path2db, pragmas=pragmas)
+        db.create_db()
+        for table in Tables:
+            with timer(secs, (table.name, mode)):
+                db.insert_table(
+                    dict_tables[table.name], table.value, bulk=mode == "bulk"
+                )
+        db.close()
+
+    df = pd.Series(secs).unstack()[["orm", "bulk"]]
+    df.insert(0, "rows", [len(dict_tables[name]) for name in df.index])
+    df_rates = df[["orm", "bulk"]].rdiv(df["rows"], axis=0).add_suffix(" rows/s")
+    df = pd.concat([df[["rows"]], df_rates], axis=1)
+    df["speedup"] = df["bulk rows/s"] / df["orm rows/s"]
+    df.loc["total"] = [
+        df["rows"].sum(),
+        df["rows"].sum() / sum(v for k, v in secs.items() if k[1] == "orm"),
+        df["rows"].sum() / sum(v for k, v in secs.items() if k[1] == "bulk"),
+        sum(v for k, v in secs.items() if k[1] == "orm")
+        / sum(v for k, v in secs.items() if k[1] == "bulk"),
+    ]
+    print(df.round(1).to_string())
+
+    # the last database is the bulk one, with plain text columns
+    db = SQLiteDB(path2db)
+    db.create_indexes()
+    db.close()
+    path2normalized = os.path.join(tempfile.mkdtemp(), "normalized.db")
+    shutil.copyfile(path2db, path2normalized)
+    normalize_database(path2normalized)
+
+    joins = {
+        "text": (
+            path2db,
+            "SELECT count(*) FROM stats_players s JOIN teams t ON s.team = t.team",
+        ),
+        "integer": (
+            path2normalized,
+            (
+                "SELECT count(*) FROM fact_stats_players s "
+                "JOIN fact_teams t ON s.team_id = t.team_id"
+            ),
+        ),
+    }
+    rows = {}
+    for keys, (path, query) in joins.items():
+        db = SQLiteDB(path)
+        with timer(secs, ("join", keys)):
+            db.query(query)
+        db.close()
+        rows[keys] = {
+            "size (MB)": os.path.getsize(path) / 1e6,
+            "join (ms)": secs[("join", keys)] * 1000,
+        }
+    print(pd.DataFrame(rows).T.round(2).to_string())
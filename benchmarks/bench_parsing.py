@@ -0,0 +1,78 @@
+"""
+Benchmarks the parsing of competition, team and player pages with a growing number
+of worker processes. All pages are replayed from an archive, so no time is spent
+waiting on the network.
+
+    python benchmarks/bench_parsing.py [--archive pages.zip] [--workers 1 2 4]
+"""
+
+import argparse
+import os
+from contextlib import nullcontext
+
+import pandas as pd
+from common import AREA, SILENT, URL_AREA, get_archive, timer
+
+from scraper.parsers.lzvcup import LZVCupParser, make_parsing_pool
+from scraper.utils.archive import HTMLArchive, ReplayTransport
+
+
+def run(archive, area, url_area, parsing):
+    """Parses all pages of an area and returns the seconds spent per step."""
+    transport = ReplayTransport(HTMLArchive(archive))
+    config = {
+        "url_base": "https://www.lzvcup.be",
+        "area": area,
+        "url_area": url_area,
+        "parsing": parsing,
+    }
+
+    secs = {}
+    with make_parsing_pool(config) or nullcontext() as pool:
+        parser = LZVCupParser(
+            config, logger=SILENT, transport=transport, parsing_pool=pool
+        )
+        _, df_competitions_urls = parser.parse_region_cards()
+        with timer(secs, "competitions_and_teams"):
+            dfs = parser.parse_competitions_and_teams(df_competitions_urls)
+        with timer(secs, "player_history"):
+            LZVCupParser.parse_player_stats_history(
+                dfs[3], transport=transport, logger=SILENT, parsing=parsing, pool=pool
+            )
+    secs["pages"] = transport.stats.report()["requests"].sum()
+
+    return secs
+
+
+if __name__ == "__main__":
+    argparser = argparse.ArgumentParser(description=__doc__)
+    argparser.add_argument("--archive", help="archive recorded with --record")
+    argparser.add_argument("--area", default=AREA)
+    argparser.add_argument("--url-area", default=URL_AREA)
+    argparser.add_argument("--backend", default="lxml")
+    argparser.add_argument("--chunksize", type=int, default=8)
+    argparser.add_argument(
+        "--workers", type=int, nargs="+", default=[1, 2, 4, os.cpu_count()]
+    )
+    args = argparser.parse_args()
+
+    archive = get_archive(args.archive)
+
+    rows = []
+    for workers in sorted(set(args.workers)):
+        parsing = {
+            "backend": args.backend,
+            "workers": workers,
+            "chunksize": args.chunksize,
+        }
+        secs = run(archive, args.area, args.url_area, parsing)
+        secs["workers"] = workers
+        rows.append(secs)
+
+    df = pd.DataFrame(rows).set_index("workers")
+    df["total"] = df["competitions_and_teams"] + df["player_history"]
+    df["pages/s"] = df["pages"] / df["total"]
+    df["speedup"] = df["total"].iloc[0] / df["total"]
+    df["speedup/core"] = df["speedup"] / df.index
+    print(f"cpu count: {os.cpu_count()}")
+    print(df.round(2).to_string())
@@ -0,0 +1,83 @@
+"""
+Benchmarks the per-call latency of the team-scoped queries of the Coachbot page,
+with the team pasted into the SQL text (a new statement for every team) versus
+bound as a parameter (one statement, reused from the statement cache). The
+queries are read from webapp/queries.py and run for every team of a database
+built from a replayed scrape. With '--repeat', the teams are queried again, and
+then the pasted statements are reused too if there are few enough teams.
+
+    python benchmarks/bench_queries.py [--archive pages.zip] [--scale 20] [--repeat 1]
+"""
+
+import argparse
+import ast
+import logging
+import os
+import sys
+import tempfile
+
+import pandas as pd
+from bench_db import load_tables
+from common import DIR_ROOT, get_archive, timer
+
+from scraper.db.update import refresh_database
+from scraper.utils.logger import Logger
+
+sys.path.append(f"{DIR_ROOT}/webapp")
+from connection import SQLiteConnection
+
+QUERIES = ["query_schedule", "query_stats_players", "query_standings"]
+
+
+def read_queries(path=f"{DIR_ROOT}/webapp/queries.py"):
+    """Reads the SQL assigned to 'q' in each of the QUERIES functions."""
+    with open(path, encoding="utf-8") as f:
+        tree = ast.parse(f.read())
+    return {
+        node.name: statement.value.value
+        for node in tree.body
+        if isinstance(node, ast.FunctionDef) and node.name in QUERIES
+        for statement in node.body
+        if isinstance(statement, ast.Assign) and statement.targets[0].id == "q"
+    }
+
+
+if __name__ == "__main__":
+    argparser = argparse.ArgumentParser(description=__doc__)
+    argparser.add_argument("--archive", help="archive recorded with --record")
+    argparser.add_argument("--scale", type=int, default=20)
+    argparser.add_argument("--repeat", type=int, default=1)
+    args = argparser.parse_args()
+
+    dict_tables = load_tables(get_archive(args.archive), args.scale)
+    dir_tmp = tempfile.mkdtemp()
+    path2db = os.path.join(dir_tmp, "futsalfriend.db")
+    log = Logger.get_logger(
+        log_name="bench_queries", log_file=f"{dir_tmp}/main.log", level=logging.WARNING
+    )
+    refresh_database(dict_tables, path2db, logger=log)
+
+    teams = dict_tables["teams"]["team"].astype(str).unique().tolist()
+    secs = {}
+    for name, sql in read_queries().items():
+        for mode in ["literal", "bound"]:
+            connection = SQLiteConnection(path2db)
+            with timer(secs, (name, mode)):
+                for _ in range(args.repeat):
+                    for team in teams:
+                        if mode == "literal":
+                            literal = "'" + team.replace("'", "''") + "'"
+                            connection.query(sql.replace(":team", literal))
+                        else:
+                            connection.query(sql, {"team": team})
+            connection.reset()
+
+    df = (
+        pd.Series(secs).unstack()[["literal", "bound"]]
+        / (len(teams) * args.repeat)
+        * 1e6
+    )
+    df = df.add_suffix(" (us/call)")
+    df["speedup"] = df.iloc[:, 0] / df.iloc[:, 1]
+    print(f"{len(teams)} teams")
+    print(df.round(1).to_string())
@@ -0,0 +1,68 @@
+"""
+Benchmarks the radius query behind utils.filter_teams(), i.e. a geopy distance per
+team and sportshall row through DataFrame.apply() versus a query of the spatial
+index over the sportshalls, in milliseconds. The sportshalls are random points in
+Belgium, 'halls' of them times 'scale', with three teams each.
+
+    python benchmarks/bench_spatial.py [--halls 300] [--scale 10] [--km 10]
+"""
+
+import argparse
+
+import numpy as np
+import pandas as pd
+from common import timer
+from geopy.distance import distance
+
+from webapp.spatial import SpatialIndex
+
+TARGET = (50.85, 4.35)  # Brussels
+
+
+def make_teams(n_halls, seed=0):
+    """Returns random teams with the coordinates of their sportshall."""
+    rng = np.random.default_rng(seed)
+    df_halls = pd.DataFrame(
+        {
+            "sportshall": [f"hall {i}" for i in range(n_halls)],
+            "latitude": rng.uniform(49.5, 51.5, n_halls),
+            "longitude": rng.uniform(2.5, 6.4, n_halls),
+        }
+    )
+    return df_halls.loc[df_halls.index.repeat(3)].assign(
+        team=[f"team {i}" for i in range(3 * n_halls)]
+    )
+
+
+if __name__ == "__main__":
+    argparser = argparse.ArgumentParser(description=__doc__)
+    argparser.add_argument("--halls", type=int, default=300)
+    argparser.add_argument("--scale", type=int, default=10)
+    argparser.add_argument("--km", type=float, default=10.0)
+    args = argparser.parse_args()
+
+    rows = {}
+    for scale in [1, args.scale]:
+        df = make_teams(args.halls * scale)
+        secs = {}
+
+        with timer(secs, "apply"):
+            km = df.apply(
+                lambda x: distance((x["latitude"], x["longitude"]), TARGET).km, axis=1
+            )
+            n_apply = (km <= args.km).sum()
+
+        with timer(secs, "build"):
+            index = SpatialIndex(df)
+        with timer(secs, "query"):
+            df_near = index.query(*TARGET, args.km)
+            n_index = len(df.merge(df_near, on=["latitude", "longitude"]))
+
+        rows[f"{len(index)} halls"] = {
+            "apply (ms)": secs["apply"] * 1000,
+            "index build (ms)": secs["build"] * 1000,
+            "index query (ms)": secs["query"] * 1000,
+            "teams (apply)": n_apply,
+            "teams (index)": n_index,
+        }
+    print(pd.DataFrame(rows).T.round(2).to_string())
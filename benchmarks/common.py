@@ -0,0 +1,54 @@
+import os
+import sys
+import tempfile
+import time
+from contextlib import contextmanager
+
+import structlog
+
+DIR_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(DIR_ROOT)  # so the benchmarks can be run as scripts
+
+from scraper.parsers.lzvcup import LZVCupParser
+from scraper.utils.archive import HTMLArchive, RecordingTransport
+from scraper.utils.transport import RequestsTransport
+
+AREA, URL_AREA = "VLAAMS BRABANT", "results/5"  # area of the synthetic website
+SILENT = structlog.wrap_logger(structlog.ReturnLogger())
+
+
+def get_archive(path=None):
+    """
+    Returns the path to a page archive recorded with 'main.py --record'. If no path
+    is given, the synthetic website from the tests is recorded into a temporary one.
+    """
+    if path is not None:
+        return path
+
+    from tests.conftest import serve_site
+
+    path = os.path.join(tempfile.mkdtemp(), "synthetic.zip")
+    with serve_site() as server:
+        transport = RecordingTransport(RequestsTransport(), HTMLArchive(path, "w"))
+        parser = LZVCupParser(
+            {"url_base": server.url_base, "area": AREA, "url_area": URL_AREA},
+            logger=SILENT,
+            transport=transport,
+        )
+        df_sportshalls_urls, df_competitions_urls = parser.parse_region_cards()
+        dfs = parser.parse_competitions_and_teams(df_competitions_urls)
+        parser.parse_sportshalls(df_sportshalls_urls)
+        LZVCupParser.parse_player_stats_history(
+            dfs[3], transport=transport, logger=SILENT
+        )
+        transport.close()
+
+    return path
+
+
+@contextmanager
+def timer(results, key):
+    """Adds the seconds spent in the with-block to results[key]."""
+    start = time.perf_counter()
+    yield
+    results[key] = results.get(key, 0) + time.perf_counter() - start
@@ -0,0 +1,121 @@
+import os
+import sqlite3
+
+from sqlalchemy.dialects import sqlite
+
+from scraper.db.sqlitedb import BUILD_PRAGMAS
+from scraper.db.tables import DIMENSIONS, FACT_TABLES, Base
+
+# the dimension each interned column refers to
+DIMENSION_OF = {col: dim for dim, cols in DIMENSIONS.items() for col in cols}
+
+
+def normalize_database(path2db, path2previous=None):
+    """
+    Interns the repeated text columns (see DIMENSIONS) of the complete database
+    at path2db into dimension tables dim_<key>(id, name). Every table <name> of
+    FACT_TABLES is replaced by a table fact_<name> with an integer <column>_id
+    instead of each interned column, plus a view <name> that joins the names back,
+    such that readers see the exact same columns as before. The ids of the database at
+    path2previous are reused, so a name keeps its id across versions.
+    """
+    connection = sqlite3.connect(path2db)
+    for key, value in BUILD_PRAGMAS.items():
+        connection.execute(f"PRAGMA {key} = {value}")
+
+    previous = set()
+    if path2previous is not None and os.path.exists(path2previous):
+        connection.execute("ATTACH DATABASE ? AS previous", (path2previous,))
+        previous = {
+            row[0]
+            for row in connection.execute(
+                "SELECT name FROM previous.sqlite_master WHERE type = 'table'"
+            )
+        }
+
+    tables = [t for t in Base.metadata.sorted_tables if t.name in FACT_TABLES]
+    with connection:
+        for dim, cols in DIMENSIONS.items():
+            connection.execute(
+                f"CREATE TABLE dim_{dim} (id INTEGER PRIMARY KEY, name TEXT UNIQUE)"
+            )
+            if f"dim_{dim}" in previous:
+                connection.execute(
+                    f"INSERT INTO dim_{dim} SELECT id, name FROM previous.dim_{dim}"
+                )
+            for table in tables:
+                for col in [c.name for c in table.columns if c.name in cols]:
+                    connection.execute(
+                        f"INSERT OR IGNORE INTO dim_{dim} (name) "
+                        f"SELECT {col} FROM {table.name} WHERE {col} IS NOT NULL "
+                        "ORDER BY id"
+                    )
+
+        for table in tables:
+            _create_fact_table(connection, table)
+
+        # drop the names that are no longer used, e.g. of teams that quit
+        for dim, cols in DIMENSIONS.items():
+            used = [
+                f"SELECT {col.name}_id FROM fact_{table.name}"
+                for table in tables
+                for col in table.columns
+                if col.name in cols
+            ]
+            connection.execute(
+                f"DELETE FROM dim_{dim} WHERE id NOT IN ({' UNION '.join(used)})"
+            )
+
+    if path2previous is not None and os.path.exists(path2previous):
+        connection.execute("DETACH DATABASE previous")
+    connection.execute("ANALYZE main")
+
+    # give back the space of the dropped tables
+    connection.execute("VACUUM")
+    connection.close()
+
+
+def _create_fact_table(connection, table):
+    name = table.name
+
+    defs, cols_fact, cols_raw, cols_view, joins = [], [], [], [], []
+    for i, column in enumerate(table.columns):
+        dim = DIMENSION_OF.get(column.name)
+        if column.name == "id":
+            defs.append("id INTEGER PRIMARY KEY")
+            cols_fact.append("id")
+            cols_raw.append("r.id")
+            cols_view.append("f.id")
+        elif dim is None:
+            defs.append(f"{column.name} {column.type.compile(sqlite.dialect())}")
+            cols_fact.append(column.name)
+            cols_raw.append(f"r.{column.name}")
+            cols_view.append(f"f.{column.name}")
+        else:
+            defs.append(f"{column.name}_id INTEGER REFERENCES dim_{dim}(id)")
+            cols_fact.append(f"{column.name}_id")
+            cols_raw.append(f"d{i}.id")
+            cols_view.append(f"d{i}.name AS {column.name}")
+            joins.append((f"dim_{dim} d{i}", column.name, i))
+
+    connection.execute(f"CREATE TABLE fact_{name} ({', '.join(defs)})")
+    connection.execute(
+        f"INSERT INTO fact_{name} ({', '.join(cols_fact)}) "
+        f"SELECT {', '.join(cols_raw)} FROM {name} r "
+        + " ".join(f"LEFT JOIN {d} ON d{i}.name = r.{col}" for d, col, i in joins)
+        + " ORDER BY r.id"
+    )
+    connection.execute(f"DROP TABLE {name}")
+    connection.execute(
+        f"CREATE VIEW {name} AS SELECT {', '.join(cols_view)} FROM fact_{name} f "
+        + " ".join(f"LEFT JOIN {d} ON d{i}.id = f.{col}_id" for d, col, i in joins)
+    )
+
+    # the indexes of the table now cover the ids of the interned columns
+    for index in table.indexes:
+        cols = [
+            f"{c.name}_id" if c.name in DIMENSION_OF else c.name for c in index.columns
+        ]
+        connection.execute(
+            f"CREATE INDEX {index.name} ON fact_{name} ({', '.join(cols)})"
+        )
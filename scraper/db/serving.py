@@ -0,0 +1,106 @@
+import sqlite3
+
+from scraper.db.sqlitedb import BUILD_PRAGMAS
+
+# denormalized tables that the webapp reads as a whole, so that the joins and
+# aggregates over the raw tables run once per refresh instead of per page load
+SERVING_TABLES = {
+    # every team with the sportshall(s) it plays in and its number of players
+    "team_directory": """
+        SELECT
+            t.area,
+            t.region,
+            t.competition,
+            t.team,
+            t.url AS url_team,
+            s.sportshall,
+            s.address,
+            s.phone,
+            s.email,
+            s.url_sportshall,
+            s.latitude,
+            s.longitude,
+            p.players,
+            p.players_active
+        FROM teams t
+        INNER JOIN locations l ON t.team = l.team
+        INNER JOIN (
+            SELECT DISTINCT sportshall, address, phone, email, url_sportshall,
+                            latitude, longitude
+            FROM sportshalls
+        ) s ON l.sportshall = s.sportshall
+        LEFT JOIN (
+            SELECT team, count(name) AS players, sum(wedstrijden > 0) AS players_active
+            FROM stats_players
+            GROUP BY team
+        ) p ON t.team = p.team
+        ORDER BY t.team
+    """,
+    # the all-time statistics of every player of a current team
+    "player_aggregates": """
+        SELECT DISTINCT
+            c.name,
+            c.team,
+            sum(h.wedstrijden) AS games,
+            sum(h.goals) AS goals,
+            sum(h.assists) AS assists,
+            (sum(h.goals * 1.0) + sum(h.assists)) / sum(h.wedstrijden) AS ga_per_game
+        FROM (SELECT DISTINCT name, team FROM stats_players) c
+        JOIN stats_players_historical h ON c.name = h.name AND c.team = h.team
+        GROUP BY c.name, c.team
+    """,
+    # the area, region, competition and team of every player to filter on
+    "player_facets": """
+        SELECT DISTINCT
+            t.area,
+            t.region,
+            t.competition,
+            c.team,
+            c.name
+        FROM (SELECT DISTINCT name, team FROM stats_players) c
+        JOIN teams t ON c.team = t.team
+        ORDER BY t.area, t.region, t.competition, c.team
+    """,
+    # the games still to be played by every team, home and away, in order of date
+    "fixture_calendar": """
+        SELECT team, date, opponent, home
+        FROM (
+            SELECT team1 AS team, date, team2 AS opponent, 1 AS home
+            FROM schedules
+            WHERE goals1 IS NULL
+            UNION ALL
+            SELECT team2 AS team, date, team1 AS opponent, 0 AS home
+            FROM schedules
+            WHERE goals1 IS NULL
+        )
+        ORDER BY team, date, home DESC, opponent
+    """,
+}
+
+SERVING_INDEXES = {
+    "team_directory": ["team"],
+    "player_aggregates": ["name", "team"],
+    "player_facets": ["team", "name"],
+    "fixture_calendar": ["team", "date"],
+}
+
+
+def create_serving_tables(path2db):
+    """
+    (Re)creates the serving tables in the database at path2db from its raw
+    tables, which must be complete and indexed.
+    """
+    connection = sqlite3.connect(path2db)
+    for key, value in BUILD_PRAGMAS.items():
+        connection.execute(f"PRAGMA {key} = {value}")
+
+    with connection:
+        for name, query in SERVING_TABLES.items():
+            connection.execute(f"DROP TABLE IF EXISTS {name}")
+            connection.execute(f"CREATE TABLE {name} AS {query}")
+            connection.execute(
+                f"CREATE INDEX ix_{name} ON {name} ({', '.join(SERVING_INDEXES[name])})"
+            )
+            connection.execute(f"ANALYZE {name}")
+
+    connection.close()
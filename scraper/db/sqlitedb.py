@@ -2,20 +2,47 @@ import typing as tp
 from contextlib import contextmanager
 
 import pandas as pd
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event, insert
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.schema import CreateTable
 
 from scraper.db.tables import Base
 
+# trade durability for speed while building a database from scratch, which is
+# safe as long as a failed build is thrown away as a whole
+BUILD_PRAGMAS = {
+    "journal_mode": "OFF",
+    "synchronous": "OFF",
+    "cache_size": -256_000,  # in KiB
+    "temp_store": "MEMORY",
+}
+
 
 class SQLiteDB:
-    def __init__(self, path2db: str, table_classes: tp.Type[Base] = Base):
-        """Sets up a connection to a SQLite database."""
+    def __init__(
+        self,
+        path2db: str,
+        table_classes: type[Base] = Base,
+        pragmas: tp.Optional[dict[str, tp.Any]] = None,
+    ):
+        """
+        Sets up a connection to a SQLite database. The 'pragmas' are set on every
+        new connection, e.g. BUILD_PRAGMAS when building a database from scratch.
+        """
         self.path2db = path2db
         self.table_classes = table_classes
         self.engine = create_engine(f"sqlite:///{self.path2db}")
         self.session = sessionmaker(bind=self.engine)()
 
+        if pragmas:
+
+            @event.listens_for(self.engine, "connect")
+            def set_pragmas(connection, _):
+                cursor = connection.cursor()
+                for key, value in pragmas.items():
+                    cursor.execute(f"PRAGMA {key} = {value}")
+                cursor.close()
+
     @contextmanager
     def session_scope(self):
         """Provides a transactional scope around a series of operations."""
@@ -36,25 +63,78 @@ class SQLiteDB:
             yield cursor
             connection.commit()
         except Exception:
+            connection.rollback()
             raise
+        finally:
+            cursor.close()
+            connection.close()
+
+    def create_db(self, indexes: bool = True):
+        """
+        Creates the database and tables based on self.table_classes. Without
+        'indexes', the secondary indexes are left out so they can be created in
+        one go after loading the data with create_indexes(), which is faster than
+        maintaining them row by row.
+        """
+        if indexes is True:
+            self.table_classes.metadata.create_all(self.engine, checkfirst=True)
+            return
+
+        with self.engine.begin() as connection:
+            for table in self.get_table_classes():
+                connection.execute(CreateTable(table, if_not_exists=True))
 
-    def create_db(self):
-        """Creates the database and tables based on self.table_classes."""
-        self.table_classes.metadata.create_all(self.engine, checkfirst=True)
+    def create_indexes(self):
+        """Creates the indexes of all tables and updates the query planner stats."""
+        with self.engine.begin() as connection:
+            for table in self.get_table_classes():
+                for index in table.indexes:
+                    index.create(connection, checkfirst=True)
+            connection.exec_driver_sql("ANALYZE")
 
     def drop_tables(self):
         """Drops all tables in the database based on self.table_classes."""
         self.table_classes.metadata.drop_all(self.engine)
 
-    def insert_table(self, df: pd.DataFrame, table_class: tp.Type[Base]):
-        """Inserts a table from a pandas DataFrame row-by-row into the database."""
+    def insert_table(
+        self,
+        df: pd.DataFrame,
+        table_class: type[Base],
+        bulk: bool = False,
+        chunksize: int = 50_000,
+    ):
+        """
+        Inserts a table from a pandas DataFrame into the database, row-by-row
+        through the ORM or, if 'bulk', with executemany in chunks of 'chunksize'
+        rows inside a single transaction. Both store the exact same values.
+        """
+        if bulk is True:
+            return self.bulk_insert_table(df, table_class, chunksize=chunksize)
+
         rows = [row.to_dict() for _, row in df.iterrows()]
         with self.session_scope() as session:
             for row in rows:
                 db_row = table_class(**row)
                 session.add(db_row)
 
-    def get_table(self, table_class: tp.Type[Base]):
+    def bulk_insert_table(
+        self, df: pd.DataFrame, table_class: type[Base], chunksize: int = 50_000
+    ):
+        """Inserts a table from a pandas DataFrame in chunks using a Core insert."""
+        unknown = set(df.columns) - set(table_class.__table__.columns.keys())
+        if len(unknown) > 0:
+            raise TypeError(f"Unknown columns for {table_class.__name__}: {unknown}")
+
+        # missing values become NULL, as with the ORM
+        df = df.astype(object).where(df.notna(), None)
+
+        statement = insert(table_class.__table__)
+        with self.engine.begin() as connection:
+            for start in range(0, len(df), chunksize):
+                rows = df.iloc[start : start + chunksize].to_dict("records")
+                connection.execute(statement, rows)
+
+    def get_table(self, table_class: type[Base]):
         """Gets a raw table from the database."""
         with self.session_scope() as session:
             return session.query(table_class).all()
@@ -0,0 +1,90 @@
+import sqlite3
+import threading
+import typing as tp
+
+import pandas as pd
+from sqlalchemy import Date
+
+from scraper.db.tables import Base
+
+
+class StagingDB:
+    def __init__(self, path2db: str):
+        """
+        Sets up an append-only SQLite database that collects the scraped tables
+        while they are being parsed, such that they never have to be held in
+        memory all at once. Every staged row keeps the unit (e.g. the index of its
+        area) it came from, so the rows can be read back in a deterministic order
+        when several units are staged concurrently.
+        """
+        self.path2db = path2db
+        self.connection = sqlite3.connect(path2db, timeout=60, check_same_thread=False)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self._lock = threading.Lock()
+
+    def append(self, name: str, df: pd.DataFrame, unit: int = 0):
+        """Appends the rows of a DataFrame to a staged table (None is skipped)."""
+        if df is None or len(df) == 0:
+            return
+        df = df.assign(_unit=unit)
+        with self._lock, self.connection:
+            df.to_sql(name, self.connection, if_exists="append", index=False)
+
+    def read(self, name: str, columns: tp.Optional[list[str]] = None):
+        """Reads a staged table in order as a DataFrame, optionally some columns."""
+        cols = ", ".join(f'"{c}"' for c in columns) if columns else "*"
+        with self._lock:
+            df = pd.read_sql(
+                f"SELECT {cols} FROM {name} ORDER BY _unit, rowid", self.connection
+            )
+        return df.drop(columns="_unit", errors="ignore")
+
+    def has_table(self, name: str):
+        """Checks whether any rows were staged for a table."""
+        with self._lock:
+            row = self.connection.execute(
+                "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?",
+                (name,),
+            ).fetchone()
+        return row is not None
+
+    def insert_distinct(self, path2db: str, table_class: type[Base]):
+        """
+        Inserts the distinct rows of a staged table into the same table of the
+        database at path2db, in order of their first occurrence. Only the columns
+        of table_class are kept (matched case-insensitively) and dates are cast
+        to the SQLite date format, which makes it the SQL equivalent of running
+        postproces_df() and SQLiteDB.insert_table() on the whole table.
+        """
+        name = table_class.__tablename__
+        staged = {
+            row[1].lower(): row[1]
+            for row in self.connection.execute(f"PRAGMA table_info({name})")
+        }
+
+        cols, exprs = [], []
+        for column in table_class.__table__.columns:
+            if column.name == "id" or column.name not in staged:
+                continue
+            expr = f'"{staged[column.name]}"'
+            if isinstance(column.type, Date):
+                expr = f"date({expr})"
+            cols.append(column.name)
+            exprs.append(expr)
+
+        with self._lock:
+            self.connection.execute("ATTACH DATABASE ? AS target", (path2db,))
+            try:
+                with self.connection:
+                    self.connection.execute(
+                        f"INSERT INTO target.{name} ({', '.join(cols)}) "
+                        f"SELECT {', '.join(exprs)} FROM {name} "
+                        f"GROUP BY {', '.join(exprs)} "
+                        "ORDER BY min(_unit), min(rowid)"
+                    )
+            finally:
+                self.connection.execute("DETACH DATABASE target")
+
+    def close(self):
+        """Shuts down database connection."""
+        self.connection.close()
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Date, Float, Integer, String
+from sqlalchemy import Column, Date, Float, Index, Integer, String
 from sqlalchemy.orm import DeclarativeBase
 
 
@@ -7,9 +7,14 @@ class Base(DeclarativeBase):
     # reference; the goal is not to set up a fully relational database
     id = Column(Integer, primary_key=True, autoincrement=True)
 
+    # the columns that identify a row across refreshes, see upsert_database();
+    # they are not enforced to be unique because of duplicates in the source data
+    natural_key = ()
+
 
 class Competitions(Base):
     __tablename__ = "competitions"
+    natural_key = ("region", "competition")
 
     area = Column(String)
     region = Column(String)
@@ -19,6 +24,9 @@ class Competitions(Base):
 
 class Locations(Base):
     __tablename__ = "locations"
+    natural_key = ("team", "sportshall")
+
+    __table_args__ = (Index("ix_locations_team", "team", "sportshall"),)
 
     # note: some teams play in multiple sportshalls
 
@@ -28,6 +36,7 @@ class Locations(Base):
 
 class Palmares(Base):
     __tablename__ = "palmares"
+    natural_key = ("team", "seizoen", "reeks")
 
     team = Column(String)
     seizoen = Column(String)
@@ -37,6 +46,13 @@ class Palmares(Base):
 
 class Schedules(Base):
     __tablename__ = "schedules"
+    natural_key = ("date", "team1", "team2")
+
+    __table_args__ = (
+        Index("ix_schedules_open_date", "goals1", "date"),
+        Index("ix_schedules_team1", "team1", "goals1", "date"),
+        Index("ix_schedules_team2", "team2", "goals1", "date"),
+    )
 
     area = Column(String)
     region = Column(String)
@@ -53,6 +69,9 @@ class Schedules(Base):
 
 class Sportshalls(Base):
     __tablename__ = "sportshalls"
+    natural_key = ("region", "sportshall")
+
+    __table_args__ = (Index("ix_sportshalls_sportshall", "sportshall"),)
 
     # note: some sportshalls are used in several regions
 
@@ -70,6 +89,9 @@ class Sportshalls(Base):
 
 class Standings(Base):
     __tablename__ = "standings"
+    natural_key = ("region", "competition", "team")
+
+    __table_args__ = (Index("ix_standings_competition", "region", "competition"),)
 
     area = Column(String)
     region = Column(String)
@@ -89,6 +111,13 @@ class Standings(Base):
 
 class StatsPlayers(Base):
     __tablename__ = "stats_players"
+    natural_key = ("name", "team")
+
+    __table_args__ = (
+        Index(
+            "ix_stats_players_team", "team", "name", "wedstrijden", "goals", "assists"
+        ),
+    )
 
     # note: data source issue > some URLs refer to the same player
 
@@ -104,6 +133,9 @@ class StatsPlayers(Base):
 
 class StatsPlayersHistorical(Base):
     __tablename__ = "stats_players_historical"
+    natural_key = ("name", "team", "seizoen")
+
+    __table_args__ = (Index("ix_stats_players_historical_player", "name", "team"),)
 
     name = Column(String)
     team = Column(String)
@@ -117,6 +149,9 @@ class StatsPlayersHistorical(Base):
 
 class Teams(Base):
     __tablename__ = "teams"
+    natural_key = ("region", "competition", "team")
+
+    __table_args__ = (Index("ix_teams_team", "team", "region", "competition", "area"),)
 
     # note: data source issue > some teams are duplicated across multiple
     # competitions and some competitions appear duplicated across regions,
@@ -131,7 +166,33 @@ class Teams(Base):
 
 class Levels(Base):
     __tablename__ = "levels"
+    natural_key = ("team",)
+
+    __table_args__ = (Index("ix_levels_level", "level", "team"),)
 
     team = Column(String)
     level = Column(Integer)
     level_name = Column(String)
+
+
+# the text columns that are interned into a dimension table per key, such that
+# the published database stores integer ids instead in the tables that repeat
+# them most, see scraper.db.dimensions; the small competitions and sportshalls
+# tables are lookup tables themselves and are kept as they are
+FACT_TABLES = [
+    "locations",
+    "palmares",
+    "schedules",
+    "standings",
+    "stats_players",
+    "stats_players_historical",
+    "teams",
+    "levels",
+]
+DIMENSIONS = {
+    "area": ["area"],
+    "region": ["region"],
+    "competition": ["competition"],
+    "team": ["team", "team1", "team2"],
+    "sportshall": ["sportshall"],
+}
@@ -1,9 +1,13 @@
 import os
+import sqlite3
+from contextlib import contextmanager
 from enum import Enum
 
 import structlog
 
-from scraper.db.sqlitedb import SQLiteDB
+from scraper.db.dimensions import normalize_database
+from scraper.db.serving import create_serving_tables
+from scraper.db.sqlitedb import BUILD_PRAGMAS, SQLiteDB
 from scraper.db.tables import (
     Competitions,
     Levels,
@@ -16,6 +20,7 @@ from scraper.db.tables import (
     StatsPlayersHistorical,
     Teams,
 )
+from scraper.db.versions import DatabaseVersions
 
 
 class Tables(Enum):
@@ -31,34 +36,205 @@ class Tables(Enum):
     levels = Levels
 
 
-def refresh_database(dict_tables, path2db, logger=structlog.get_logger()):
-    """Rebuild database with new data."""
-    # remove the database file
-    if os.path.exists(path2db):
-        os.remove(path2db)
+def refresh_database(
+    dict_tables, path2db, logger=structlog.get_logger(), versions=None, mode="rebuild"
+):
+    """
+    Rebuild database with new data. The new database is built next to the current
+    one and only swapped in once complete, see DatabaseVersions and, for the
+    'mode', publish_database().
+    """
+    if versions is None:
+        versions = DatabaseVersions(path2db)
 
-    # connect to database
-    db = SQLiteDB(path2db)
+    with build_database(versions) as db:
+        # insert data into all tables
+        for table in db.get_table_classes():
+            name = table.name
+            logger.info(f"Inserting table into db: {table.name}")
+
+            # get DataFrame
+            df = dict_tables[name]
+
+            # get table class that defines schema
+            table_class = getattr(Tables, name).value
+
+            # insert table into database
+            db.insert_table(df, table_class, bulk=True)
+
+    return publish_database(versions, mode=mode, logger=logger)
+
+
+@contextmanager
+def build_database(versions):
+    """
+    Provides a fresh database at versions.path_build with the empty tables of
+    Tables, tuned for a one-off build. The tables are indexed for the queries of
+    the webapp once the block completes, after which the build can be published
+    with publish_database().
+    """
+    # connect to a fresh build file, tuned for a one-off build
+    db = SQLiteDB(versions.prepare(), pragmas=BUILD_PRAGMAS)
 
     # # remove all rows from table
     # db.drop_tables()
 
-    # create empty tables with proper schema
-    db.create_db()
+    try:
+        # create empty tables with proper schema, indexed after the inserts
+        db.create_db(indexes=False)
+        yield db
+
+        # index all tables for the queries of the webapp
+        db.create_indexes()
+    finally:
+        db.close()
 
-    # insert data into all tables
-    for table in db.get_table_classes():
-        name = table.name
-        logger.info(f"Inserting table into db: {table.name}")
 
-        # get DataFrame
-        df = dict_tables[name]
+def publish_database(versions, mode="rebuild", logger=None):
+    """
+    Swaps the database built at versions.path_build in for the current one, after
+    adding the serving tables for the webapp (see scraper.db.serving) and
+    interning its dimensions (see scraper.db.dimensions). In 'upsert' mode, only
+    the rows that changed with respect to the current database are applied to a
+    copy of it, such that unchanged rows keep their id, and the result is
+    published instead. That copy is still a whole new database, on which the
+    serving tables are rebuilt and which is vacuumed, just like a rebuild.
+    """
+    logger = logger or structlog.get_logger()
 
-        # get table class that defines schema
-        table_class = getattr(Tables, name).value
+    if mode == "upsert" and os.path.exists(versions.path2db):
+        path2new = f"{versions.path_build}.new"
+        os.replace(versions.path_build, path2new)
+        copy_tables(versions.path2db, versions.prepare())
+        upsert_database(path2new, versions.path_build, logger=logger)
+        os.remove(path2new)
+    elif mode not in ("rebuild", "upsert"):
+        raise ValueError(f"Unknown refresh mode: {mode}")
 
-        # insert table into database
-        db.insert_table(df, table_class)
+    # precompute the tables that the webapp reads
+    logger.info("Creating serving tables in db")
+    create_serving_tables(versions.path_build)
 
-    # close connection
+    # store the repeated names only once, keeping their ids of the current version
+    logger.info("Interning dimensions in db")
+    normalize_database(versions.path_build, path2previous=versions.path2db)
+
+    version = versions.publish()
+    logger.info(f"Published database version {version}")
+
+    return version
+
+
+def copy_tables(path_from, path_to):
+    """
+    Copies all rows of the tables (or their views) of the database at path_from
+    into a new database at path_to with the plain schema of Tables, ids included.
+    """
+    db = SQLiteDB(path_to, pragmas=BUILD_PRAGMAS)
+    db.create_db(indexes=False)
+    with db.cursor() as cursor:
+        cursor.execute(f"ATTACH DATABASE '{path_from}' AS source")
+        for table in Tables:
+            cols = ", ".join(table.value.__table__.columns.keys())
+            cursor.execute(
+                f"INSERT INTO main.{table.name} ({cols}) "
+                f"SELECT {cols} FROM source.{table.name}"
+            )
+    with db.cursor() as cursor:
+        cursor.execute("DETACH DATABASE source")
+    db.create_indexes()
     db.close()
+
+
+def upsert_database(path2new, path2db, logger=None):
+    """
+    Updates all tables of the database at path2db to the same tables of the
+    database at path2new, by inserting, updating and deleting only the rows that
+    differ. Rows are matched on the natural key of their table and, because keys
+    are not unique in the source data, on the order of occurrence within a key.
+    Returns the size of the change sets as {name: {change: number of rows}}.
+    """
+    logger = logger or structlog.get_logger()
+
+    connection = sqlite3.connect(path2db)
+    for key, value in BUILD_PRAGMAS.items():
+        connection.execute(f"PRAGMA {key} = {value}")
+    connection.execute("ATTACH DATABASE ? AS new", (path2new,))
+
+    changes = {}
+    for table in Tables:
+        name, table_class = table.name, table.value
+        cols = [c.name for c in table_class.__table__.columns if c.name != "id"]
+        key = table_class.natural_key
+        values = [c for c in cols if c not in key]
+
+        with connection:
+            # pair up the rows of both databases
+            connection.execute("DROP TABLE IF EXISTS temp._match")
+            connection.execute(
+                "CREATE TEMP TABLE _match AS "
+                "SELECT o.id AS id_old, n.id AS id_new "
+                f"FROM ({numbered('new', name, key)}) n "
+                f"JOIN ({numbered('main', name, key)}) o "
+                f"ON {' AND '.join(f'n.{c} IS o.{c}' for c in [*key, '_n'])}"
+            )
+
+            deletes = connection.execute(
+                f"DELETE FROM main.{name} "
+                "WHERE id NOT IN (SELECT id_old FROM temp._match)"
+            ).rowcount
+            updates = 0
+            if len(values) > 0:
+                updates = connection.execute(
+                    f"UPDATE main.{name} AS o "
+                    f"SET {', '.join(f'{c} = n.{c}' for c in values)} "
+                    f"FROM temp._match m JOIN new.{name} n ON n.id = m.id_new "
+                    f"WHERE o.id = m.id_old AND "
+                    f"({' OR '.join(f'o.{c} IS NOT n.{c}' for c in values)})"
+                ).rowcount
+            inserts = connection.execute(
+                f"INSERT INTO main.{name} ({', '.join(cols)}) "
+                f"SELECT {', '.join(cols)} FROM new.{name} "
+                "WHERE id NOT IN (SELECT id_new FROM temp._match) ORDER BY id"
+            ).rowcount
+
+        changes[name] = {"inserts": inserts, "updates": updates, "deletes": deletes}
+        logger.info(
+            f"Upserted table in db: {name} ({inserts} inserts, {updates} updates, "
+            f"{deletes} deletes)"
+        )
+
+    connection.execute("DROP TABLE IF EXISTS temp._match")
+    connection.execute("ANALYZE")
+    connection.commit()
+    connection.execute("DETACH DATABASE new")
+    connection.close()
+
+    return changes
+
+
+def numbered(schema, name, key):
+    """
+    Returns a query that numbers the rows of a table in schema by their order of
+    occurrence (_n) within their natural key, next to their id and key columns.
+    """
+    return (
+        f"SELECT id, {', '.join(key)}, row_number() OVER "
+        f"(PARTITION BY {', '.join(key)} ORDER BY id) AS _n "
+        f"FROM {schema}.{name}"
+    )
+
+
+def load_tables(path2db, names):
+    """Loads tables of an existing database as {name: DataFrame}, if it exists."""
+    if not os.path.exists(path2db):
+        return {}
+
+    db = SQLiteDB(path2db)
+    dict_tables = {}
+    for name in names:
+        df = db.query(f"SELECT * FROM {name}")
+        dict_tables[name] = df.drop(columns="id")
+    db.close()
+
+    return dict_tables
@@ -0,0 +1,114 @@
+import os
+import shutil
+import sqlite3
+from datetime import datetime
+
+
+def check_integrity(path2db):
+    """Runs SQLite's integrity check on a database, raising if it is not 'ok'."""
+    connection = sqlite3.connect(path2db)
+    try:
+        rows = connection.execute("PRAGMA integrity_check").fetchall()
+    finally:
+        connection.close()
+    if [row[0] for row in rows] != ["ok"]:
+        problems = "; ".join(str(row[0]) for row in rows[:5])
+        raise sqlite3.DatabaseError(f"Integrity check failed for {path2db}: {problems}")
+
+
+def read_version(path2db):
+    """Reads the version token of the published database, or None if there is none."""
+    path = f"{path2db}.version"
+    if not os.path.exists(path):
+        return None
+    with open(path, "r") as f:
+        return f.read().strip()
+
+
+class DatabaseVersions:
+    def __init__(self, path2db, dir_snapshots=None, keep=3) -> None:
+        """
+        Publishes new versions of the database at path2db. A new version is built
+        into a separate file (see path_build), integrity-checked and then renamed
+        onto path2db in one atomic step, so readers only ever see a complete
+        database. Every published version gets a token in <path2db>.version, and
+        the last 'keep' versions are kept as dated snapshots in dir_snapshots.
+        """
+        self.path2db = path2db
+        self.dir_snapshots = dir_snapshots
+        self.keep = keep
+
+    @classmethod
+    def from_config(cls, config):
+        """Creates the versions for config["database"] from the snapshots config."""
+        snapshots = config.get("snapshots", {})
+        return cls(
+            config["database"],
+            dir_snapshots=snapshots.get("dir"),
+            keep=snapshots.get("keep", 0),
+        )
+
+    @property
+    def path_build(self):
+        return f"{self.path2db}.build"
+
+    def prepare(self):
+        """Removes any leftovers of a failed build and returns the path to build in."""
+        if os.path.dirname(self.path2db):
+            os.makedirs(os.path.dirname(self.path2db), exist_ok=True)
+        if os.path.exists(self.path_build):
+            os.remove(self.path_build)
+        return self.path_build
+
+    def publish(self):
+        """
+        Swaps the finished build in for the current database and returns its
+        version token. A build that fails the integrity check is thrown away and
+        the current database is left untouched.
+        """
+        try:
+            check_integrity(self.path_build)
+        except sqlite3.DatabaseError:
+            os.remove(self.path_build)
+            raise
+
+        version = datetime.now().strftime("%Y%m%d_%H%M%S_%f")
+        if self.dir_snapshots is not None and self.keep > 0:
+            self._snapshot(version)
+        os.replace(self.path_build, self.path2db)
+
+        path = f"{self.path2db}.version"
+        with open(f"{path}.tmp", "w") as f:
+            f.write(version)
+        os.replace(f"{path}.tmp", path)
+
+        return version
+
+    def current(self):
+        """Returns the version token of the published database."""
+        return read_version(self.path2db)
+
+    def snapshots(self):
+        """Lists the paths of the kept snapshots, from oldest to newest."""
+        if self.dir_snapshots is None or not os.path.isdir(self.dir_snapshots):
+            return []
+        name, ext = os.path.splitext(os.path.basename(self.path2db))
+        return [
+            f"{self.dir_snapshots}/{file}"
+            for file in sorted(os.listdir(self.dir_snapshots))
+            if file.startswith(f"{name}_") and file.endswith(ext)
+        ]
+
+    def _snapshot(self, version):
+        os.makedirs(self.dir_snapshots, exist_ok=True)
+        name, ext = os.path.splitext(os.path.basename(self.path2db))
+        path = f"{self.dir_snapshots}/{name}_{version}{ext}"
+
+        # the published file is never written to again, so a hard link suffices
+        try:
+            os.link(self.path_build, path)
+        except OSError:
+            shutil.copy2(self.path_build, path)
+
+        for path_old in self.snapshots()[: -self.keep]:
+            os.remove(path_old)
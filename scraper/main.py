@@ -1,18 +1,48 @@
+import argparse
+import copy
 import os
 import sys
+import time
+from collections import defaultdict
+from concurrent.futures import (
+    ProcessPoolExecutor,
+    ThreadPoolExecutor,
+    as_completed,
+)
+from contextlib import contextmanager, nullcontext
 
 import pandas as pd
 
 DIR_SCRIPT = os.path.dirname(os.path.abspath(__file__))
 sys.path.append(os.path.dirname(DIR_SCRIPT))  # so we can keep main.py in scraper/
 
-from scraper.db.update import refresh_database
-from scraper.parsers.lzvcup import LZVCupParser
+from scraper.db.staging import StagingDB
+from scraper.db.update import (
+    Tables,
+    build_database,
+    load_tables,
+    publish_database,
+    refresh_database,
+)
+from scraper.db.versions import DatabaseVersions
+from scraper.parsers.lzvcup import (
+    COLS_PLAYER_SEASON,
+    DIR_CHECKPOINT,
+    LZVCupParser,
+    make_parsing_pool,
+)
+from scraper.utils.archive import HTMLArchive, RecordingTransport, ReplayTransport
 from scraper.utils.base import DataStorage
+from scraper.utils.cache import CachingTransport
+from scraper.utils.dtypes import apply_dtypes, memory_report
+from scraper.utils.export import ParquetExport
 from scraper.utils.logger import Logger
+from scraper.utils.state import PageState
+from scraper.utils.transport import RateController, RequestsTransport, Transport
 from scraper.utils.utils import (
     add_coordinates,
     create_levels_table,
+    get_mp_context,
     postproces_df,
     write_current_date_to_file,
     ymd,
@@ -21,101 +51,418 @@ from scraper.utils.utils import (
 DIR_LOGS = f"{DIR_SCRIPT}/logs/{ymd()}/"  # subdivide logs by day of script execution
 
 
-def scrape(config, log_main):
-    # initialize output variables
-    (
-        list_competitions,
-        list_teams,
-        list_schedules,
-        list_standings,
-        list_stats,
-        list_palmares,
-        list_sportshalls,
-    ) = (
-        [],
-        [],
-        [],
-        [],
-        [],
-        [],
-        [],
+def make_transport(config, record=None, replay=None, evict_cache=True):
+    """
+    Creates the transport for all page fetches. Pages are served from the archive
+    at 'replay' without any network access, or fetched (through the HTTP cache if
+    enabled in config) and additionally recorded into the archive at 'record'.
+    Only the process that owns the run should evict the cache ('evict_cache').
+    """
+    if replay is not None:
+        return ReplayTransport(HTMLArchive(replay, mode="r"))
+
+    # share a single pooled transport across all areas
+    transport = Transport.from_config(config.get("fetch", {}))
+
+    # serve unchanged pages from the on-disk HTTP cache if enabled in config
+    if config.get("cache", {}).get("enabled", False) is True:
+        transport = CachingTransport.from_config(
+            transport, config["cache"], evict=evict_cache
+        )
+
+    if record is not None:
+        transport = RecordingTransport(transport, HTMLArchive(record, mode="w"))
+
+    return transport
+
+
+@contextmanager
+def history_transport(config, transport):
+    """
+    Provides the transport for the player histories. The 'sequential' fetch mode
+    only serialises the crawl of the pages, so the histories are then fetched by
+    'history_workers' threads (10 by default) through a pooled RequestsTransport
+    of their own instead, behind copies of the same wrappers (e.g. the cache and
+    the archive) and sharing the fetch statistics.
+    """
+    fetch = dict(config.get("fetch", {}))
+    wrappers, core = [], transport
+    while getattr(core, "transport", None) is not None:
+        wrappers.append(core)
+        core = core.transport
+    mode = fetch.pop("mode", "sequential")
+    if mode != "sequential" or not isinstance(core, RequestsTransport):
+        yield transport
+        return
+
+    workers = fetch.pop("history_workers", 10)
+    pooled = RequestsTransport(
+        **fetch, max_concurrency=workers, max_per_host=workers, stats=core.stats
     )
-    df_stats_players_historical = None
+    inner = pooled
+    for wrapper in reversed(wrappers):
+        wrapper = copy.copy(wrapper)
+        wrapper.transport = inner
+        inner = wrapper
+    try:
+        yield inner
+    finally:
+        pooled.close()
+
+
+def log_transport_stats(transport, log_main):
+    """Logs requests, bytes on the wire and time spent per URL pattern."""
+    log_main.info("Fetch statistics\n" + transport.stats.report().to_string())
+    while transport is not None:
+        if isinstance(transport, CachingTransport):
+            log_main.info("Cache statistics\n" + transport.report().to_string())
+        if isinstance(getattr(transport, "budget", None), RateController):
+            log_main.info(
+                "Rate controller",
+                concurrency=transport.budget.limit,
+                backoffs=transport.budget.decreases,
+            )
+        transport = getattr(transport, "transport", None)
+
+
+def get_checkpoint(config, kind):
+    """Gets the checkpoint of a kind of unit if enabled in config, or None."""
+    checkpoint = config.get("checkpoint", {})
+    if checkpoint.get("enabled", False) is not True:
+        return None
+    return PageState(checkpoint.get("dir", DIR_CHECKPOINT), kind)
+
+
+def clear_checkpoint(config):
+    """Removes all partial results of a previous run."""
+    for kind in ["areas", "competitions", "steps"]:
+        checkpoint = get_checkpoint(config, kind)
+        if checkpoint is not None:
+            checkpoint.clear()
+
+
+def load_previous_players(config, log_main):
+    """
+    Loads the player statistics and history of the previous run from the database
+    if incremental player history is enabled in config, or returns None.
+    """
+    if config.get("incremental", {}).get("players", False) is not True:
+        return None
+
+    dict_tables = load_tables(
+        config["database"], ["stats_players", "stats_players_historical"]
+    )
+    if len(dict_tables) == 0:
+        log_main.info("No previous database found, fetching all player history")
+        return None
+
+    return dict_tables["stats_players"], dict_tables["stats_players_historical"]
+
+
+def scrape_area(
+    config,
+    area,
+    url_area,
+    transport=None,
+    dir_logs=DIR_LOGS,
+    staging=None,
+    pool=None,
+):
+    """
+    Scrapes all competitions, teams and sportshalls of a single area, parsing the
+    pages in the worker processes of 'pool' (see make_parsing_pool()). With the
+    path of a 'staging' database, the tables are appended to it chunk by chunk as
+    they are parsed instead of returned.
+    """
+    config_ = {
+        "url_base": config["url_base"],
+        "area": area,
+        "url_area": url_area,
+        "parsing": config.get("parsing", {}),
+        "incremental": config.get("incremental", {}),
+        "checkpoint": config.get("checkpoint", {}),
+    }
 
-    url_base = config["url_base"]
-    dict_areas = config["areas"]
+    # stream the tables into the staging database, or else collect them in memory
+    staging_db = StagingDB(staging) if staging is not None else None
+    unit = list(config["areas"]).index(area)  # keeps the areas in order of config
+    tables = defaultdict(list)
+
+    def emit(data_name, df):
+        if staging_db is not None:
+            staging_db.append(data_name, df, unit=unit)
+        else:
+            tables[data_name].append(df)
+
+    # restore the area if completed before an interrupted run
+    checkpoint = get_checkpoint(config, "areas")
+    if checkpoint is not None:
+        dict_tables = checkpoint.load(area)
+        if dict_tables is not None:
+            if staging_db is None:
+                return dict_tables
+            for data_name, df in dict_tables.items():
+                emit(data_name, df)
+            staging_db.close()
+            return None
+
+    # a worker process has no transport or parsing pool passed in and creates its own
+    close_transport = transport is None
+    if transport is None:
+        transport = make_transport(config, evict_cache=False)
+        pool = make_parsing_pool(config_)
+
+    # initialize area-specific logger
+    log = Logger.get_logger(
+        log_name=f"scraper_{area}",
+        log_file=f"{dir_logs}/{area}.log",
+    )
 
-    for area, url_area in dict_areas.items():
-        config_ = {"url_base": url_base, "area": area, "url_area": url_area}
+    # initialize parser instance
+    parser = LZVCupParser(config_, logger=log, transport=transport, parsing_pool=pool)
+
+    # get urls for competitions and sportshalls for all regions within area
+    df_sportshalls_urls, df_competitions_urls = parser.parse_region_cards()
+    emit("competitions", df_competitions_urls)
+
+    # get competition teams, schedule & standings, and team player stats & palmares
+    # when streaming, store the rows of every chunk of competitions as it completes
+    chunksize = None
+    if staging_db is not None:
+        chunksize = config.get("streaming", {}).get("chunksize", 8)
+    for dfs in parser.iter_competitions_and_teams(df_competitions_urls, chunksize):
+        for data_name, df in zip(
+            ["teams", "schedules", "standings", "stats_players", "palmares"], dfs
+        ):
+            emit(data_name, df)
+
+    # get sportshalls information
+    emit("sportshalls", parser.parse_sportshalls(df_sportshalls_urls))
+
+    if close_transport:
+        transport.close()
+        if pool is not None:
+            pool.shutdown()
+
+    # a streamed area is checkpointed per chunk of competitions only
+    if staging_db is not None:
+        staging_db.close()
+        return None
+
+    # the categories of the chunks differ, so cast the assembled tables again
+    dict_tables = {
+        data_name: apply_dtypes(pd.concat(dfs).reset_index(drop=True))
+        for data_name, dfs in tables.items()
+    }
+    if checkpoint is not None:
+        checkpoint.save(area, dict_tables)
 
-        # initialize area-specific logger
-        log = Logger.get_logger(
-            log_name=f"scraper_{area}",
-            log_file=f"{DIR_LOGS}/{area}.log",
-        )
+    return dict_tables
+
+
+def scrape_areas(
+    config, log_main, transport, dir_logs=DIR_LOGS, staging=None, pool=None
+):
+    """
+    Scrapes all areas, in parallel if set in config["areas_parallel"]. Threads
+    share the transport and thus its concurrency budget, as well as the parsing
+    'pool', whereas each worker process gets its own transport with an equal share
+    of the budget, and its own parsing pool. Returns the
+    results as {area: {table: DataFrame, ...}, ...} in the order of config, or
+    {area: None, ...} when streaming into a 'staging' database.
+    """
+    dict_areas = config["areas"]
+    areas_parallel = config.get("areas_parallel", {})
+    mode = areas_parallel.get("mode", "sequential")
+    workers = min(areas_parallel.get("workers", 1), len(dict_areas))
+
+    if mode == "sequential" or workers <= 1:
+        results = {}
+        for area, url_area in dict_areas.items():
+            results[area] = scrape_area(
+                config, area, url_area, transport, dir_logs, staging, pool
+            )
+            log_main.info(f"Area {area} successfully processed")
+        return results
+
+    if mode == "processes" and isinstance(
+        transport, (RecordingTransport, ReplayTransport)
+    ):
+        # an archive cannot be shared across processes
+        log_main.warning("Recording or replaying areas in threads, not processes")
+        mode = "threads"
+
+    if mode == "threads":
+        executor = ThreadPoolExecutor(max_workers=workers)
+        kwargs = {
+            "transport": transport,
+            "dir_logs": dir_logs,
+            "staging": staging,
+            "pool": pool,
+        }
+    elif mode == "processes":
+        # split the global concurrency budget over the worker processes
+        fetch = config.get("fetch", {})
+        max_concurrency = max(1, fetch.get("max_concurrency", 16) // workers)
+        max_per_host = max(1, fetch.get("max_per_host", 8) // workers)
+        config = {
+            **config,
+            "fetch": {
+                **fetch,
+                "max_concurrency": max_concurrency,
+                "max_per_host": max_per_host,
+            },
+        }
+        executor = ProcessPoolExecutor(max_workers=workers, mp_context=get_mp_context())
+        kwargs = {"dir_logs": dir_logs, "staging": staging}
+    else:
+        raise ValueError(f"Unknown areas_parallel mode '{mode}'")
+
+    with executor:
+        futures = {
+            executor.submit(scrape_area, config, area, url_area, **kwargs): area
+            for area, url_area in dict_areas.items()
+        }
+        for future in as_completed(futures):
+            future.result()  # raise errors early
+            log_main.info(f"Area {futures[future]} successfully processed")
+
+    # collect in the order of config so the output does not depend on timing
+    results = {area: future.result() for future, area in futures.items()}
+    return {area: results[area] for area in dict_areas}
+
+
+def scrape(config, log_main, transport=None, dir_logs=DIR_LOGS, resume=False):
+    df_stats_players_historical = None
 
-        # initialize parser instance
-        parser = LZVCupParser(config_, logger=log)
-
-        # get urls for competitions and sportshalls for all regions within area
-        df_sportshalls_urls, df_competitions_urls = parser.parse_region_cards()
-        list_competitions.append(df_competitions_urls)
-
-        # get competition teams, schedule & standings, and team player stats & palmares
-        (
-            df_teams,
-            df_schedules,
-            df_standings,
-            df_stats,
-            df_palmares,
-        ) = parser.parse_competitions_and_teams(df_competitions_urls)
-        list_teams.append(df_teams)
-        list_schedules.append(df_schedules)
-        list_standings.append(df_standings)
-        list_stats.append(df_stats)
-        list_palmares.append(df_palmares)
-
-        # get sportshalls information
-        df_sportshalls = parser.parse_sportshalls(df_sportshalls_urls)
-        list_sportshalls.append(df_sportshalls)
-
-        log_main.info(f"Area {area} successfully processed")
-
-    # gather lists into single DataFrames
-    df_competitions_urls_all = pd.concat(list_competitions).reset_index(drop=True)
-    df_teams_all = pd.concat(list_teams).reset_index(drop=True)
-    df_schedules_all = pd.concat(list_schedules).reset_index(drop=True)
-    df_standings_all = pd.concat(list_standings).reset_index(drop=True)
-    df_stats_players_all = pd.concat(list_stats).reset_index(drop=True)
-    df_palmares_all = pd.concat(list_palmares).reset_index(drop=True)
-    df_sportshalls_all = pd.concat(list_sportshalls).reset_index(drop=True)
-
-    # get historical player statistics if enabled in config
-    if config["steps"]["historical_players"] is True:
-        log_main.info("Processing all historical player statistics")
-        df_stats_players_historical = LZVCupParser.parse_player_stats_history(
-            df_stats_players_all
+    # start from an empty checkpoint unless resuming an interrupted run
+    if resume is True:
+        log_main.info("Resuming from checkpoint")
+    else:
+        clear_checkpoint(config)
+
+    # the transport is closed here only if not passed in
+    close_transport = transport is None
+    if transport is None:
+        transport = make_transport(config)
+
+    # parse in a single pool of worker processes for the whole run, if enabled
+    with make_parsing_pool(config) or nullcontext() as pool:
+        results = scrape_areas(
+            config, log_main, transport, dir_logs=dir_logs, pool=pool
         )
 
+        # gather area results into single DataFrames, recasting their categories
+        dict_tables = {
+            data_name: apply_dtypes(
+                pd.concat(
+                    [result[data_name] for result in results.values()]
+                ).reset_index(drop=True)
+            )
+            for data_name in next(iter(results.values()))
+        }
+
+        # get historical player statistics if enabled in config
+        checkpoint = get_checkpoint(config, "steps")
+        if checkpoint is not None:
+            df_stats_players_historical = checkpoint.load("stats_players_historical")
+        if (
+            config["steps"]["historical_players"] is True
+            and df_stats_players_historical is None
+        ):
+            log_main.info("Processing all historical player statistics")
+            with history_transport(config, transport) as transport_history:
+                df_stats_players_historical = LZVCupParser.parse_player_stats_history(
+                    dict_tables["stats_players"],
+                    transport=transport_history,
+                    logger=log_main,
+                    parsing=config.get("parsing", {}),
+                    previous=load_previous_players(config, log_main),
+                    pool=pool,
+                )
+            if checkpoint is not None:
+                checkpoint.save("stats_players_historical", df_stats_players_historical)
+
+    if close_transport:
+        transport.close()
+        log_transport_stats(transport, log_main)
+
     return {
-        "competitions": df_competitions_urls_all,
-        "teams": df_teams_all,
-        "sportshalls": df_sportshalls_all,
-        "stats_players": df_stats_players_all,
+        "competitions": dict_tables["competitions"],
+        "teams": dict_tables["teams"],
+        "sportshalls": dict_tables["sportshalls"],
+        "stats_players": dict_tables["stats_players"],
         "stats_players_historical": df_stats_players_historical,
-        "schedules": df_schedules_all,
-        "standings": df_standings_all,
-        "palmares": df_palmares_all,
+        "schedules": dict_tables["schedules"],
+        "standings": dict_tables["standings"],
+        "palmares": dict_tables["palmares"],
     }
 
 
-def process_data(config, dict_tables, log_main):
+def scrape_to_staging(
+    config, log_main, staging, transport=None, dir_logs=DIR_LOGS, resume=False
+):
+    """
+    Streaming alternative to scrape() that appends all tables to the staging
+    database at path 'staging' as they are parsed, such that memory use does not
+    grow with the number of areas and the first rows are stored right away.
+    """
+    if resume is True:
+        log_main.info("Resuming from checkpoint")
+    else:
+        clear_checkpoint(config)
+
+    # the staging database only holds the current run
+    for path in [staging, f"{staging}-wal", f"{staging}-shm"]:
+        if os.path.exists(path):
+            os.remove(path)
+
+    close_transport = transport is None
+    if transport is None:
+        transport = make_transport(config)
+
+    # parse in a single pool of worker processes for the whole run, if enabled
+    with make_parsing_pool(config) or nullcontext() as pool:
+        scrape_areas(
+            config, log_main, transport, dir_logs=dir_logs, staging=staging, pool=pool
+        )
+
+        # get historical player statistics if enabled in config, batch by batch,
+        # each batch being checkpointed so a resumed run only fetches the others
+        staging_db = StagingDB(staging)
+        if config["steps"]["historical_players"] is True:
+            log_main.info("Processing all historical player statistics")
+            df_stats = staging_db.read(
+                "stats_players", columns=["name", *COLS_PLAYER_SEASON]
+            )
+            with history_transport(config, transport) as transport_history:
+                for df in LZVCupParser.iter_player_stats_history(
+                    df_stats,
+                    transport=transport_history,
+                    batchsize=config.get("streaming", {}).get("batchsize_players", 500),
+                    logger=log_main,
+                    parsing=config.get("parsing", {}),
+                    previous=load_previous_players(config, log_main),
+                    checkpoint=get_checkpoint(config, "steps"),
+                    pool=pool,
+                ):
+                    staging_db.append("stats_players_historical", df)
+        staging_db.close()
+
+    if close_transport:
+        transport.close()
+        log_transport_stats(transport, log_main)
+
+
+def process_data(config, dict_tables, log_main, geocode=True):
     # postprocess initial tables
     for data_name, cols in config["postprocessing"].items():
         data = dict_tables[data_name]
         if data_name == "sportshalls":
             log_main.info("Adding coordinates to sportshalls")
-            data = add_coordinates(data, dir_coordinates="data/_coordinates.csv")
+            data = add_coordinates(
+                data, dir_coordinates="data/_coordinates.csv", geocode=geocode
+            )
         data = postproces_df(data, first_cols=cols[0], drop_cols=cols[1])
         dict_tables.update({data_name: data})  # overwrite modified DataFrame
 
@@ -136,20 +483,109 @@ def process_data(config, dict_tables, log_main):
     return dict_tables
 
 
+def process_staging(config, staging, log_main, geocode=True):
+    """
+    Builds the database from the staging database filled by scrape_to_staging().
+    The large tables are postprocessed with SQL inside SQLite, and only the small
+    sportshalls, standings and palmares tables pass through pandas, so memory use
+    stays flat however many rows were staged. Mirrors process_data() and store().
+    """
+    versions = DatabaseVersions.from_config(config)
+    with build_database(versions) as db:
+        # postprocess initial tables
+        staging_db = StagingDB(staging)
+        for data_name, cols in config["postprocessing"].items():
+            if not staging_db.has_table(data_name):
+                continue
+            log_main.info(f"Inserting table into db: {data_name}")
+            if data_name == "sportshalls":
+                log_main.info("Adding coordinates to sportshalls")
+                data = add_coordinates(
+                    staging_db.read(data_name),
+                    dir_coordinates="data/_coordinates.csv",
+                    geocode=geocode,
+                )
+                data = postproces_df(data, first_cols=cols[0], drop_cols=cols[1])
+                db.insert_table(data, Tables.sportshalls.value, bulk=True)
+            else:
+                staging_db.insert_distinct(
+                    versions.path_build, getattr(Tables, data_name).value
+                )
+        staging_db.close()
+
+        # create a new table with the sportshall(s) each team plays in
+        with db.cursor() as cursor:
+            cursor.execute("""
+                INSERT INTO locations (team, sportshall)
+                SELECT team1, sportshall FROM schedules
+                GROUP BY team1, sportshall ORDER BY team1, min(id)
+                """)
+
+        # create a new table that estimates each team's competency level
+        df_levels = create_levels_table(
+            db.query("SELECT * FROM standings"), db.query("SELECT * FROM palmares")
+        )
+        db.insert_table(df_levels, Tables.levels.value, bulk=True)
+
+        if config["steps"]["parquet"]:
+            # additionally export all tables as Parquet, chunk by chunk
+            export = ParquetExport(f"{config['dir_output']}/parquet")
+            for table in db.get_table_classes():
+                chunks = pd.read_sql(
+                    f"SELECT * FROM {table.name}", db.engine, chunksize=100_000
+                )
+                for data in chunks:
+                    export.write(table.name, data.drop(columns="id"))
+            export.close()
+
+    # swap the new database in for the current one
+    publish_database(
+        versions, mode=config.get("refresh", {}).get("mode", "rebuild"), logger=log_main
+    )
+
+
 def store(config, dict_tables, log_main):
+    # cast all tables to their compact dtypes and report the memory saved
+    for data_name, data in dict_tables.items():
+        if data is not None:
+            dict_tables[data_name] = apply_dtypes(data)
+    for row in memory_report(dict_tables).itertuples():
+        log_main.info(
+            f"Memory of table {row.table} ({row.rows} rows): "
+            f"{row.before / 1e6:.2f} MB before, {row.after / 1e6:.2f} MB after"
+        )
+
     # refresh SQLite database
-    refresh_database(dict_tables, path2db=config["database"], logger=log_main)
+    refresh_database(
+        dict_tables,
+        path2db=config["database"],
+        logger=log_main,
+        versions=DatabaseVersions.from_config(config),
+        mode=config.get("refresh", {}).get("mode", "rebuild"),
+    )
 
-    if config["steps"]["csv"]:
-        # additionally store all tables as csv files
-        root = config["dir_output"]
+    if config["steps"]["parquet"]:
+        # additionally export all tables as Parquet
+        export = ParquetExport(f"{config['dir_output']}/parquet")
         for data_name, data in dict_tables.items():
-            output_dir = f"{root}/{data_name}.csv"  # overwrites files at every rerun
-            if data is not None:
-                DataStorage.store_csv(data, dir=output_dir, index=False)
+            export.write(data_name, data)
+        export.close()
 
 
 if __name__ == "__main__":
+    argparser = argparse.ArgumentParser(description="Scrape data from LZV Cup")
+    group = argparser.add_mutually_exclusive_group()
+    group.add_argument("--record", help="record all fetched pages into this archive")
+    group.add_argument(
+        "--replay", help="serve all pages from this archive, without network access"
+    )
+    argparser.add_argument(
+        "--resume",
+        action="store_true",
+        help="reuse the areas and competitions completed by an interrupted run",
+    )
+    args = argparser.parse_args()
+
     if not os.path.isdir(DIR_LOGS):
         os.makedirs(DIR_LOGS)
 
@@ -161,14 +597,45 @@ if __name__ == "__main__":
     config = DataStorage.load_json(f"{DIR_SCRIPT}/config/config.json")
     log.info("Config loaded")
 
-    dict_tables = scrape(config, log_main=log)
-    log.info("Data scraped")
-
-    dict_tables = process_data(config, dict_tables, log_main=log)
-    log.info("Data processed into tables")
+    streaming = config.get("streaming", {})
+
+    start = time.perf_counter()
+    transport = make_transport(config, record=args.record, replay=args.replay)
+    if streaming.get("enabled", False) is True:
+        scrape_to_staging(
+            config,
+            log_main=log,
+            staging=streaming["staging"],
+            transport=transport,
+            resume=args.resume,
+        )
+    else:
+        dict_tables = scrape(
+            config, log_main=log, transport=transport, resume=args.resume
+        )
+    transport.close()
+    log_transport_stats(transport, log)
+    log.info(f"Data scraped in {time.perf_counter() - start:.1f}s")
+
+    if streaming.get("enabled", False) is True:
+        start = time.perf_counter()
+        process_staging(
+            config, streaming["staging"], log_main=log, geocode=args.replay is None
+        )
+        log.info(f"Data processed and stored in {time.perf_counter() - start:.1f}s")
+    else:
+        start = time.perf_counter()
+        dict_tables = process_data(
+            config, dict_tables, log_main=log, geocode=args.replay is None
+        )
+        log.info(f"Data processed into tables in {time.perf_counter() - start:.1f}s")
 
-    store(config, dict_tables, log_main=log)
-    log.info("Data stored")
+        start = time.perf_counter()
+        store(config, dict_tables, log_main=log)
+        log.info(f"Data stored in {time.perf_counter() - start:.1f}s")
 
     write_current_date_to_file(config["dir_last_updated"])
     log.info("Refresh date updated.")
+
+    # the run is complete so the next one starts from scratch
+    clear_checkpoint(config)
@@ -1,12 +1,59 @@
+import hashlib
 import io
-from concurrent.futures import ThreadPoolExecutor
+import time
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
 
 import numpy as np
 import pandas as pd
-import requests
+import structlog
+from bs4 import SoupStrainer
+from lxml import html as lxml_html
 
 from scraper.utils.base import BaseScraper
-from scraper.utils.utils import add_columns_to_df, chunks
+from scraper.utils.dtypes import apply_dtypes
+from scraper.utils.state import PageState
+from scraper.utils.transport import RequestsTransport, Transport
+from scraper.utils.utils import add_columns_to_df, chunks, get_mp_context
+
+# subtrees of each type of page that the extractors need
+ONLY_REGION_CARDS = SoupStrainer(
+    ["button", "div"],
+    class_=["btn btn-link btn-block text-left collapsed", "card-body row"],
+)
+ONLY_COMPETITION = SoupStrainer(
+    "div",
+    class_=[
+        "col-10 text-nowrap",  # teams
+        "items calendar-list",  # schedule
+        "items table-list lzvtable",  # standings
+    ],
+)
+XPATH_COMPETITION = (  # same subtrees as ONLY_COMPETITION
+    "//div[@class='col-10 text-nowrap' or @class='items calendar-list'"
+    " or @class='items table-list lzvtable']"
+)
+ONLY_TEAM = SoupStrainer(
+    ["ul", "table"],
+    class_=["item-list striped", "lzvtable"],  # player stats, palmares
+)
+ONLY_SPORTSHALLS = SoupStrainer("div", class_="card lzv2020card")
+
+DIR_STATE = "data/_state"
+DIR_CHECKPOINT = "data/_checkpoint"
+
+COLS_PLAYER_HISTORY = [
+    "name",
+    "seizoen",
+    "team",
+    "wedstrijden",
+    "goals",
+    "assists",
+    "reeks",
+    "stand",
+]
+COLS_PLAYER_SEASON = ["url", "team", "wedstrijden", "goals", "assists"]
 
 
 class LZVCupParser(BaseScraper):
@@ -28,7 +75,7 @@ class LZVCupParser(BaseScraper):
         area = self._area
 
         # get HTML
-        soup = self.make_soup(self._url_area)
+        soup = self.make_soup(self._url_area, parse_only=ONLY_REGION_CARDS)
 
         # get regions in specific area (e.g. Regio Lier in Antwerpen)
         region_names = [
@@ -86,93 +133,77 @@ class LZVCupParser(BaseScraper):
 
         The input is the area-specific competitions output from
         LZVCupParser.parse_region_cards().
-        """
-        area = self._area
-
-        list_teams, list_schedules, list_standings, list_stats, list_palmares = (
-            [],
-            [],
-            [],
-            [],
-            [],
-        )
-        for (
-            _,
-            _,  # area
-            region,
-            competition,
-            url_competition,
-        ) in df_competitions_urls.itertuples():
-            self._logger.info(f"Processing {area} - {region} - {competition}")
-
-            # get competition page as HTML
-            soup_competition = self.make_soup(url_competition)
-
-            # get teams for given competition
-            dict_teams = self._parse_urls_teams(soup_competition)
-
-            df_teams = (
-                pd.DataFrame.from_dict(dict_teams, orient="index", columns=["url"])
-                .reset_index()
-                .rename(columns={"index": "team"})
-            )
-            df_teams = add_columns_to_df(
-                df_teams, {"area": area, "region": region, "competition": competition}
-            )
-
-            # prepare teams output
-            list_teams.append(df_teams)
-
-            # gather metadata into a dict
-            metadata = {"area": area, "region": region, "competition": competition}
 
-            # retrieve schedule including results and future games
-            df_schedule = self._parse_competition_schedule(soup_competition)
-            df_schedule = add_columns_to_df(df_schedule, metadata)
-            list_schedules.append(df_schedule)
+        All competition pages are fetched first, then all team pages, such that
+        both can load concurrently when the async fetch mode is configured. Each
+        batch of pages is parsed in the worker processes of self.parsing_pool if
+        one was passed in (see make_parsing_pool()), and inline otherwise.
 
-            # retrieve current standings
-            df_standings = self._parse_competition_standings(soup_competition)
-            df_standings = add_columns_to_df(df_standings, metadata)
-            list_standings.append(df_standings)
-
-            # get statistics for all teams
-            for team, url_team in dict_teams.items():
-                # update metadata
-                metadata.update({"team": team})
+        If self._incremental enables "competitions", a fingerprint of the relevant
+        content of each competition page is stored under its "dir_state". Pages
+        with the same fingerprint as in the previous run are not parsed again, and
+        their team pages are only fetched again once older than the configured
+        "max_age_hours_teams".
 
-                # parse HTML
-                soup_team = self.make_soup(url_team)
-
-                # get team stats
-                try:
-                    df_stats_team = self._parse_team_stats(soup_team)
-                    df_stats_team = add_columns_to_df(df_stats_team, metadata)
-                    list_stats.append(df_stats_team)
-                except AttributeError:
-                    self._logger.warning(
-                        "No player info available", team=team, url=url_team
-                    )
-
-                # get historical team standings (= palmares)
-                try:
-                    df_palmares_team = self._parse_team_palmares(soup_team)
-                    df_palmares_team = add_columns_to_df(df_palmares_team, metadata)
-                    list_palmares.append(df_palmares_team)
-                except AttributeError:
-                    self._logger.warning(
-                        "No palmares info available", team=team, url=url_team
-                    )
-                    continue
+        See LZVCupParser.iter_competitions_and_teams() for processing the
+        competitions in chunks, which also allows to checkpoint them.
+        """
+        parsed = list(self.iter_competitions_and_teams(df_competitions_urls))
 
-        # assemble all output into DataFrames
-        df_teams = pd.concat(list_teams).reset_index(drop=True)
-        df_schedules = pd.concat(list_schedules).reset_index(drop=True)
-        df_standings = pd.concat(list_standings).reset_index(drop=True)
-        df_stats = pd.concat(list_stats).reset_index(drop=True)
-        df_palmares = pd.concat(list_palmares).reset_index(drop=True)
+        # assemble all output into DataFrames, with the categories of all chunks
+        return tuple(
+            apply_dtypes(pd.concat([dfs[i] for dfs in parsed]).reset_index(drop=True))
+            for i in range(5)
+        )
 
-        return df_teams, df_schedules, df_standings, df_stats, df_palmares
+    def iter_competitions_and_teams(self, df_competitions_urls, chunksize=None):
+        """
+        Yields the output of LZVCupParser.parse_competitions_and_teams() for
+        'chunksize' competitions at a time (all at once by default), such that the
+        rows can be stored while the next chunk is being fetched. Tables without
+        any rows in a chunk are yielded as None.
+
+        If self._checkpoint is enabled, the competitions are processed in chunks
+        of its "chunksize" and the result of each competition is saved under its
+        "dir". Competitions found there from an interrupted run are restored
+        instead of fetched again.
+        """
+        checkpoint = getattr(self, "_checkpoint", {})
+        state = None
+        if checkpoint.get("enabled", False) is True:
+            state = PageState(checkpoint.get("dir", DIR_CHECKPOINT), "competitions")
+            chunksize = chunksize or checkpoint.get("chunksize", 16)
+        chunksize = chunksize or max(1, len(df_competitions_urls))
+
+        for i in range(0, len(df_competitions_urls), chunksize):
+            df_chunk = df_competitions_urls.iloc[i : i + chunksize]
+            urls = df_chunk["url"].tolist()
+
+            # restore the competitions completed before an interrupted run
+            parsed_competitions, parsed_teams = {}, {}
+            if state is not None:
+                for url in urls:
+                    done = state.load(url)
+                    if done is not None:
+                        parsed_competitions[url] = done["parsed"]
+                        parsed_teams.update(done["teams"])
+
+            # process the other competitions, checkpointing each if enabled
+            urls_todo = [url for url in urls if url not in parsed_competitions]
+            if len(urls_todo) > 0:
+                parsed_chunk, parsed_teams_chunk = self._parse_competition_pages(
+                    urls_todo
+                )
+                for url, (dict_teams, _, _) in parsed_chunk.items():
+                    if state is not None:
+                        teams = {u: parsed_teams_chunk[u] for u in dict_teams.values()}
+                        state.save(url, {"parsed": parsed_chunk[url], "teams": teams})
+                parsed_competitions.update(parsed_chunk)
+                parsed_teams.update(parsed_teams_chunk)
+
+            yield self._assemble_competitions(
+                df_chunk, parsed_competitions, parsed_teams
+            )
 
     def parse_sportshalls(self, df_sportshalls_urls):
         """
@@ -186,7 +217,7 @@ class LZVCupParser(BaseScraper):
             self._logger.info(f"Processing {area} - {region} > sportshalls")
 
             # parse HTML
-            soup = self.make_soup(url_sportshalls)
+            soup = self.make_soup(url_sportshalls, parse_only=ONLY_SPORTSHALLS)
 
             # get all sportshalls cards
             cards_all = soup.find_all("div", class_="card lzv2020card")
@@ -241,65 +272,333 @@ class LZVCupParser(BaseScraper):
 
             list_dfs.append(df)
 
-        df_all = pd.concat(list_dfs)
+        df_all = apply_dtypes(pd.concat(list_dfs))
 
         return df_all
 
     @staticmethod
-    def parse_player_stats_history(df_stats, max_workers=10):
-        """Parses historical statistics for all players in input DataFrame."""
-
-        # create helper function to parse historical statistics for individual players
-        def _parse_player_stats_history(session, name, url_player):
-            # get page
-            page = session.get(url_player)
-
-            # grab table
-            df = pd.read_html(io.StringIO(page.text))[0]
-
-            # reformat table
-            initial_cols = [
-                "seizoen",
-                "team",
-                "wedstrijden",
-                "goals",
-                "assists",
-                "reeks",
-                "stand",
-            ]
-            df.columns = initial_cols
-
-            # add name
-            df["name"] = name
+    def parse_player_stats_history(
+        df_stats,
+        max_workers=10,
+        transport=None,
+        batchsize=500,
+        logger=None,
+        parsing=None,
+        previous=None,
+        pool=None,
+    ):
+        """
+        Parses historical statistics for all players in input DataFrame. The pages
+        are fetched through the given transport (by default a pooled session with
+        'max_workers' connections) in batches of 'batchsize' players, and each
+        batch is parsed according to the 'parsing' settings, in the worker
+        processes of 'pool' if given, see map_parse().
+
+        With 'previous' as (df_stats, df_stats_historical) from an earlier run, only
+        players who are new or whose current season statistics changed are fetched
+        again, and the earlier history is reused for all other players.
+        """
+        df_history = pd.concat(
+            LZVCupParser.iter_player_stats_history(
+                df_stats,
+                max_workers=max_workers,
+                transport=transport,
+                batchsize=batchsize,
+                logger=logger,
+                parsing=parsing,
+                previous=previous,
+                pool=pool,
+            )
+        )
+        return apply_dtypes(df_history)
 
-            # reorder columns
-            df = df[["name"] + initial_cols]
+    @staticmethod
+    def iter_player_stats_history(
+        df_stats,
+        max_workers=10,
+        transport=None,
+        batchsize=500,
+        logger=None,
+        parsing=None,
+        previous=None,
+        checkpoint=None,
+        pool=None,
+    ):
+        """
+        Yields the output of LZVCupParser.parse_player_stats_history() batch by
+        batch, as soon as the history of each 'batchsize' players is available (or
+        None if not found for any player in a batch).
 
-            return df
+        With a PageState as 'checkpoint', the history of every batch is saved as
+        soon as it is parsed, and batches saved by an interrupted run are restored
+        instead of fetched again.
+        """
+        logger = logger or structlog.get_logger()
+        parsing = parsing or {}
+        if transport is None:
+            transport = RequestsTransport(
+                max_concurrency=max_workers, max_per_host=max_workers
+            )
 
         # drop duplicates first as some players may play in multiple teams
         df_players = df_stats[["name", "url"]].drop_duplicates()
 
-        # parse historical statistics for each player in parallel
-        with requests.Session() as session:
-            with ThreadPoolExecutor(max_workers=max_workers) as executor:
-                res = executor.map(
-                    lambda k: _parse_player_stats_history(
-                        session,
-                        df_players["name"].iloc[k],
-                        df_players["url"].iloc[k],
-                    ),
-                    range(len(df_players)),
+        # keep the stored history of unchanged players
+        histories = defaultdict(list)
+        df_players_to_fetch = df_players
+        if previous is not None:
+            df_players_to_fetch, df_reused = _split_changed_players(df_stats, *previous)
+            for name, df in df_reused.groupby("name", sort=False):
+                histories[name, None].append(df[COLS_PLAYER_HISTORY])
+            logger.info(
+                "Reusing historical player statistics",
+                players_fetched=len(df_players_to_fetch),
+                fetches_avoided=len(df_players) - len(df_players_to_fetch),
+            )
+        players_to_fetch = set(df_players_to_fetch.itertuples(index=False, name=None))
+
+        # fetch and parse historical statistics for each player, batch by batch
+        players_all = list(df_players.itertuples(index=False, name=None))
+        for batch in chunks(players_all, batchsize):
+            # restore the batch if completed before an interrupted run
+            key = "\n".join(["stats_players_historical", *(url for _, url in batch)])
+            done = checkpoint.load(key) if checkpoint is not None else None
+            if done is not None:
+                for name, _ in batch:
+                    histories.pop((name, None), None)
+                yield done["history"]
+                continue
+
+            players = [player for player in batch if player in players_to_fetch]
+            pages = transport.get_many([url for _, url in players])
+            players_found, urls_found = [], []
+            for name, url in players:
+                if pages[url].status != 200:
+                    logger.warning("No player history available", name=name, url=url)
+                    continue
+                players_found.append((name, pages[url].text))
+                urls_found.append(url)
+            res = map_parse(
+                _parse_player_page, players_found, {"parsing": parsing}, pool=pool
+            )
+            for (name, _), url, df in zip(players_found, urls_found, res):
+                histories[name, url].append(df)
+
+            # assemble in order of the players in input DataFrame
+            res = []
+            for name, url in batch:
+                res.extend(
+                    histories.pop((name, None), []) + histories.pop((name, url), [])
                 )
-
-            df = pd.concat(res)
-
-        return df
+            df_history = apply_dtypes(pd.concat(res)) if len(res) > 0 else None
+            if checkpoint is not None:
+                checkpoint.save(key, {"history": df_history})
+            yield df_history
 
     ############################
     #### PRIVATE METHODS     ###
     ############################
 
+    def _assemble_competitions(
+        self, df_competitions_urls, parsed_competitions, parsed_teams
+    ):
+        """
+        Assembles the teams, schedules, standings, player stats and palmares of
+        parsed competitions into DataFrames, in the order of the competitions.
+        """
+        area = self._area
+
+        list_teams, list_schedules, list_standings, list_stats, list_palmares = (
+            [],
+            [],
+            [],
+            [],
+            [],
+        )
+        for (
+            _,
+            _,  # area
+            region,
+            competition,
+            url_competition,
+        ) in df_competitions_urls.itertuples():
+            self._logger.info(f"Processing {area} - {region} - {competition}")
+
+            # get teams, schedule and standings parsed from the competition page
+            dict_teams, df_schedule, df_standings = parsed_competitions[url_competition]
+
+            df_teams = (
+                pd.DataFrame.from_dict(dict_teams, orient="index", columns=["url"])
+                .reset_index()
+                .rename(columns={"index": "team"})
+            )
+            df_teams = add_columns_to_df(
+                df_teams, {"area": area, "region": region, "competition": competition}
+            )
+
+            # prepare teams output
+            list_teams.append(df_teams)
+
+            # gather metadata into a dict
+            metadata = {"area": area, "region": region, "competition": competition}
+
+            # retrieve schedule including results and future games
+            df_schedule = add_columns_to_df(df_schedule.copy(), metadata)
+            list_schedules.append(df_schedule)
+
+            # retrieve current standings
+            df_standings = add_columns_to_df(df_standings.copy(), metadata)
+            list_standings.append(df_standings)
+
+            # get statistics for all teams
+            for team, url_team in dict_teams.items():
+                # update metadata
+                metadata.update({"team": team})
+
+                # get player stats and palmares parsed from the team page
+                df_stats_team, df_palmares_team = parsed_teams[url_team]
+
+                # get team stats
+                if df_stats_team is not None:
+                    df_stats_team = add_columns_to_df(df_stats_team.copy(), metadata)
+                    list_stats.append(df_stats_team)
+                else:
+                    self._logger.warning(
+                        "No player info available", team=team, url=url_team
+                    )
+
+                # get historical team standings (= palmares)
+                if df_palmares_team is not None:
+                    df_palmares_team = add_columns_to_df(
+                        df_palmares_team.copy(), metadata
+                    )
+                    list_palmares.append(df_palmares_team)
+                else:
+                    self._logger.warning(
+                        "No palmares info available", team=team, url=url_team
+                    )
+
+        # the categories of the teams differ, so cast the assembled tables again
+        return tuple(
+            (
+                apply_dtypes(pd.concat(dfs).reset_index(drop=True))
+                if len(dfs) > 0
+                else None
+            )
+            for dfs in [
+                list_teams,
+                list_schedules,
+                list_standings,
+                list_stats,
+                list_palmares,
+            ]
+        )
+
+    def _parse_competition_pages(self, urls):
+        """
+        Fetches and parses the given competition pages and all of their team pages
+        as ({URL: (teams, schedule, standings)}, {team URL: (stats, palmares)}).
+        """
+        parsing = getattr(self, "_parsing", {})
+        incremental = getattr(self, "_incremental", {})
+
+        # previous state of each competition page if incremental scraping is enabled
+        states = {}
+        if incremental.get("competitions", False) is True:
+            state = PageState(incremental.get("dir_state", DIR_STATE), "competitions")
+            states = {url: state.load(url) for url in urls}
+
+        # get all competition pages as HTML and parse the changed ones (in worker
+        # processes), reusing what was extracted before from unchanged pages
+        pages_competitions = self.fetch_pages(urls)
+        fingerprints = {}
+        if incremental.get("competitions", False) is True:
+            fingerprints = {
+                url: _fingerprint_competition_page(html)
+                for url, html in pages_competitions.items()
+            }
+        urls_unchanged = [
+            url
+            for url in pages_competitions
+            if states.get(url) is not None
+            and states[url]["fingerprint"] == fingerprints[url]
+        ]
+        parsed_competitions = {url: states[url]["parsed"] for url in urls_unchanged}
+        pages_changed = {
+            url: html
+            for url, html in pages_competitions.items()
+            if url not in parsed_competitions
+        }
+        parsed_competitions.update(
+            zip(
+                pages_changed,
+                map_parse(
+                    _parse_competition_page,
+                    pages_changed.values(),
+                    config={"url_base": self._url_base, "parsing": parsing},
+                    pool=getattr(self, "parsing_pool", None),
+                ),
+            )
+        )
+
+        # reuse the team pages of unchanged competitions until they are stale
+        now = time.time()
+        max_age = incremental.get("max_age_hours_teams", 24) * 3600
+        urls_fresh = [
+            url for url in urls_unchanged if now - states[url]["fetched_at"] < max_age
+        ]
+        parsed_teams = {}
+        for url in urls_fresh:
+            parsed_teams.update(states[url]["teams"])
+
+        # get all other team pages as HTML for the teams found on competition pages
+        pages_teams = self.fetch_pages(
+            [
+                url_team
+                for url, (d, _, _) in parsed_competitions.items()
+                if url not in urls_fresh
+                for url_team in d.values()
+            ],
+            missing_ok=True,
+        )
+        parsed_teams.update(
+            zip(
+                pages_teams,
+                map_parse(
+                    _parse_team_page,
+                    pages_teams.values(),
+                    config={"url_base": self._url_base, "parsing": parsing},
+                    pool=getattr(self, "parsing_pool", None),
+                ),
+            )
+        )
+
+        # store what was extracted from each competition for the next run
+        if incremental.get("competitions", False) is True:
+            for url, (dict_teams, _, _) in parsed_competitions.items():
+                if url in urls_fresh:
+                    continue
+                state.save(
+                    url,
+                    {
+                        "fingerprint": fingerprints[url],
+                        "parsed": parsed_competitions[url],
+                        "teams": {u: parsed_teams[u] for u in dict_teams.values()},
+                        "fetched_at": now,
+                    },
+                )
+            self._logger.info(
+                "Reusing unchanged competitions",
+                area=self._area,
+                competitions_reused=len(urls_unchanged),
+                competitions_parsed=len(pages_changed),
+                team_pages_skipped=sum(
+                    len(parsed_competitions[url][0]) for url in urls_fresh
+                ),
+            )
+
+        return parsed_competitions, parsed_teams
+
     def _parse_urls_teams(self, soup):
         """Parses the URLs for each team as {team_name: URL, ...}."""
         tags_teams = [
@@ -366,7 +665,7 @@ class LZVCupParser(BaseScraper):
         # convert date to datetime
         df["date"] = pd.to_datetime(df["date"], format="%d/%m/%Y")
 
-        return df
+        return apply_dtypes(df)
 
     def _parse_competition_standings(self, soup):
         """Parses current competition standings."""
@@ -414,10 +713,8 @@ class LZVCupParser(BaseScraper):
             df["team"].apply(lambda x: x[2:]),
         )
 
-        # convert all but first column to numeric
-        df[headers[1:]] = df[headers[1:]].astype(float)
-
-        return df
+        # convert all but first column to numeric, as integers except for ptnm
+        return apply_dtypes(df)
 
     def _parse_team_stats(self, soup):
         """Parses player statistics (games, assists, goals, ...) into a pandas df."""
@@ -452,8 +749,7 @@ class LZVCupParser(BaseScraper):
         df = pd.merge(df, df_players_url, on="name", how="left")
 
         # convert certain columns to numeric
-        num_cols = ["wedstrijden", "goals", "assists"]
-        df[num_cols] = df[num_cols].astype(int)
+        df = apply_dtypes(df)
 
         # drop fairplay column
         df = df.drop(columns="fairplay")
@@ -486,9 +782,8 @@ class LZVCupParser(BaseScraper):
         # stitch together into a DataFrame
         df = pd.DataFrame(rows, columns=header)
         df["seizoen"] = df["seizoen"].apply(lambda x: x[:9])  # 20xx-20xx
-        df["positie"] = df["positie"].astype(int)
 
-        return df
+        return apply_dtypes(df)
 
     def _parse_players_url_from_rows(self, rows_html):
         """Parses the player URLs for given team as {player_name: URL, ...}."""
@@ -518,3 +813,144 @@ class LZVCupParser(BaseScraper):
             rows.append([self.clean_str(item.get_text()) for item in row])
 
         return rows_html, rows
+
+
+############################
+#### PARSING WORKERS     ###
+############################
+
+_worker_parser = None  # parser instance of a worker process
+_NO_TRANSPORT = Transport()  # parsing workers never fetch pages themselves
+
+
+def make_parsing_pool(config):
+    """
+    Creates the pool of worker processes for map_parse() if config["parsing"]
+    sets more than one worker, or returns None otherwise. Every worker holds an
+    LZVCupParser created from 'config' (with at least 'url_base'), and is started
+    from a forkserver or spawned (see get_mp_context()), so that it never forks the
+    threads of the fetching process. The pool is meant to be created once per run
+    and shut down at its end.
+    """
+    workers = config.get("parsing", {}).get("workers", 0)
+    if workers <= 1:
+        return None
+    return ProcessPoolExecutor(
+        max_workers=workers,
+        mp_context=get_mp_context(),
+        initializer=_init_worker,
+        initargs=({"url_base": config["url_base"], "parsing": config["parsing"]},),
+    )
+
+
+def map_parse(func, items, config=None, pool=None):
+    """
+    Applies func(parser, item) to all items and returns the results in order. With
+    a 'pool' from make_parsing_pool(), the items are sent in chunks of
+    config["parsing"]["chunksize"] to its worker processes, such that CPU-bound
+    parsing is not limited by the GIL of the fetching process. Otherwise they are
+    parsed inline by an LZVCupParser created from 'config'.
+    """
+    config = config or {}
+    items = list(items)
+    if pool is None or len(items) <= 1:
+        parser = LZVCupParser(config, transport=_NO_TRANSPORT)
+        return [func(parser, item) for item in items]
+
+    chunksize = config.get("parsing", {}).get("chunksize", 8)
+    return list(pool.map(_call_worker, repeat(func), items, chunksize=chunksize))
+
+
+def _init_worker(config):
+    global _worker_parser
+    _worker_parser = LZVCupParser(config, transport=_NO_TRANSPORT)
+
+
+def _call_worker(func, item):
+    return func(_worker_parser, item)
+
+
+def _parse_competition_page(parser, html):
+    """Parses teams, schedule and standings from a competition page."""
+    soup = parser.parse_html(html, parse_only=ONLY_COMPETITION)
+    return (
+        parser._parse_urls_teams(soup),
+        parser._parse_competition_schedule(soup),
+        parser._parse_competition_standings(soup),
+    )
+
+
+def _fingerprint_competition_page(html):
+    """
+    Hashes the team list, schedule and standings of a competition page, ignoring
+    everything else on the page. Uses lxml directly as this is much cheaper than
+    extracting the content.
+    """
+    digest = hashlib.sha256()
+    for element in lxml_html.fromstring(html).xpath(XPATH_COMPETITION):
+        digest.update(lxml_html.tostring(element))
+    return digest.hexdigest()
+
+
+def _parse_team_page(parser, html):
+    """Parses player stats and palmares from a team page (None if unavailable)."""
+    soup = parser.parse_html(html, parse_only=ONLY_TEAM)
+    try:
+        df_stats = parser._parse_team_stats(soup)
+    except AttributeError:
+        df_stats = None
+    try:
+        df_palmares = parser._parse_team_palmares(soup)
+    except AttributeError:
+        df_palmares = None
+    return df_stats, df_palmares
+
+
+def _parse_player_page(parser, player):
+    """Parses the historical statistics from a (name, html) player page."""
+    name, html = player
+
+    # grab table
+    df = pd.read_html(io.StringIO(html))[0]
+
+    # reformat table
+    df.columns = COLS_PLAYER_HISTORY[1:]
+
+    # add name
+    df["name"] = name
+
+    # reorder columns
+    df = df[COLS_PLAYER_HISTORY]
+
+    return apply_dtypes(df)
+
+
+def _split_changed_players(df_stats, df_stats_previous, df_history_previous):
+    """
+    Splits the players in 'df_stats' into those whose history has to be fetched
+    and the stored history rows of all others. A player is fetched again when
+    new, without stored history, or when the team, games, goals or assists of any
+    player sharing their name differ from the previous run (as the history is
+    stored by name).
+    """
+
+    def seasons(df):
+        df = df[COLS_PLAYER_SEASON].astype(str).drop_duplicates()
+        return {url: frozenset(map(tuple, g.values)) for url, g in df.groupby("url")}
+
+    seasons_current, seasons_previous = seasons(df_stats), seasons(df_stats_previous)
+    urls_changed = {
+        url
+        for url, season in seasons_current.items()
+        if seasons_previous.get(url) != season
+    }
+
+    df_players = df_stats[["name", "url"]].drop_duplicates()
+    names_changed = set(df_players.loc[df_players["url"].isin(urls_changed), "name"])
+    names_changed |= set(df_players["name"]) - set(df_history_previous["name"])
+
+    mask_fetch = df_players["name"].isin(names_changed)
+    mask_reuse = df_history_previous["name"].isin(
+        set(df_players["name"]) - names_changed
+    )
+    return df_players[mask_fetch], df_history_previous[mask_reuse]
@@ -0,0 +1,125 @@
+import hashlib
+import json
+import threading
+import zipfile
+from urllib.parse import urlsplit
+
+from scraper.utils.transport import Response, Transport
+
+
+class HTMLArchive:
+    def __init__(self, path, mode="r") -> None:
+        """
+        Compressed archive of fetched pages stored as a single zip file. Every
+        page is a deflated member named after the hash of its URL, and the member
+        index.json maps each URL to its member and content type. Use mode="w" to
+        record and mode="r" to replay.
+        """
+        self.path = path
+        self.mode = mode
+        self._lock = threading.Lock()
+        self._zip = zipfile.ZipFile(
+            path, mode, compression=zipfile.ZIP_DEFLATED, compresslevel=6
+        )
+        if mode == "r":
+            self.index = json.loads(self._zip.read("index.json"))
+        else:
+            self.index = {}
+
+        # also look up pages by path so an archive can be replayed on another host
+        self._paths = {self._url_path(url): url for url in self.index}
+
+    def __contains__(self, url):
+        return self._resolve(url) is not None
+
+    def __len__(self):
+        return len(self.index)
+
+    def add(self, url, content, headers=None):
+        """Adds a page to the archive."""
+        headers = headers or {}
+        name = f"pages/{hashlib.sha1(url.encode()).hexdigest()}.html"
+        with self._lock:
+            if url not in self.index:
+                self._zip.writestr(name, content)
+            self.index[url] = {
+                "name": name,
+                "content_type": headers.get("Content-Type"),
+            }
+
+    def get(self, url):
+        """Gets (content, headers) of a page, or None if it was not recorded."""
+        url = self._resolve(url)
+        if url is None:
+            return None
+        entry = self.index[url]
+        with self._lock:
+            content = self._zip.read(entry["name"])
+        headers = {}
+        if entry["content_type"] is not None:
+            headers["Content-Type"] = entry["content_type"]
+        return content, headers
+
+    def close(self):
+        """Writes the index (when recording) and closes the archive."""
+        with self._lock:
+            if self.mode != "r":
+                self._zip.writestr("index.json", json.dumps(self.index, indent=1))
+            self._zip.close()
+
+    def _resolve(self, url):
+        if url in self.index:
+            return url
+        return self._paths.get(self._url_path(url))
+
+    @staticmethod
+    def _url_path(url):
+        parts = urlsplit(url)
+        return f"{parts.path}?{parts.query}"
+
+
+class RecordingTransport(Transport):
+    def __init__(self, transport, archive) -> None:
+        """Fetches pages through the wrapped transport and records them."""
+        self.transport = transport
+        self.archive = archive
+        self.stats = transport.stats
+
+    def get_many(self, urls, headers=None):
+        pages = self.transport.get_many(urls, headers=headers)
+        for url, page in pages.items():
+            if page.status == 200:
+                self.archive.add(url, page.content, page.headers)
+        return pages
+
+    def close(self):
+        self.transport.close()
+        self.archive.close()
+
+
+class ReplayTransport(Transport):
+    def __init__(self, archive) -> None:
+        """
+        Serves pages from an archive without any network access. Pages that were
+        not recorded are answered with a 404.
+        """
+        super().__init__()
+        self.archive = archive
+
+    def get_many(self, urls, headers=None):
+        pages = {}
+        for url in dict.fromkeys(urls):
+            page = self.archive.get(url)
+            if page is None:
+                self.stats.record(url, failure=True)
+                pages[url] = Response(url, 404, {}, b"", None)
+                continue
+            content, headers_page = page
+            self.stats.record(url, nbytes=len(content))
+            pages[url] = Response(
+                url, 200, headers_page, content, self._decode(content, headers_page)
+            )
+        return pages
+
+    def close(self):
+        self.archive.close()
@@ -1,10 +1,11 @@
 import json
 
 import pandas as pd
-import requests
 import structlog
 from bs4 import BeautifulSoup
 
+from scraper.utils.transport import FetchError, Transport
+
 
 class DataStorage:
     def __init__(self) -> None:
@@ -38,12 +39,21 @@ class DataStorage:
 
 
 class BaseScraper(DataStorage):
-    def __init__(self, config={}, logger=structlog.getLogger(), **kwargs) -> None:
-        """Assigns config keys as separate attributes prefixed with _."""
+    def __init__(
+        self, config={}, logger=structlog.getLogger(), transport=None, **kwargs
+    ) -> None:
+        """
+        Assigns config keys as separate attributes prefixed with _. The transport
+        used to fetch pages is created from the 'fetch' config key unless one is
+        passed explicitly (e.g. to share a connection pool across scrapers).
+        """
         for name, value in config.items():
             setattr(self, f"_{name}", value)
 
         self._logger = logger
+        self._transport = transport or Transport.from_config(
+            getattr(self, "_fetch", {})
+        )
 
         for name, value in kwargs.items():
             setattr(self, name, value)
@@ -55,11 +65,44 @@ class BaseScraper(DataStorage):
         url_full = f"{self._url_base}/{url_end}"
         return url_full
 
-    def make_soup(self, url):
-        """Gets page via requests and parses into HTML via BeautifulSoup."""
-        page = requests.get(url)
-        if page.status_code == 200:
-            return BeautifulSoup(page.text, "html.parser")
+    def make_soup(self, url, parse_only=None):
+        """Gets page via the transport and parses into HTML via BeautifulSoup."""
+        return self.parse_html(self.fetch_page(url), parse_only=parse_only)
+
+    def fetch_page(self, url):
+        """Gets page via the transport and returns its HTML."""
+        return self.fetch_pages([url])[url]
+
+    def fetch_pages(self, urls, missing_ok=False):
+        """
+        Gets several pages as {URL: HTML, ...}. Depending on the transport, the
+        pages are loaded concurrently or one after the other. A page that can't
+        be fetched raises a FetchError, or is logged and returned as None if
+        'missing_ok' is True.
+        """
+        pages = {}
+        for url, page in self._transport.get_many(urls).items():
+            if page.status != 200:
+                if not missing_ok:
+                    raise FetchError(url, status=page.status)
+                self._logger.warning("Page not available", url=url, status=page.status)
+            pages[url] = page.text if page.status == 200 else None
+        return pages
+
+    def parse_html(self, html, parse_only=None):
+        """
+        Parses HTML into a BeautifulSoup object (None stays None). The parser
+        backend is taken from self._parsing (e.g. "lxml"), "html.parser" being the
+        default. With "html.parser", a SoupStrainer passed as 'parse_only'
+        restricts the tree to the matching elements, which saves building the rest
+        of the page. Other backends always build the full tree, since lxml parses a
+        full page faster than it filters one (see benchmarks/bench_backends.py).
+        """
+        if html is not None:
+            backend = getattr(self, "_parsing", {}).get("backend", "html.parser")
+            if backend != "html.parser":
+                parse_only = None
+            return BeautifulSoup(html, backend, parse_only=parse_only)
 
     def clean_str(self, string):
         """Strips whitespaces and alike from a string."""
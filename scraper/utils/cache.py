@@ -0,0 +1,286 @@
+import gzip
+import hashlib
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import defaultdict
+
+import pandas as pd
+
+from scraper.utils.transport import Response, Transport
+
+URL_CLASSES = {
+    "sportshall": r"sportshall|sporthal",
+    "competition": r"/results/\d+/\d+/\d+/?$",
+    "team": r"/teams?/",
+    "player": r"/(players?|spelers?)/",
+}
+
+
+class HTTPCache:
+    def __init__(self, dir_cache, max_bytes=500 * 2**20) -> None:
+        """
+        Persistent content-addressed store of HTTP responses. Bodies are stored
+        gzipped under objects/ by their SHA-256 digest (so identical pages are only
+        stored once) and an SQLite index maps every URL to its body, validators
+        (ETag, Last-Modified) and fetch time.
+        """
+        self.dir_cache = dir_cache
+        self.max_bytes = max_bytes
+        os.makedirs(f"{dir_cache}/objects", exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(f"{dir_cache}/index.db", check_same_thread=False)
+        self._db.execute("""
+            create table if not exists responses (
+                url text primary key,
+                digest text,
+                content_type text,
+                etag text,
+                last_modified text,
+                fetched_at real,
+                accessed_at real
+            )
+            """)
+
+    def lookup(self, url):
+        """Gets the index entry for a URL as a dict, or None if not cached."""
+        with self._lock:
+            cursor = self._db.execute("select * from responses where url = ?", (url,))
+            row = cursor.fetchone()
+        if row is not None:
+            return dict(zip([c[0] for c in cursor.description], row))
+
+    def load(self, entry):
+        """Loads the body of an index entry."""
+        with gzip.open(self._path(entry["digest"]), "rb") as f:
+            return f.read()
+
+    def store(self, url, content, headers):
+        """Stores a response body (if new) and points the URL to it."""
+        digest = hashlib.sha256(content).hexdigest()
+        path = self._path(digest)
+        if not os.path.exists(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with gzip.open(f"{path}.tmp", "wb") as f:
+                f.write(content)
+            os.replace(f"{path}.tmp", path)
+
+        now = time.time()
+        with self._lock, self._db:
+            self._db.execute(
+                "insert or replace into responses values (?, ?, ?, ?, ?, ?, ?)",
+                (
+                    url,
+                    digest,
+                    headers.get("Content-Type"),
+                    headers.get("ETag"),
+                    headers.get("Last-Modified"),
+                    now,
+                    now,
+                ),
+            )
+
+    def touch(self, url, fetched=False):
+        """Marks a URL as accessed, and as freshly fetched if revalidated."""
+        now = time.time()
+        with self._lock, self._db:
+            if fetched:
+                self._db.execute(
+                    "update responses set fetched_at = ?, accessed_at = ? "
+                    "where url = ?",
+                    (now, now, url),
+                )
+            else:
+                self._db.execute(
+                    "update responses set accessed_at = ? where url = ?", (now, url)
+                )
+
+    def evict(self):
+        """
+        Removes the least recently accessed entries until the bodies fit within
+        self.max_bytes, and deletes bodies no longer referenced by any URL.
+        """
+        with self._lock, self._db:
+            rows = self._db.execute("""
+                select digest, max(accessed_at) as accessed_at from responses
+                group by digest order by accessed_at desc
+                """).fetchall()
+
+            total, keep = 0, set()
+            for digest, _ in rows:
+                path = self._path(digest)
+                if not os.path.exists(path):
+                    continue
+                total += os.path.getsize(path)
+                if total > self.max_bytes:
+                    break
+                keep.add(digest)
+
+            evicted = [digest for digest, _ in rows if digest not in keep]
+            self._db.executemany(
+                "delete from responses where digest = ?", [(d,) for d in evicted]
+            )
+
+        # delete orphaned bodies
+        for root, _, files in os.walk(f"{self.dir_cache}/objects"):
+            for file in files:
+                if file.split(".")[0] not in keep:
+                    os.remove(os.path.join(root, file))
+
+        return len(evicted)
+
+    def size(self):
+        """Gets the total size in bytes of all stored bodies."""
+        return sum(
+            os.path.getsize(os.path.join(root, file))
+            for root, _, files in os.walk(f"{self.dir_cache}/objects")
+            for file in files
+        )
+
+    def close(self):
+        self._db.close()
+
+    def _path(self, digest):
+        return f"{self.dir_cache}/objects/{digest[:2]}/{digest}.gz"
+
+
+class CachingTransport(Transport):
+    def __init__(
+        self,
+        transport,
+        cache,
+        max_age_hours=None,
+        url_classes=URL_CLASSES,
+        evict=True,
+    ):
+        """
+        Serves pages from an HTTPCache while they are younger than the max age of
+        their URL class (e.g. {"team": 24, ...}), and otherwise revalidates them
+        through the wrapped transport with a conditional GET. Unknown classes and
+        classes without a max age are always revalidated. A page whose body has
+        gone missing from the cache is fetched again. The cache is only evicted on
+        close() if 'evict' is set, which should be done by a single process only.
+        """
+        self.transport = transport
+        self.cache = cache
+        self.evict = evict
+        self.max_age_hours = max_age_hours or {}
+        self.url_classes = {k: re.compile(v) for k, v in url_classes.items()}
+        self.stats = transport.stats
+        self.cache_stats = defaultdict(
+            lambda: {"hits": 0, "revalidated": 0, "misses": 0, "errors": 0}
+        )
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_config(cls, transport, cache, evict=True):
+        """Wraps a transport according to a cache config."""
+        return cls(
+            transport,
+            HTTPCache(cache["dir"], max_bytes=cache.get("max_mb", 500) * 2**20),
+            max_age_hours=cache.get("max_age_hours", {}),
+            url_classes=cache.get("url_classes", URL_CLASSES),
+            evict=evict,
+        )
+
+    def url_class(self, url):
+        """Classifies a URL as competition, team, player, sportshall or other."""
+        for name, pattern in self.url_classes.items():
+            if pattern.search(url):
+                return name
+        return "other"
+
+    def get_many(self, urls, headers=None):
+        urls = list(dict.fromkeys(urls))  # deduplicate but keep order
+        headers = headers or {}
+        pages, entries, headers_conditional = {}, {}, {}
+
+        # serve fresh pages from the cache and prepare validators for stale ones
+        now = time.time()
+        for url in urls:
+            url_class = self.url_class(url)
+            entry = self.cache.lookup(url)
+            if entry is None:
+                continue
+            entries[url] = entry
+            max_age = self.max_age_hours.get(url_class, 0) * 3600
+            if now - entry["fetched_at"] < max_age:
+                page = self._from_cache(url, entry)
+                if page is None:  # body gone, fetch it like an uncached page
+                    del entries[url]
+                    continue
+                pages[url] = page
+                self.cache.touch(url)
+                self._count(url_class, "hits")
+                continue
+            validators = {}
+            if entry["etag"] is not None:
+                validators["If-None-Match"] = entry["etag"]
+            if entry["last_modified"] is not None:
+                validators["If-Modified-Since"] = entry["last_modified"]
+            headers_conditional[url] = {**headers.get(url, {}), **validators}
+
+        # fetch the remaining pages, conditionally if possible
+        to_fetch = [url for url in urls if url not in pages]
+        fetched = self.transport.get_many(
+            to_fetch, headers={**headers, **headers_conditional}
+        )
+        while len(fetched) > 0:
+            refetch = []
+            for url, page in fetched.items():
+                url_class = self.url_class(url)
+                if page.status == 304 and url in entries:
+                    page_cached = self._from_cache(url, entries[url])
+                    if page_cached is None:  # body gone since the lookup
+                        del entries[url]
+                        refetch.append(url)
+                        continue
+                    pages[url] = page_cached
+                    self.cache.touch(url, fetched=True)
+                    self._count(url_class, "revalidated")
+                elif page.status == 200:
+                    pages[url] = page
+                    self.cache.store(url, page.content, page.headers)
+                    self._count(url_class, "misses")
+                else:
+                    pages[url] = page
+                    self._count(url_class, "errors")
+
+            # fetch the pages whose body went missing again, without validators
+            fetched = {}
+            if len(refetch) > 0:
+                fetched = self.transport.get_many(
+                    refetch, headers={url: headers.get(url, {}) for url in refetch}
+                )
+
+        return {url: pages[url] for url in urls}
+
+    def report(self):
+        """Returns the cache hits and misses per URL class as a DataFrame."""
+        with self._lock:
+            df = pd.DataFrame.from_dict(dict(self.cache_stats), orient="index")
+        return df.rename_axis("url_class")
+
+    def close(self):
+        self.transport.close()
+        if self.evict:
+            self.cache.evict()
+        self.cache.close()
+
+    def _count(self, url_class, key):
+        with self._lock:
+            self.cache_stats[url_class][key] += 1
+
+    def _from_cache(self, url, entry):
+        """Builds the Response of a cached page, or None if its body is missing."""
+        try:
+            content = self.cache.load(entry)
+        except FileNotFoundError:
+            return None
+        headers = {}
+        if entry["content_type"] is not None:
+            headers["Content-Type"] = entry["content_type"]
+        return Response(url, 200, headers, content, self._decode(content, headers))
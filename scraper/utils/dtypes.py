@@ -0,0 +1,85 @@
+import pandas as pd
+
+# the compact dtype of every known column, whatever table it is in; the dimension
+# columns repeat a few distinct names on many rows so they become categoricals,
+# and the counts fit in small (nullable) integer types
+DTYPES = {
+    # dimensions
+    "area": "category",
+    "region": "category",
+    "competition": "category",
+    "team": "category",
+    "team1": "category",
+    "team2": "category",
+    "sportshall": "category",
+    "seizoen": "category",
+    "reeks": "category",
+    "day": "category",
+    "level_name": "category",
+    # games and scores
+    "date": "datetime64[ns]",
+    "goals1": "Int8",
+    "goals2": "Int8",
+    # standings and palmares
+    "gespeeld": "Int16",
+    "gewonnen": "Int16",
+    "gelijk": "Int16",
+    "verloren": "Int16",
+    "dg": "Int16",
+    "dt": "Int16",
+    "ds": "Int16",
+    "punten": "Int16",
+    "ptnm": "float64",
+    "positie": "Int8",
+    "level": "Int8",
+    # player statistics
+    "wedstrijden": "Int16",
+    "goals": "Int16",
+    "assists": "Int16",
+}
+
+
+def apply_dtypes(df):
+    """Casts the columns of a DataFrame that are in DTYPES to their compact dtype."""
+    for col in df.columns.intersection(list(DTYPES)):
+        dtype = DTYPES[col]
+        if str(df[col].dtype) == dtype:
+            continue
+        if dtype == "category":
+            df[col] = df[col].astype("category")
+        elif dtype.startswith("datetime"):
+            df[col] = pd.to_datetime(df[col]).astype(dtype)
+        else:
+            df[col] = pd.to_numeric(df[col]).astype(dtype)
+    return df
+
+
+def plain_dtypes(df):
+    """Casts a DataFrame back to plain object and float64 columns, as parsed."""
+    dtypes = {}
+    for col, dtype in df.dtypes.items():
+        if isinstance(dtype, pd.CategoricalDtype):
+            dtypes[col] = object
+        elif pd.api.types.is_integer_dtype(dtype):
+            dtypes[col] = "float64"
+    return df.astype(dtypes)
+
+
+def memory_report(dict_tables):
+    """
+    Reports the in-memory size in bytes of every table with plain dtypes (before)
+    and with the compact dtypes of DTYPES (after) as a DataFrame.
+    """
+    rows = []
+    for name, df in dict_tables.items():
+        if df is None:
+            continue
+        rows.append(
+            {
+                "table": name,
+                "rows": len(df),
+                "before": int(plain_dtypes(df).memory_usage(deep=True).sum()),
+                "after": int(apply_dtypes(df.copy()).memory_usage(deep=True).sum()),
+            }
+        )
+    return pd.DataFrame(rows, columns=["table", "rows", "before", "after"])
@@ -0,0 +1,140 @@
+import json
+import os
+import shutil
+from datetime import datetime
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+from sqlalchemy import Date, Float, Integer, String
+
+from scraper.db.update import Tables
+
+ARROW_TYPES = {String: pa.string(), Integer: pa.int64(), Float: pa.float64()}
+
+
+def arrow_schema(table_class, columns):
+    """Gets the Arrow schema of the given columns from the ORM table_class."""
+    fields = []
+    for name in columns:
+        column = table_class.__table__.columns[name]
+        if isinstance(column.type, Date):
+            fields.append(pa.field(name, pa.date32()))
+        else:
+            fields.append(pa.field(name, ARROW_TYPES[type(column.type)]))
+    return pa.schema(fields)
+
+
+class ParquetExport:
+    def __init__(self, root, scrape_date=None, compression="zstd") -> None:
+        """
+        Exports tables as compressed Parquet datasets under <root>/<table>/,
+        partitioned as scrape_date=<date>/area=<area>/ (the area only for tables
+        that have one), such that readers load just the partitions and columns
+        they need. A table can be written in several chunks. The types come from
+        the table classes in Tables and the row counts of every partition are
+        kept in <root>/manifest.json. The scrape date defaults to today; writing
+        a table again for the same date replaces the partitions of that date.
+        """
+        self.root = root
+        self.scrape_date = scrape_date or datetime.now().strftime("%Y-%m-%d")
+        self.compression = compression
+        self._chunks = {}
+
+        self.manifest = {"tables": {}}
+        if os.path.exists(self.path_manifest):
+            with open(self.path_manifest, "r") as f:
+                self.manifest = json.load(f)
+
+    @property
+    def path_manifest(self):
+        return f"{self.root}/manifest.json"
+
+    def write(self, name, df):
+        """Appends a DataFrame (None is skipped) to the export of table 'name'."""
+        if df is None:
+            return
+
+        dir_table = f"{self.root}/{name}"
+        chunk = self._chunks.get(name, 0)
+        if chunk == 0:
+            # start over for this scrape date, keeping the other ones
+            shutil.rmtree(f"{dir_table}/scrape_date={self.scrape_date}", True)
+            partitions = self.manifest["tables"].get(name, {}).get("partitions", [])
+            self.manifest["tables"][name] = {
+                "partitions": [
+                    p for p in partitions if p["scrape_date"] != self.scrape_date
+                ]
+            }
+        self._chunks[name] = chunk + 1
+
+        # keep the columns of the table (e.g. a missing column is all null there)
+        table_class = getattr(Tables, name).value
+        columns = [c.name for c in table_class.__table__.columns if c.name != "id"]
+        df = df.reindex(columns=columns)
+        schema = arrow_schema(table_class, columns)
+        # cast like SQLite does for the column types, e.g. numbers in text columns,
+        # and null what is no number in a numeric column (e.g. '' or '20:30')
+        for field in schema:
+            values = df[field.name].astype(object)
+            if field.type == pa.date32():
+                df[field.name] = pd.to_datetime(values).dt.date
+            elif field.type == pa.string():
+                df[field.name] = values.where(values.isna(), values.astype(str))
+            elif field.type == pa.int64():
+                numbers = pd.to_numeric(values, errors="coerce")
+                df[field.name] = numbers.where(numbers % 1 == 0).astype("Int64")
+            elif field.type == pa.float64():
+                df[field.name] = pd.to_numeric(values, errors="coerce")
+        table = pa.Table.from_pandas(df, schema=schema, preserve_index=False)
+
+        partition_cols = ["scrape_date"] + (["area"] if "area" in df.columns else [])
+        table = table.append_column(
+            "scrape_date", pa.array([self.scrape_date] * len(table), pa.string())
+        )
+        pq.write_to_dataset(
+            table,
+            root_path=dir_table,
+            partition_cols=partition_cols,
+            basename_template=f"part-{chunk}-{{i}}.parquet",
+            existing_data_behavior="overwrite_or_ignore",
+            compression=self.compression,
+        )
+
+        # count the rows per partition, over all chunks
+        entry = self.manifest["tables"][name]
+        entry["schema"] = {field.name: str(field.type) for field in schema}
+        counts = (
+            df.assign(scrape_date=self.scrape_date)
+            .groupby(partition_cols, dropna=False, observed=True)
+            .size()
+            .rename("rows")
+            .reset_index()
+            .astype(object)
+            .where(lambda x: x.notna(), None)
+        )
+        for partition in counts.to_dict("records"):
+            keys = {col: partition[col] for col in partition_cols}
+            for p in entry["partitions"]:
+                if {col: p.get(col) for col in partition_cols} == keys:
+                    p["rows"] += int(partition["rows"])
+                    break
+            else:
+                entry["partitions"].append({**keys, "rows": int(partition["rows"])})
+        entry["rows"] = sum(p["rows"] for p in entry["partitions"])
+
+    def close(self):
+        """Writes the manifest."""
+        os.makedirs(self.root, exist_ok=True)
+        with open(f"{self.path_manifest}.tmp", "w") as f:
+            json.dump(self.manifest, f, indent=2, sort_keys=True)
+        os.replace(f"{self.path_manifest}.tmp", self.path_manifest)
+
+    @staticmethod
+    def read(root, name, columns=None, **partitions):
+        """
+        Reads an exported table, optionally only some columns and the partitions
+        matching e.g. area="LIMBURG" or scrape_date="2023-10-16".
+        """
+        filters = [(key, "=", value) for key, value in partitions.items()] or None
+        return pd.read_parquet(f"{root}/{name}", columns=columns, filters=filters)
@@ -0,0 +1,38 @@
+import hashlib
+import os
+import pickle
+
+
+class PageState:
+    def __init__(self, dir_state, kind="pages") -> None:
+        """
+        Persistent state kept between runs per key (e.g. a page URL), such as a
+        fingerprint of the page content and the rows extracted from it. Every key
+        gets its own pickle file under <dir_state>/<kind>/, so concurrent writers
+        for different keys never touch the same file.
+        """
+        self.dir_state = f"{dir_state}/{kind}"
+        os.makedirs(self.dir_state, exist_ok=True)
+
+    def load(self, key):
+        """Loads the state stored for a key, or None if there is none."""
+        path = self._path(key)
+        if not os.path.exists(path):
+            return None
+        with open(path, "rb") as f:
+            return pickle.load(f)
+
+    def save(self, key, state):
+        """Stores the state for a key, replacing the previous state atomically."""
+        path = self._path(key)
+        with open(f"{path}.tmp", "wb") as f:
+            pickle.dump(state, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(f"{path}.tmp", path)
+
+    def clear(self):
+        """Removes all stored states."""
+        for file in os.listdir(self.dir_state):
+            os.remove(f"{self.dir_state}/{file}")
+
+    def _path(self, key):
+        return f"{self.dir_state}/{hashlib.sha1(key.encode()).hexdigest()}.pkl"
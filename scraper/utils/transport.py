@@ -0,0 +1,466 @@
+import asyncio
+import random
+import re
+import threading
+import time
+from collections import defaultdict, namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+
+import aiohttp
+import pandas as pd
+import requests
+from requests.adapters import HTTPAdapter
+from requests.compat import chardet
+from requests.utils import get_encoding_from_headers
+
+try:  # brotli is only advertised when it can be decoded
+    import brotli  # noqa: F401
+
+    ACCEPT_ENCODING = "gzip, deflate, br"
+except ImportError:
+    ACCEPT_ENCODING = "gzip, deflate"
+
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+OK_STATUSES = {200, 304}  # 304 answers a conditional request
+
+Response = namedtuple("Response", ["url", "status", "headers", "content", "text"])
+
+
+class FetchError(Exception):
+    def __init__(self, url, status=None, reason=None) -> None:
+        """Raised when a page could not be fetched, even after retrying."""
+        self.url = url
+        self.status = status
+        super().__init__(f"Failed to fetch {url} (status={status}, reason={reason})")
+
+
+class ConcurrencyBudget:
+    def __init__(self, limit) -> None:
+        """
+        Caps the number of requests in flight across all threads and event loops
+        that share this budget (e.g. areas scraped in parallel).
+        """
+        self.limit = limit
+        self._in_use = 0
+        self._condition = threading.Condition()
+
+    def try_acquire(self):
+        """Takes a slot if one is free and returns whether it did."""
+        with self._condition:
+            if self._in_use < self.limit:
+                self._in_use += 1
+                return True
+            return False
+
+    def acquire(self):
+        """Blocks until a slot is free and takes it."""
+        with self._condition:
+            self._condition.wait_for(lambda: self._in_use < self.limit)
+            self._in_use += 1
+
+    async def acquire_async(self):
+        """Waits without blocking the event loop until a slot is free and takes it."""
+        while not self.try_acquire():
+            await asyncio.sleep(0.005)
+
+    def release(self):
+        with self._condition:
+            self._in_use -= 1
+            self._condition.notify()
+
+    def feedback(self, secs, status):
+        """Receives the duration and status (None if unreachable) of a request."""
+
+
+class RateController(ConcurrencyBudget):
+    def __init__(
+        self,
+        limit,
+        initial=None,
+        max_rps=None,
+        adaptive=True,
+        decrease=0.5,
+        latency_factor=3.0,
+    ) -> None:
+        """
+        Concurrency budget that adapts to the server (AIMD). The allowed number of
+        requests in flight grows by one per round of successful requests up to
+        'limit', and is multiplied by 'decrease' on a 429/5xx, a connection error
+        or a latency above 'latency_factor' times the average (at most once per
+        average latency, so one burst of errors counts once). Request starts are
+        additionally spaced to stay below 'max_rps' requests per second, if set.
+        """
+        self.max_limit = limit
+        self.max_rps = max_rps
+        self.adaptive = adaptive
+        self.decrease = decrease
+        self.latency_factor = latency_factor
+        self.decreases = 0
+
+        self._rate = float(initial or (max(1, limit // 4) if adaptive else limit))
+        self._latency = None  # moving average of successful requests
+        self._samples = 0
+        self._last_decrease = 0.0
+        self._next_start = 0.0
+        super().__init__(int(self._rate))
+
+    def acquire(self):
+        super().acquire()
+        time.sleep(self._pace())
+
+    async def acquire_async(self):
+        await super().acquire_async()
+        await asyncio.sleep(self._pace())
+
+    def feedback(self, secs, status):
+        """Adapts the budget to the outcome of a request that took 'secs'."""
+        if not self.adaptive:
+            return
+        with self._condition:
+            now = time.monotonic()
+            failed = status is None or status in RETRY_STATUSES
+            slow = (
+                self._samples >= 5
+                and secs > self.latency_factor * self._latency
+                and status in OK_STATUSES
+            )
+            if failed or slow:
+                if now - self._last_decrease > (self._latency or 0):
+                    self._rate = max(1.0, self._rate * self.decrease)
+                    self._last_decrease = now
+                    self.decreases += 1
+            else:
+                self._rate = min(self.max_limit, self._rate + 1 / self._rate)
+                self._samples += 1
+                if self._latency is None:
+                    self._latency = secs
+                else:
+                    self._latency += 0.1 * (secs - self._latency)
+            self.limit = int(self._rate)
+            self._condition.notify_all()
+
+    def _pace(self):
+        """Reserves the next start time allowed by max_rps and returns the wait."""
+        if self.max_rps is None:
+            return 0.0
+        with self._condition:
+            now = time.monotonic()
+            start = max(now, self._next_start)
+            self._next_start = start + 1 / self.max_rps
+        return start - now
+
+
+class TransportStats:
+    def __init__(self) -> None:
+        """Keeps thread-safe request counters per URL pattern."""
+        self._lock = threading.Lock()
+        self._stats = defaultdict(
+            lambda: {"requests": 0, "retries": 0, "failures": 0, "bytes": 0, "secs": 0}
+        )
+
+    @staticmethod
+    def url_pattern(url):
+        """Reduces a URL to its path with numbers masked, e.g. /teams/detail/*."""
+        return re.sub(r"\d+", "*", urlsplit(url).path) or "/"
+
+    def record(self, url, nbytes=0, secs=0.0, retry=False, failure=False):
+        """Accounts for a single request."""
+        with self._lock:
+            stats = self._stats[self.url_pattern(url)]
+            stats["requests"] += 1
+            stats["retries"] += int(retry)
+            stats["failures"] += int(failure)
+            stats["bytes"] += nbytes
+            stats["secs"] += secs
+
+    def report(self):
+        """Returns the counters as a DataFrame with one row per URL pattern."""
+        with self._lock:
+            df = pd.DataFrame.from_dict(dict(self._stats), orient="index")
+        if len(df) == 0:
+            return df
+        return df.rename_axis("pattern").sort_values("requests", ascending=False)
+
+
+class Transport:
+    def __init__(
+        self,
+        max_concurrency=16,
+        max_per_host=8,
+        retries=4,
+        backoff=0.5,
+        timeout=30,
+        adaptive=False,
+        max_rps=None,
+        stats=None,
+    ) -> None:
+        """
+        Base class for fetching pages with retries on 429/5xx and connection errors
+        using jittered exponential backoff. Subclasses implement get_many(), which
+        never raises but returns a Response with status None if a page could not
+        be reached at all. With 'adaptive' or 'max_rps' set, the global budget is a
+        RateController that finds the concurrency the server tolerates.
+        """
+        self.max_concurrency = max_concurrency
+        self.max_per_host = max_per_host
+        self.retries = retries
+        self.backoff = backoff
+        self.timeout = timeout
+        self.stats = stats or TransportStats()
+        self.headers = {"Accept-Encoding": ACCEPT_ENCODING}
+
+        # global and per-host caps shared by all concurrent get_many() calls
+        if adaptive or max_rps is not None:
+            self.budget = RateController(
+                max_concurrency, max_rps=max_rps, adaptive=adaptive
+            )
+        else:
+            self.budget = ConcurrencyBudget(max_concurrency)
+        self._budgets_host = defaultdict(lambda: ConcurrencyBudget(max_per_host))
+        self._lock_host = threading.Lock()
+
+    @classmethod
+    def from_config(cls, fetch=None, **kwargs):
+        """Creates the transport matching the 'mode' of a fetch config."""
+        fetch = dict(fetch or {})
+        mode = fetch.pop("mode", "sequential")
+        fetch.pop("history_workers", None)  # only for the player histories
+        if mode == "async":
+            return AiohttpTransport(**fetch, **kwargs)
+        if mode != "sequential":
+            raise ValueError(f"Unknown fetch mode '{mode}'")
+        fetch.update(max_concurrency=1, max_per_host=1)
+        return RequestsTransport(**fetch, **kwargs)
+
+    def get(self, url, headers=None):
+        """Gets a single page as a Response."""
+        return self.get_many([url], headers={url: headers or {}})[url]
+
+    def get_many(self, urls, headers=None):
+        """
+        Gets several pages as {URL: Response, ...}. Extra request headers can be
+        given per URL as {URL: {header: value}, ...}.
+        """
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+    def _budgets(self, url):
+        """Gets the global and the per-host budget a request to 'url' counts in."""
+        with self._lock_host:
+            return self.budget, self._budgets_host[urlsplit(url).netloc]
+
+    def _backoff_delay(self, attempt, headers=None):
+        """Computes how long to wait before a retry, respecting Retry-After."""
+        retry_after = (headers or {}).get("Retry-After")
+        if retry_after is not None and retry_after.isdigit():
+            return float(retry_after)
+        return self.backoff * 2**attempt * random.uniform(0.5, 1.5)
+
+    @staticmethod
+    def _decode(content, headers):
+        """Decodes the body the same way requests does for Response.text."""
+        encoding = get_encoding_from_headers(headers)
+        if encoding is None:
+            encoding = chardet.detect(content)["encoding"] or "utf-8"
+        return str(content, encoding, errors="replace")
+
+
+class RequestsTransport(Transport):
+    def __init__(self, **kwargs) -> None:
+        """
+        Fetches pages through keep-alive requests sessions that share a single
+        connection pool sized to the fetch concurrency. Each thread gets its own
+        session since a requests.Session is not thread-safe.
+        """
+        super().__init__(**kwargs)
+        self._adapter = HTTPAdapter(
+            pool_connections=10,
+            pool_maxsize=self.max_per_host,
+            pool_block=True,
+            max_retries=0,
+        )
+        self._local = threading.local()
+
+    def get_many(self, urls, headers=None):
+        urls = list(dict.fromkeys(urls))  # deduplicate but keep order
+        headers = headers or {}
+        if self.max_concurrency == 1 or len(urls) <= 1:
+            return {url: self._request(url, headers.get(url)) for url in urls}
+        with ThreadPoolExecutor(max_workers=self.max_concurrency) as executor:
+            pages = executor.map(lambda url: self._request(url, headers.get(url)), urls)
+            return dict(zip(urls, pages))
+
+    def close(self):
+        self._adapter.close()
+
+    def _session(self):
+        """Gets the session of the current thread."""
+        session = getattr(self._local, "session", None)
+        if session is None:
+            session = requests.Session()
+            session.headers.update(self.headers)
+            session.mount("http://", self._adapter)
+            session.mount("https://", self._adapter)
+            self._local.session = session
+        return session
+
+    def _request(self, url, headers=None):
+        """Gets a page, retrying on transient errors."""
+        for attempt in range(self.retries + 1):
+            last_attempt = attempt == self.retries
+            budgets = self._budgets(url)
+            for budget in budgets:
+                budget.acquire()
+            start = time.perf_counter()
+            try:
+                page = self._session().get(url, headers=headers, timeout=self.timeout)
+            except (requests.ConnectionError, requests.Timeout):
+                self.budget.feedback(time.perf_counter() - start, None)
+                self.stats.record(
+                    url,
+                    secs=time.perf_counter() - start,
+                    retry=attempt > 0,
+                    failure=last_attempt,
+                )
+                if last_attempt:
+                    return Response(url, None, {}, b"", None)
+                time.sleep(self._backoff_delay(attempt))
+                continue
+            finally:
+                for budget in budgets:
+                    budget.release()
+
+            self.budget.feedback(time.perf_counter() - start, page.status_code)
+            nbytes = page.raw.tell() or len(page.content)  # compressed size
+            retry = page.status_code in RETRY_STATUSES
+            self.stats.record(
+                url,
+                nbytes=nbytes,
+                secs=time.perf_counter() - start,
+                retry=attempt > 0,
+                failure=page.status_code not in OK_STATUSES
+                and (last_attempt or not retry),
+            )
+            if retry and not last_attempt:
+                time.sleep(self._backoff_delay(attempt, page.headers))
+                continue
+
+            return Response(
+                url, page.status_code, page.headers, page.content, page.text
+            )
+
+
+class AiohttpTransport(Transport):
+    def __init__(self, **kwargs) -> None:
+        """
+        Fetches many pages concurrently using asyncio and aiohttp. The number of
+        requests in flight is capped globally by 'max_concurrency' and per host
+        by 'max_per_host'. All requests go through a single keep-alive session
+        on an event loop that runs in a background thread until close(), so the
+        connections are reused across calls (also for single pages) and threads.
+        """
+        super().__init__(**kwargs)
+        self._loop = None
+        self._thread = None
+        self._session = None
+        self._lock_loop = threading.Lock()
+
+    def get_many(self, urls, headers=None):
+        urls = list(dict.fromkeys(urls))  # deduplicate but keep order
+        if len(urls) == 0:
+            return {}
+        future = asyncio.run_coroutine_threadsafe(
+            self._get_many(urls, headers or {}), self._event_loop()
+        )
+        return future.result()
+
+    def close(self):
+        """Closes the session and stops its event loop."""
+        with self._lock_loop:
+            if self._loop is None:
+                return
+            if self._session is not None:
+                asyncio.run_coroutine_threadsafe(
+                    self._session.close(), self._loop
+                ).result()
+            self._loop.call_soon_threadsafe(self._loop.stop)
+            self._thread.join()
+            self._loop.close()
+            self._loop, self._thread, self._session = None, None, None
+
+    def _event_loop(self):
+        """Gets the event loop of the transport, starting it on first use."""
+        with self._lock_loop:
+            if self._loop is None:
+                self._loop = asyncio.new_event_loop()
+                self._thread = threading.Thread(
+                    target=self._loop.run_forever, daemon=True
+                )
+                self._thread.start()
+            return self._loop
+
+    async def _get_many(self, urls, headers):
+        """Schedules all requests on the session within the concurrency caps."""
+        if self._session is None:  # created on the event loop that uses it
+            connector = aiohttp.TCPConnector(
+                limit=self.max_concurrency, limit_per_host=self.max_per_host
+            )
+            self._session = aiohttp.ClientSession(
+                connector=connector,
+                timeout=aiohttp.ClientTimeout(total=self.timeout),
+                headers=self.headers,
+            )
+        pages = await asyncio.gather(
+            *[self._request(self._session, url, headers.get(url)) for url in urls]
+        )
+        return dict(zip(urls, pages))
+
+    async def _request(self, session, url, headers=None):
+        """Gets a page, retrying on transient errors."""
+        for attempt in range(self.retries + 1):
+            last_attempt = attempt == self.retries
+            budgets = self._budgets(url)
+            for budget in budgets:
+                await budget.acquire_async()
+            start = time.perf_counter()
+            try:
+                async with session.get(url, headers=headers) as page:
+                    content = await page.read()
+                    status, headers_page = page.status, page.headers
+            # asyncio.TimeoutError is distinct from TimeoutError before Python 3.11
+            except (aiohttp.ClientConnectionError, asyncio.TimeoutError):  # noqa: UP041
+                self.budget.feedback(time.perf_counter() - start, None)
+                self.stats.record(
+                    url,
+                    secs=time.perf_counter() - start,
+                    retry=attempt > 0,
+                    failure=last_attempt,
+                )
+                if last_attempt:
+                    return Response(url, None, {}, b"", None)
+                await asyncio.sleep(self._backoff_delay(attempt))
+                continue
+            finally:
+                for budget in budgets:
+                    budget.release()
+
+            self.budget.feedback(time.perf_counter() - start, status)
+            nbytes = int(headers_page.get("Content-Length", len(content)))  # compressed
+            retry = status in RETRY_STATUSES
+            self.stats.record(
+                url,
+                nbytes=nbytes,
+                secs=time.perf_counter() - start,
+                retry=attempt > 0,
+                failure=status not in OK_STATUSES and (last_attempt or not retry),
+            )
+            if retry and not last_attempt:
+                await asyncio.sleep(self._backoff_delay(attempt, headers_page))
+                continue
+
+            return Response(
+                url, status, headers_page, content, self._decode(content, headers_page)
+            )
@@ -1,3 +1,4 @@
+import multiprocessing
 import os
 from ast import literal_eval
 from datetime import datetime
@@ -7,6 +8,8 @@ import pandas as pd
 from geopy.extra.rate_limiter import RateLimiter
 from geopy.geocoders import Nominatim
 
+from scraper.utils.dtypes import apply_dtypes
+
 
 def ymd():
     """Returns current timestamp as YYYYMMDD."""
@@ -30,11 +33,26 @@ def chunks(lst, n):
         yield lst[i : i + n]
 
 
+def get_mp_context():
+    """
+    Gets the context to start worker processes with. Workers are started from a
+    fresh forkserver (or spawned where that is not available) rather than forked,
+    as forking a process that runs other threads can deadlock the children.
+    """
+    methods = multiprocessing.get_all_start_methods()
+    return multiprocessing.get_context(
+        "forkserver" if "forkserver" in methods else "spawn"
+    )
+
+
 def add_columns_to_df(df, dcols={}):
-    """Adds columns to input DataFrame using {column_name: value, ...}."""
+    """
+    Adds columns to input DataFrame using {column_name: value, ...}, which are
+    cast to their compact dtype (see DTYPES) along with the other columns.
+    """
     for cname, value in dcols.items():
         df[cname] = value
-    return df
+    return apply_dtypes(df)
 
 
 def postproces_df(df, first_cols=[], drop_cols=[]):
@@ -52,11 +70,17 @@ def postproces_df(df, first_cols=[], drop_cols=[]):
     # drop duplicate rows
     df = df.drop_duplicates()
 
+    # enforce the compact dtypes, also on frames that were concatenated
+    df = apply_dtypes(df.copy())
+
     return df
 
 
-def add_coordinates(df, dir_coordinates="data/_coordinates.csv"):
-    """Adds coordinates to DataFrame using address, sportshall and area columns."""
+def add_coordinates(df, dir_coordinates="data/_coordinates.csv", geocode=True):
+    """
+    Adds coordinates to DataFrame using address, sportshall and area columns. With
+    geocode=False, only the known coordinates are used and none are looked up.
+    """
     # try to read in existing coordinates first
     if os.path.exists(dir_coordinates):
         df_coordinates = pd.read_csv(
@@ -66,6 +90,12 @@ def add_coordinates(df, dir_coordinates="data/_coordinates.csv"):
     else:
         df["coordinates"] = None
 
+    if not geocode:
+        df["coordinates"] = [
+            c if isinstance(c, tuple) else None for c in df["coordinates"]
+        ]
+        return _split_coordinates(df)
+
     # fill in missing coordinates
     geolocator = RateLimiter(
         Nominatim(user_agent="address_finder_futsalfriend_scraper").geocode,
@@ -100,6 +130,11 @@ def add_coordinates(df, dir_coordinates="data/_coordinates.csv"):
     df_coordinates_new = df_coordinates_new.reset_index(drop=True)
     df_coordinates_new.to_csv(dir_coordinates, index=False)
 
+    return _split_coordinates(df)
+
+
+def _split_coordinates(df):
+    """Splits the coordinates column into latitude and longitude columns."""
     # split coordinates into latitude and longitude
     df["latitude"] = df["coordinates"].apply(lambda x: None if x is None else x[0])
     df["longitude"] = df["coordinates"].apply(lambda x: None if x is None else x[1])
@@ -131,7 +166,7 @@ def create_levels_table(df_standings, df_palmares):
 
     # create features related to the palmares of each team
     df_palmares_stats = (
-        df_palmares.groupby("team")
+        df_palmares.groupby("team", observed=True)
         .agg(n_seizoenen=("seizoen", "count"), avg_pos=("positie", "mean"))
         .reset_index()
     )
@@ -161,4 +196,4 @@ def create_levels_table(df_standings, df_palmares):
     df["level"] = pd.qcut(df["score"], q=[0.0, 0.20, 0.80, 1.0], labels=[3, 2, 1])
     df["level_name"] = df["level"].map(level_mapping)
 
-    return df[["team", "level", "level_name"]]
+    return apply_dtypes(df[["team", "level", "level_name"]].copy())
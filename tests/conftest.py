@@ -0,0 +1,312 @@
+import random
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from scraper.parsers.lzvcup import LZVCupParser
+from scraper.utils.archive import HTMLArchive, RecordingTransport
+from scraper.utils.base import DataStorage
+from scraper.utils.transport import RequestsTransport
+
+AREA = "VLAAMS BRABANT"
+URL_AREA = "results/5"
+REGIONS = [
+    "Regio Dames Oost-Brabant",
+    "Regio Hageland",
+    "Regio Leuven",
+    "Regio Leuven Studenten",
+    "Regio Pajottenland",
+    "Regio Ring Oost",
+]
+COMPETITIONS = ["1e Klasse", "2e Klasse"]
+N_TEAMS = 4
+N_PLAYERS = 5
+
+
+def _li(cols, header=False):
+    """Renders a row of a table-like list as used on lzvcup.be."""
+    if header:
+        divs = "".join(f'<div class="item-col-header">{c}</div>' for c in cols)
+        return f'<li class="item item-list-header">{divs}</li>'
+    divs = "".join(
+        f'<div class="item-col col-{i + 1}">{c}</div>' for i, c in enumerate(cols)
+    )
+    return f'<li class="item">{divs}</li>'
+
+
+def build_site(seed=42):
+    """Builds a small synthetic copy of the LZV Cup website as {path: HTML}."""
+    rng = random.Random(seed)
+    pages = {}
+
+    buttons, cards = [], []
+    for r, region in enumerate(REGIONS):
+        links = []
+        halls = []
+        for c, competition in enumerate(COMPETITIONS):
+            path_competition = f"/{URL_AREA}/{r}/{c}"
+            links.append(
+                f'<a class="btn btn-outline-primary" href="{path_competition}">'
+                f"{competition}</a>"
+            )
+
+            teams = [f"ZVC {region[6:]} {c}{t}" for t in range(N_TEAMS)]
+            hall = f"Sporthal {region[6:]} {c}"
+            halls.append(hall)
+
+            # teams list
+            teams_html = "".join(
+                f'<div class="col-10 text-nowrap">'
+                f'<a href="/teams/detail/{r}{c}{t}">{team}</a></div>'
+                for t, team in enumerate(teams)
+            )
+
+            # schedule with played and unplayed games
+            rows = []
+            for g, (t1, t2) in enumerate(
+                [(a, b) for a in teams for b in teams if a != b]
+            ):
+                day = 10 + g % 18
+                score = f"{rng.randint(0, 9)} - {rng.randint(0, 9)}" if g % 3 else "-"
+                time_str = f"ma {day:02d}/10/2023 20u30"
+                rows.append(_li([time_str, t1, score, t2, hall, ""]))
+            rows.append(_li(["Nog te plannen", "", "", "", "", ""]))
+            schedule_html = (
+                '<div class="items calendar-list"><ul class="item-list striped">'
+                + "".join(rows)
+                + "</ul></div>"
+            )
+
+            # standings
+            rows = [
+                _li(["Ploeg", "G", "W", "D", "V", "DG", "DT", "DS", "P", "PTNM"], 1)
+            ]
+            for t, team in enumerate(teams):
+                stats = [rng.randint(0, 12) for _ in range(8)]
+                rows.append(_li([f"{t + 1}{team}"] + [str(s) for s in stats] + ["1.5"]))
+            standings_html = (
+                '<div class="items table-list lzvtable"><ul class="item-list striped">'
+                + "".join(rows)
+                + "</ul></div>"
+            )
+
+            pages[path_competition] = (
+                f"<html><body>{teams_html}{schedule_html}{standings_html}"
+                "</body></html>"
+            )
+
+            # team pages
+            for t, team in enumerate(teams):
+                rows = [
+                    _li(
+                        [
+                            "#",
+                            "Teamleden",
+                            "Fairplay",
+                            "Wedstrijden",
+                            "Goals",
+                            "Assists",
+                        ],
+                        header=True,
+                    )
+                ]
+                for p in range(N_PLAYERS):
+                    path_player = f"/players/detail/{r}{c}{t}{p}"
+                    name = f"Speler {r}{c}{t}{p}"
+                    games, goals, assists = (rng.randint(0, 9) for _ in range(3))
+                    rows.append(
+                        _li(
+                            [
+                                str(p + 1),
+                                f'<a href="{path_player}">{name}</a>',
+                                "",
+                                str(games),
+                                str(goals),
+                                str(assists),
+                            ]
+                        )
+                    )
+                    history = "".join(
+                        f"<tr><td>{2022 - s}-{2023 - s}</td><td>{team}</td>"
+                        f"<td>{games + s}</td><td>{goals}</td><td>{assists}</td>"
+                        f"<td>{competition}</td><td>{s + 1}</td></tr>"
+                        for s in range(2)
+                    )
+                    pages[path_player] = (
+                        "<html><body><table><thead><tr><th>Seizoen</th><th>Team</th>"
+                        "<th>W</th><th>G</th><th>A</th><th>Reeks</th><th>Stand</th>"
+                        f"</tr></thead><tbody>{history}</tbody></table></body></html>"
+                    )
+                palmares = "".join(
+                    f"<tr><td>{2022 - s}-{2023 - s} </td><td>{competition}</td>"
+                    f"<td>{rng.randint(1, 12)}</td><td></td></tr>"
+                    for s in range(3)
+                )
+                pages[f"/teams/detail/{r}{c}{t}"] = (
+                    '<html><body><ul class="item-list striped">'
+                    + "".join(rows)
+                    + '</ul><table class="lzvtable"><thead><tr><th>Seizoen</th>'
+                    "<th>Reeks</th><th>Positie</th><th></th></tr></thead>"
+                    f"<tbody>{palmares}</tbody></table></body></html>"
+                )
+
+        # sportshalls page
+        path_halls = f"/{URL_AREA}/{r}/sportshalls"
+        links.append(
+            f'<a class="btn btn-outline-primary" href="{path_halls}">Sporthallen</a>'
+        )
+        pages[path_halls] = (
+            "<html><body>"
+            + "".join(
+                f'<div class="card lzv2020card"><h5 class="card-title">Sporthal: '
+                f'{hall}</h5><p class="card-text">Straat {h}<br/>016 00 00 0{h}<br/>'
+                f'info{h}@example.be</p><a class="btn btn-outline-primary" '
+                f'href="/sportshalls/{r}{h}">Info</a></div>'
+                for h, hall in enumerate(halls)
+            )
+            + "</body></html>"
+        )
+
+        buttons.append(
+            f'<button class="btn btn-link btn-block text-left collapsed">\n\t{region}'
+            "\n</button>"
+        )
+        cards.append(f'<div class="card-body row">{"".join(links)}</div>')
+
+    pages[f"/{URL_AREA}"] = (
+        f"<html><body>{''.join(buttons)}{''.join(cards)}</body></html>"
+    )
+
+    return pages
+
+
+class SiteServer(ThreadingHTTPServer):
+    """Local stand-in for lzvcup.be that serves the pages from build_site()."""
+
+    daemon_threads = True
+
+    def __init__(self, pages, delay=0.0):
+        super().__init__(("127.0.0.1", 0), _SiteHandler)
+        self.pages = pages
+        self.delay = delay
+        self.requests = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.connections = 0
+        self.lock = threading.Lock()
+        self.hook = None  # optional callable(server, handler) -> (status, headers)
+
+    def process_request(self, request, client_address):
+        with self.lock:
+            self.connections += 1
+        super().process_request(request, client_address)
+
+    @property
+    def url_base(self):
+        return f"http://127.0.0.1:{self.server_address[1]}"
+
+
+class _SiteHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        server = self.server
+        with server.lock:
+            server.requests.append(self.path)
+            server.in_flight += 1
+            server.max_in_flight = max(server.max_in_flight, server.in_flight)
+        try:
+            time.sleep(server.delay)
+            status, headers = 200, {}
+            if server.hook is not None:
+                status, headers = server.hook(server, self)
+            body = server.pages.get(self.path)
+            if body is None:
+                status = 404
+            self.send_response(status)
+            self.send_header("Content-Type", "text/html; charset=utf-8")
+            for key, value in headers.items():
+                self.send_header(key, value)
+            content = (body or "").encode() if status == 200 else b""
+            self.send_header("Content-Length", str(len(content)))
+            self.end_headers()
+            self.wfile.write(content)
+        finally:
+            with server.lock:
+                server.in_flight -= 1
+
+
+@contextmanager
+def serve_site(delay=0.0):
+    """Runs the synthetic LZV Cup website on a local port."""
+    server = SiteServer(build_site(), delay=delay)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        yield server
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+@pytest.fixture
+def site():
+    with serve_site(delay=0.01) as server:
+        yield server
+
+
+@pytest.fixture
+def site_config(site):
+    return {"url_base": site.url_base, "area": AREA, "url_area": URL_AREA}
+
+
+@pytest.fixture(scope="session")
+def site_archive(tmp_path_factory):
+    """Records all pages of a full scrape of the synthetic website into an archive."""
+    path = tmp_path_factory.mktemp("archive") / "lzvcup.zip"
+
+    with serve_site() as server:
+        transport = RecordingTransport(RequestsTransport(), HTMLArchive(path, mode="w"))
+        parser = LZVCupParser(
+            {"url_base": server.url_base, "area": AREA, "url_area": URL_AREA},
+            transport=transport,
+        )
+        df_sportshalls_urls, df_competitions_urls = parser.parse_region_cards()
+        dfs = parser.parse_competitions_and_teams(df_competitions_urls)
+        parser.parse_sportshalls(df_sportshalls_urls)
+        LZVCupParser.parse_player_stats_history(dfs[3], transport=transport)
+        transport.close()
+
+    return path
+
+
+@pytest.fixture
+def pipeline_config(tmp_path):
+    """The scraper config limited to the synthetic area and writing to tmp_path."""
+    config = DataStorage.load_json("scraper/config/config.json")
+    config.update(
+        {
+            "url_base": "https://www.lzvcup.be",
+            "areas": {AREA: URL_AREA},
+            "cache": {"enabled": False},
+            "incremental": {
+                **config["incremental"],
+                "dir_state": str(tmp_path / "state"),
+            },
+            "checkpoint": {
+                **config["checkpoint"],
+                "dir": str(tmp_path / "checkpoint"),
+            },
+            "dir_output": str(tmp_path),
+            "database": str(tmp_path / "futsalfriend.db"),
+            "snapshots": {**config["snapshots"], "dir": str(tmp_path / "snapshots")},
+            "dir_last_updated": str(tmp_path / "last_updated.txt"),
+        }
+    )
+    return config
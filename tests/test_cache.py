@@ -0,0 +1,101 @@
+import hashlib
+import os
+
+import pytest
+
+from scraper.utils.cache import CachingTransport, HTTPCache
+from scraper.utils.transport import RequestsTransport
+
+
+def with_etags(server, request):
+    """Answers conditional requests like a server that supports ETags."""
+    etag = hashlib.md5(server.pages.get(request.path, "").encode()).hexdigest()
+    if request.headers.get("If-None-Match") == etag:
+        return 304, {"ETag": etag}
+    return 200, {"ETag": etag}
+
+
+def test_cache_serves_fresh_pages_without_requests(site, tmp_path):
+    urls = [f"{site.url_base}{path}" for path in list(site.pages)[:10]]
+    cache = HTTPCache(tmp_path)
+    max_age_hours = dict.fromkeys(["competition", "team", "player", "other"], 1)
+
+    transport = CachingTransport(RequestsTransport(), cache, max_age_hours)
+    pages_first = transport.get_many(urls)
+    transport = CachingTransport(RequestsTransport(), cache, max_age_hours)
+    pages_second = transport.get_many(urls)
+
+    assert len(site.requests) == 10
+    assert transport.report()["hits"].sum() == 10
+    assert [p.text for p in pages_first.values()] == [
+        p.text for p in pages_second.values()
+    ]
+
+
+def test_cache_revalidates_stale_pages(site, tmp_path):
+    site.hook = with_etags
+    url = f"{site.url_base}/teams/detail/000"
+    cache = HTTPCache(tmp_path)
+
+    transport = CachingTransport(RequestsTransport(), cache, {"team": 0})
+    page_first = transport.get(url)
+    page_second = transport.get(url)
+
+    assert len(site.requests) == 2
+    assert transport.report().loc["team"].to_dict() == {
+        "hits": 0,
+        "revalidated": 1,
+        "misses": 1,
+        "errors": 0,
+    }
+    assert page_second.status == 200
+    assert page_second.text == page_first.text
+
+
+def test_cache_evicts_least_recently_used(site, tmp_path):
+    urls = [f"{site.url_base}{path}" for path in list(site.pages)[:10]]
+    cache = HTTPCache(tmp_path, max_bytes=1)
+
+    transport = CachingTransport(RequestsTransport(), cache)
+    transport.get_many(urls)
+    transport.close()
+
+    assert HTTPCache(tmp_path).size() == 0
+    assert HTTPCache(tmp_path).lookup(urls[0]) is None
+
+
+@pytest.mark.parametrize("max_age", [0, 1])
+def test_cache_refetches_pages_with_missing_body(site, tmp_path, max_age):
+    site.hook = with_etags
+    urls = [f"{site.url_base}{path}" for path in list(site.pages)[:4]]
+    cache = HTTPCache(tmp_path)
+    max_age_hours = dict.fromkeys(["competition", "team", "player", "other"], max_age)
+    transport = CachingTransport(RequestsTransport(), cache, max_age_hours)
+    pages_first = transport.get_many(urls)
+
+    # another process evicted the bodies while their index rows remain
+    for dir_objects, _, files in os.walk(tmp_path / "objects"):
+        for file in files:
+            os.remove(os.path.join(dir_objects, file))
+    transport = CachingTransport(RequestsTransport(), cache, max_age_hours)
+    pages_second = transport.get_many(urls)
+
+    # stale pages are revalidated before the missing body shows
+    assert len(site.requests) == 4 + 4 + (4 if max_age == 0 else 0)
+    assert transport.report()["misses"].sum() == 4
+    assert [p.text for p in pages_first.values()] == [
+        p.text for p in pages_second.values()
+    ]
+
+
+def test_cache_is_only_evicted_by_owner(site, tmp_path):
+    urls = [f"{site.url_base}{path}" for path in list(site.pages)[:10]]
+
+    transport = CachingTransport(
+        RequestsTransport(), HTTPCache(tmp_path, max_bytes=1), evict=False
+    )
+    transport.get_many(urls)
+    transport.close()
+
+    assert HTTPCache(tmp_path).size() > 0
+    assert HTTPCache(tmp_path).lookup(urls[0]) is not None
@@ -0,0 +1,40 @@
+import os
+import sqlite3
+import sys
+
+# the webapp modules import each other as top-level modules
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(__file__)), "webapp"))
+
+from connection import SQLiteConnection
+
+
+def create_teams(path2db, teams):
+    connection = sqlite3.connect(path2db)
+    with connection:
+        connection.execute("CREATE TABLE teams (team TEXT, region TEXT)")
+        connection.executemany("INSERT INTO teams VALUES (?, ?)", teams)
+    connection.close()
+
+
+def test_queries_bind_parameters_and_reconnect(tmp_path):
+    path2db = str(tmp_path / "futsalfriend.db")
+    create_teams(path2db, [("Jong 't Stad", "Leuven"), ("ZVC Copains", "Hageland")])
+    connection = SQLiteConnection(path2db)
+    q = "select region from teams where team = :team;"
+
+    assert connection.query(q, {"team": "Jong 't Stad"})["region"].tolist() == [
+        "Leuven"
+    ]
+    assert connection.query(q, {"team": "' or 1 = 1 --"}).empty
+
+    # a new version of the database is only seen after a reset
+    path_build = str(tmp_path / "futsalfriend.db.build")
+    create_teams(path_build, [("Jong 't Stad", "Pajottenland")])
+    os.replace(path_build, path2db)
+    assert connection.query(q, {"team": "Jong 't Stad"})["region"].tolist() == [
+        "Leuven"
+    ]
+    connection.reset()
+    assert connection.query(q, {"team": "Jong 't Stad"})["region"].tolist() == [
+        "Pajottenland"
+    ]
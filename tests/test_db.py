@@ -0,0 +1,265 @@
+import ast
+import glob
+import re
+import sqlite3
+
+import pandas as pd
+import pytest
+import structlog
+from structlog.testing import capture_logs
+
+from scraper.db.dimensions import normalize_database
+from scraper.db.serving import SERVING_TABLES, create_serving_tables
+from scraper.db.sqlitedb import BUILD_PRAGMAS, SQLiteDB
+from scraper.db.update import Tables, refresh_database
+from scraper.db.versions import DatabaseVersions
+from scraper.main import process_data, scrape, store
+from scraper.utils.archive import HTMLArchive, ReplayTransport
+
+
+def read_webapp_queries():
+    """Collects the SQL in the webapp code, with every f-string field set to 0."""
+    queries = []
+    for path in sorted(glob.glob("webapp/**/*.py", recursive=True)):
+        if path == "webapp/geocode.py":  # queries its own cache database
+            continue
+        with open(path, encoding="utf-8") as f:
+            tree = ast.parse(f.read())
+        fields = {
+            id(value)
+            for node in ast.walk(tree)
+            if isinstance(node, ast.JoinedStr)
+            for value in node.values
+        }
+        for node in ast.walk(tree):
+            if isinstance(node, ast.JoinedStr):
+                query = "".join(
+                    v.value if isinstance(v, ast.Constant) else "0" for v in node.values
+                )
+            elif isinstance(node, ast.Constant) and id(node) not in fields:
+                query = node.value
+            else:
+                continue
+            if isinstance(query, str) and re.match(
+                r"\s*(select|with)\b", query, re.IGNORECASE
+            ):
+                queries.append(query)
+    return queries
+
+
+def read_sql_queries(path="database/queries.sql"):
+    """Splits a file of SQL statements into separate queries."""
+    with open(path, "r") as f:
+        return [query for query in f.read().split(";") if query.strip()]
+
+
+def test_bulk_insert_identical_to_orm(site_archive, pipeline_config, tmp_path):
+    log = structlog.get_logger()
+    transport = ReplayTransport(HTMLArchive(site_archive))
+    dict_tables = scrape(
+        pipeline_config, log_main=log, transport=transport, dir_logs=tmp_path
+    )
+    dict_tables = process_data(pipeline_config, dict_tables, log, geocode=False)
+
+    dbs = {
+        "orm": SQLiteDB(str(tmp_path / "orm.db")),
+        "bulk": SQLiteDB(str(tmp_path / "bulk.db"), pragmas=BUILD_PRAGMAS),
+    }
+    for name, db in dbs.items():
+        db.create_db()
+        for table in Tables:
+            db.insert_table(
+                dict_tables[table.name], table.value, bulk=name == "bulk", chunksize=7
+            )
+
+    for table in Tables:
+        query = f"SELECT * FROM {table.name} ORDER BY id"
+        pd.testing.assert_frame_equal(
+            dbs["orm"].query(query), dbs["bulk"].query(query), obj=table.name
+        )
+
+    with pytest.raises(TypeError):
+        dbs["bulk"].insert_table(
+            dict_tables["teams"].assign(extra=1), Tables.teams.value, bulk=True
+        )
+
+
+def test_refresh_swaps_database_atomically(tmp_path):
+    path2db = str(tmp_path / "futsalfriend.db")
+    versions = DatabaseVersions(path2db, dir_snapshots=str(tmp_path / "snap"), keep=2)
+
+    def refresh(teams):
+        dict_tables = {table.name: pd.DataFrame() for table in Tables}
+        dict_tables["teams"] = pd.DataFrame({"team": teams})
+        return refresh_database(dict_tables, path2db, versions=versions)
+
+    version = refresh(["ZVC A"])
+    reader = sqlite3.connect(path2db)
+    reader.execute("BEGIN")
+    assert reader.execute("SELECT team FROM teams").fetchall() == [("ZVC A",)]
+
+    # a reader of the old version keeps seeing it while new versions are published
+    for teams in [["ZVC B"], ["ZVC C", "ZVC D"]]:
+        assert refresh(teams) != version
+    assert reader.execute("SELECT team FROM teams").fetchall() == [("ZVC A",)]
+    reader.close()
+
+    reader = sqlite3.connect(path2db)
+    assert reader.execute("SELECT count(*) FROM teams").fetchone() == (2,)
+    reader.close()
+    assert len(versions.snapshots()) == 2
+
+    # a broken build is refused and the published database stays in place
+    version = versions.current()
+    with open(versions.prepare(), "wb") as f:
+        f.write(b"not a database" * 100)
+    with pytest.raises(sqlite3.DatabaseError):
+        versions.publish()
+    assert versions.current() == version
+    assert SQLiteDB(path2db).query("SELECT count(*) AS n FROM teams")["n"][0] == 2
+
+
+def test_upsert_applies_only_changes(site_archive, pipeline_config, tmp_path):
+    log = structlog.get_logger()
+    transport = ReplayTransport(HTMLArchive(site_archive))
+    dict_tables = scrape(
+        pipeline_config, log_main=log, transport=transport, dir_logs=tmp_path
+    )
+    dict_tables = process_data(pipeline_config, dict_tables, log, geocode=False)
+
+    path_upsert, path_rebuild = str(tmp_path / "upsert.db"), str(tmp_path / "new.db")
+    refresh_database(dict_tables, path_upsert)
+    teams_before = SQLiteDB(path_upsert).query("SELECT * FROM teams")
+
+    # one game was played, one player left and a team joined halfway the table
+    dict_tables["schedules"].loc[0, ["goals1", "goals2"]] = [3, 2]
+    dict_tables["stats_players"] = dict_tables["stats_players"].iloc[1:]
+    df_teams = dict_tables["teams"]
+    dict_tables["teams"] = pd.concat(
+        [
+            df_teams.iloc[:3],
+            df_teams.iloc[[0]].assign(team="ZVC Nieuw"),
+            df_teams.iloc[3:],
+        ]
+    )
+    refresh_database(dict_tables, path_rebuild)
+    with capture_logs() as logs:
+        refresh_database(
+            dict_tables, path_upsert, logger=structlog.get_logger(), mode="upsert"
+        )
+
+    changes = dict(
+        re.fullmatch(r"Upserted table in db: (\w+) \((.*)\)", log["event"]).groups()
+        for log in logs
+        if log["event"].startswith("Upserted")
+    )
+    assert changes["schedules"] == "0 inserts, 1 updates, 0 deletes"
+    assert changes["stats_players"] == "0 inserts, 0 updates, 1 deletes"
+    assert changes["teams"] == "1 inserts, 0 updates, 0 deletes"
+    assert changes["stats_players_historical"] == "0 inserts, 0 updates, 0 deletes"
+    for table in Tables:
+        dfs = [
+            SQLiteDB(path).query(f"SELECT * FROM {table.name}").drop(columns="id")
+            for path in [path_upsert, path_rebuild]
+        ]
+        pd.testing.assert_frame_equal(
+            *[df.sort_values(list(df.columns)).reset_index(drop=True) for df in dfs],
+            obj=table.name,
+        )
+
+    # the rows that were kept did not get a new id
+    teams_after = SQLiteDB(path_upsert).query("SELECT * FROM teams")
+    pd.testing.assert_frame_equal(teams_before, teams_after.iloc[:-1])
+
+
+@pytest.mark.parametrize("query", read_webapp_queries() + read_sql_queries())
+def test_queries_do_not_scan_tables(query, tmp_path):
+    path2db = str(tmp_path / "futsalfriend.db")
+    db = SQLiteDB(path2db)
+    db.create_db(indexes=False)
+    db.create_indexes()
+    db.close()
+    create_serving_tables(path2db)
+    normalize_database(path2db)
+
+    # bind a value to every named parameter, as the webapp does
+    connection = sqlite3.connect(path2db)
+    params = dict.fromkeys(re.findall(r"(?<!:):(\w+)", query), 0)
+    plan = [row[3] for row in connection.execute(f"EXPLAIN QUERY PLAN {query}", params)]
+    connection.close()
+
+    # subqueries and CTEs that are materialized first may be scanned as a whole,
+    # just like the serving tables that are precomputed to be read as a whole
+    materialized = {
+        step.split(" ", 1)[1]
+        for step in plan
+        if step.startswith(("MATERIALIZE ", "CO-ROUTINE "))
+    } | set(SERVING_TABLES)
+    full_scans = [
+        step
+        for step in plan
+        if re.fullmatch(r"SCAN (\S+)", step) or "USING AUTOMATIC" in step
+        if step.split()[1] not in materialized and not step.split()[1].startswith("(")
+    ]
+    assert full_scans == [], "\n".join(plan)
+
+
+def test_dimensions_keep_columns_and_ids(site_archive, pipeline_config, tmp_path):
+    log = structlog.get_logger()
+    transport = ReplayTransport(HTMLArchive(site_archive))
+    dict_tables = scrape(
+        pipeline_config, log_main=log, transport=transport, dir_logs=tmp_path
+    )
+    dict_tables = process_data(pipeline_config, dict_tables, log, geocode=False)
+
+    db_raw = SQLiteDB(str(tmp_path / "raw.db"))
+    db_raw.create_db()
+    for table in Tables:
+        db_raw.insert_table(dict_tables[table.name], table.value, bulk=True)
+
+    path2db = str(tmp_path / "futsalfriend.db")
+    refresh_database(dict_tables, path2db)
+    db = SQLiteDB(path2db)
+    for table in Tables:
+        query = f"SELECT * FROM {table.name}"
+        pd.testing.assert_frame_equal(
+            db_raw.query(query), db.query(query), obj=table.name
+        )
+    assert db.query("SELECT count(*) AS n FROM fact_schedules")["n"][0] > 0
+    ids = db.query("SELECT * FROM dim_team")
+    db.close()
+
+    # the teams get the same ids when they appear in a different order later on
+    for name in ["teams", "schedules", "standings"]:
+        dict_tables[name] = dict_tables[name].iloc[::-1]
+    refresh_database(dict_tables, path2db)
+    db = SQLiteDB(path2db)
+    pd.testing.assert_frame_equal(ids, db.query("SELECT * FROM dim_team"))
+    db.close()
+    db_raw.close()
+
+
+def test_serving_tables_match_raw_queries(site_archive, pipeline_config, tmp_path):
+    log = structlog.get_logger()
+    transport = ReplayTransport(HTMLArchive(site_archive))
+    dict_tables = scrape(
+        pipeline_config, log_main=log, transport=transport, dir_logs=tmp_path
+    )
+    store(pipeline_config, process_data(pipeline_config, dict_tables, log, False), log)
+
+    # the same joins and aggregates as run on the raw tables in queries.sql
+    queries = {
+        query.split("*/")[0].strip(" \n/*"): query for query in read_sql_queries()
+    }
+    db = SQLiteDB(pipeline_config["database"])
+    for name, query in [
+        ("team_directory", queries["teams basetable"]),
+        ("player_facets", queries["players"]),
+        ("player_aggregates", queries["aggregated statistics"]),
+    ]:
+        df_serving = db.query(f"SELECT * FROM {name}")
+        df_raw = db.query(query)
+        df_raw.columns = df_serving.columns
+        assert len(df_serving) > 0
+        pd.testing.assert_frame_equal(df_serving, df_raw, obj=name)
+    db.close()
@@ -0,0 +1,52 @@
+import os
+import sys
+
+import pandas as pd
+import structlog
+
+from scraper.db.sqlitedb import SQLiteDB
+from scraper.main import process_data, scrape, store
+from scraper.utils.archive import HTMLArchive, ReplayTransport
+from tests.test_db import read_sql_queries
+
+# the webapp modules import each other as top-level modules
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(__file__)), "webapp"))
+
+from fixtures import FixtureCalendar
+
+
+def test_calendar_matches_schedule_queries(site_archive, pipeline_config, tmp_path):
+    log = structlog.get_logger()
+    transport = ReplayTransport(HTMLArchive(site_archive))
+    dict_tables = scrape(
+        pipeline_config, log_main=log, transport=transport, dir_logs=tmp_path
+    )
+    store(pipeline_config, process_data(pipeline_config, dict_tables, log, False), log)
+
+    db = SQLiteDB(pipeline_config["database"])
+    calendar = FixtureCalendar(db.query("SELECT * FROM fixture_calendar"))
+    df_open = db.query("SELECT * FROM schedules WHERE goals1 IS NULL ORDER BY id")
+    assert len(df_open) > 0
+
+    # the number of games in a period, as in queries.sql
+    query = next(q for q in read_sql_queries() if "games within horizon" in q)
+    dates = sorted(df_open["date"].unique())
+    for start, end in [(dates[0], dates[-1]), (dates[1], dates[-2]), (dates[2],) * 2]:
+        df_sql = db.query(
+            query.replace("2023-10-16", start).replace("2023-11-05", end)
+        ).sort_values("team", ignore_index=True)
+        df = calendar.count_games(start, end).sort_values("team", ignore_index=True)
+        pd.testing.assert_frame_equal(df, df_sql, check_dtype=False)
+    assert calendar.count_games("1999-01-01", "1999-12-31").empty
+
+    # the next opponent is the one of the first game still to be played
+    for team in df_open["team1"].unique()[:5]:
+        games = df_open[(df_open["team1"] == team) | (df_open["team2"] == team)]
+        first = games.sort_values("date", kind="stable").iloc[0]
+        opponent = first["team2"] if first["team1"] == team else first["team1"]
+        date, next_opponent = calendar.next_game(team)
+        assert (str(date), next_opponent) == (first["date"], opponent)
+
+        assert calendar.next_game(team, since="2999-01-01") is None
+        assert len(calendar.fixtures(team)) == len(games)
+    db.close()
@@ -0,0 +1,124 @@
+import os
+import sys
+from types import SimpleNamespace
+
+import pandas as pd
+import pytest
+from geopy.exc import GeocoderTimedOut
+
+# the webapp modules import each other as top-level modules
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(__file__)), "webapp"))
+
+from geocode import GeocodeCache, Geocoder, load_gazetteer, normalize
+
+KNOWN = {"nieuwstraat, brussels, belgium": (50.8517, 4.3569)}
+
+
+class FakeNominatim:
+    """Geocodes the KNOWN addresses and counts the calls, optionally timing out."""
+
+    def __init__(self):
+        self.calls = []
+        self.timed_out = False
+
+    def __call__(self, query, timeout=None):
+        self.calls.append(query)
+        if self.timed_out:
+            raise GeocoderTimedOut()
+        coordinates = KNOWN.get(query.lower())
+        if coordinates is not None:
+            return SimpleNamespace(latitude=coordinates[0], longitude=coordinates[1])
+
+
+@pytest.fixture
+def nominatim():
+    return FakeNominatim()
+
+
+def test_geocodes_are_cached_under_normalized_keys(nominatim, tmp_path):
+    geocoder = Geocoder(nominatim, GeocodeCache(tmp_path / "geocodes.db"))
+
+    assert geocoder("Nieuwstraat", "Brussels") == (50.8517, 4.3569)
+    assert geocoder("  nieuwstraat", "BRUSSELS ") == (50.8517, 4.3569)
+    assert len(nominatim.calls) == 1
+
+    # shared through the database, e.g. with another process
+    geocoder = Geocoder(nominatim, GeocodeCache(tmp_path / "geocodes.db"))
+    assert geocoder("Nieuwstraat", "Brussels") == (50.8517, 4.3569)
+    assert len(nominatim.calls) == 1
+    assert geocoder.cache.stats == {"hits": 1, "misses": 0}
+
+
+def test_unknown_addresses_fall_back_to_town_centre(nominatim, tmp_path):
+    geocoder = Geocoder(nominatim, GeocodeCache(tmp_path / "geocodes.db"))
+    centre = load_gazetteer()["sint truiden"]
+
+    assert geocoder("Nergensstraat 1", "Sint-Truiden") == centre
+    assert geocoder("Nergensstraat 1", "sint truiden") == centre
+    assert len(nominatim.calls) == 1  # cached as not found
+    assert geocoder("Nergensstraat 1", "Nergensdorp") is None
+
+    # not found only for so long
+    geocoder.cache.negative_ttl = -1
+    assert geocoder("Nergensstraat 1", "Sint-Truiden") == centre
+    assert len(nominatim.calls) == 3
+
+
+def test_geocoder_errors_fall_back_without_caching(nominatim, tmp_path):
+    geocoder = Geocoder(nominatim, GeocodeCache(tmp_path / "geocodes.db"))
+
+    nominatim.timed_out = True
+    assert geocoder("Nieuwstraat", "Brussels") == load_gazetteer()["brussels"]
+    nominatim.timed_out = False
+    assert geocoder("Nieuwstraat", "Brussels") == (50.8517, 4.3569)
+    assert len(nominatim.calls) == 2
+
+
+def test_gazetteer_knows_all_municipalities():
+    gazetteer = load_gazetteer()
+
+    # including the ones that merged in 2019 and 2025, by their old and new names
+    for town in [
+        "Begijnendijk",
+        "Bever",
+        "Biévène",
+        "Kortenaken",
+        "Linter",
+        "Merchtem",
+        "Opwijk",
+        "Pepingen",
+        "Galmaarden",
+        "Pajottegem",
+        "Puurs-Sint-Amands",
+        "Oudsbergen",
+        "Lievegem",
+        "Zomergem",
+        "Tessenderlo-Ham",
+        "St-Truiden",
+    ]:
+        assert normalize(town) in gazetteer
+
+
+def test_gazetteer_knows_towns_of_all_sportshalls():
+    gazetteer = load_gazetteer()
+    df = pd.read_csv("data/_coordinates.csv")
+
+    # the names of the sportshalls end with their town, e.g. 'Den Dijk Wespelaar'
+    unknown = []
+    for sportshall in df["sportshall"].unique():
+        words = normalize(sportshall).split()
+        if not any(" ".join(words[i:]) in gazetteer for i in range(len(words))):
+            unknown.append(sportshall)
+    assert unknown == []
+
+
+def test_cache_keeps_most_recently_used_in_memory(tmp_path):
+    cache = GeocodeCache(tmp_path / "geocodes.db", maxsize=2)
+    for key in ["a", "b", "c"]:
+        cache.set(key, (50.0, 4.0))
+    cache.get("b")
+    cache.set("d", None)
+
+    assert list(cache._lru) == ["b", "d"]
+    assert cache.get("a") == (True, (50.0, 4.0))  # read back from the database
+    assert cache.get("d") == (True, None)
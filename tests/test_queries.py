@@ -0,0 +1,67 @@
+import os
+import sqlite3
+import sys
+
+import pytest
+
+# the webapp modules import each other as top-level modules
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(__file__)), "webapp"))
+
+# the webapp's requirements are only installed along with the full requirements
+pytest.importorskip("streamlit")
+
+import queries
+from connection import SQLiteConnection
+
+
+def publish(path2db, numbers, version):
+    """Swaps in a new database with the given numbers, like the scraper does."""
+    path_build = f"{path2db}.build"
+    connection = sqlite3.connect(path_build)
+    with connection:
+        connection.execute("CREATE TABLE numbers (n INTEGER)")
+        connection.executemany(
+            "INSERT INTO numbers VALUES (?)", [(n,) for n in numbers]
+        )
+    connection.close()
+    os.replace(path_build, path2db)
+    with open(f"{path2db}.version", "w") as f:
+        f.write(version)
+
+
+@pytest.fixture
+def path2db(tmp_path, monkeypatch):
+    path2db = str(tmp_path / "futsalfriend.db")
+    monkeypatch.setattr(queries, "PATH_DB", path2db)
+    monkeypatch.setattr(queries, "PATH_DB_VERSION", f"{path2db}.version")
+    monkeypatch.setattr(queries, "CONNECTION", SQLiteConnection(path2db))
+    monkeypatch.setattr(queries, "_VERSION", None)
+    monkeypatch.setattr(queries, "QUERIES", {})
+    monkeypatch.setattr(queries, "CACHE_STATS", {})
+    return path2db
+
+
+def test_cached_queries_are_invalidated_by_new_version(path2db):
+    @queries.cached
+    def query_numbers(minimum):
+        q = "select n from numbers where n >= ?;"
+        return queries.get_connection().query(q, (minimum,))
+
+    publish(path2db, [1, 2, 3], "v1")
+    assert query_numbers(2)["n"].tolist() == [2, 3]
+    assert query_numbers(2)["n"].tolist() == [2, 3]
+    assert query_numbers(3)["n"].tolist() == [3]
+    assert queries.cache_stats().loc["query_numbers"].to_dict() == {
+        "hits": 1,
+        "misses": 2,
+    }
+
+    # a new version token drops the cached results and reconnects
+    publish(path2db, [1, 2, 3, 4], "v2")
+    assert query_numbers(2)["n"].tolist() == [2, 3, 4]
+    assert query_numbers(2)["n"].tolist() == [2, 3, 4]
+    assert queries.cache_stats().loc["query_numbers"].to_dict() == {
+        "hits": 2,
+        "misses": 3,
+    }
+    assert queries.check_db_version() == "v2"
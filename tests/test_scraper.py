@@ -1,18 +1,50 @@
-from scraper.parsers.lzvcup import LZVCupParser
+import re
 
-# initialize parser setup
-config_ = {
-    "url_base": "https://www.lzvcup.be",
-    "area": "VLAAMS BRABANT",
-    "url_area": "results/5",
-}
-parser = LZVCupParser(config_, region="Regio Ring Oost")
+import pandas as pd
+import pyarrow.parquet as pq
+import pytest
+import structlog
 
-# grab top-level URLs
-df_sportshalls_urls, df_competitions_urls = parser.parse_region_cards()
+from scraper import main
+from scraper.db.sqlitedb import SQLiteDB
+from scraper.db.staging import StagingDB
+from scraper.main import (
+    make_transport,
+    process_data,
+    process_staging,
+    scrape,
+    scrape_to_staging,
+    store,
+)
+from scraper.parsers import lzvcup
+from scraper.parsers.lzvcup import LZVCupParser, make_parsing_pool
+from scraper.utils.archive import HTMLArchive, ReplayTransport
+from scraper.utils.base import DataStorage
+from scraper.utils.dtypes import DTYPES, memory_report
+from scraper.utils.export import ParquetExport
+from scraper.utils.transport import FetchError, Transport
 
 
-def test_output_region_cards():
+@pytest.fixture(scope="module")
+def parser(site_archive):
+    # initialize parser setup, replaying the pages recorded in the archive
+    config_ = {
+        "url_base": "https://www.lzvcup.be",
+        "area": "VLAAMS BRABANT",
+        "url_area": "results/5",
+    }
+    transport = ReplayTransport(HTMLArchive(site_archive))
+    return LZVCupParser(config_, region="Regio Ring Oost", transport=transport)
+
+
+@pytest.fixture(scope="module")
+def urls(parser):
+    # grab top-level URLs
+    return parser.parse_region_cards()
+
+
+def test_output_region_cards(urls):
+    _, df_competitions_urls = urls
     regions = sorted(list(df_competitions_urls["region"].unique()))
 
     assert regions == [
@@ -26,7 +58,9 @@ def test_output_region_cards():
     ]
 
 
-def test_parse_competitions_and_teams():
+def test_parse_competitions_and_teams(parser, urls):
+    _, df_competitions_urls = urls
+
     # trim down urls to limit processing time
     df_competitions_urls_ = df_competitions_urls.query(f"region == '{parser.region}'")
 
@@ -45,7 +79,475 @@ def test_parse_competitions_and_teams():
     assert len(df_palmares) > 0
 
 
-def test_parse_sportshalls():
+def test_parse_sportshalls(parser, urls):
+    df_sportshalls_urls, _ = urls
     df_sportshalls = parser.parse_sportshalls(df_sportshalls_urls)
 
     assert len(df_sportshalls) > 0
+
+
+def test_pipeline_replays_offline(site_archive, pipeline_config, tmp_path, monkeypatch):
+    log = structlog.get_logger()
+
+    def run(config):
+        transport = ReplayTransport(HTMLArchive(site_archive))
+        dict_tables = scrape(
+            config, log_main=log, transport=transport, dir_logs=tmp_path
+        )
+        assert transport.stats.report()["failures"].sum() == 0
+        return process_data(config, dict_tables, log, geocode=False)
+
+    # a single parsing pool is started for the whole run, if enabled
+    pools = []
+
+    def make_pool(config):
+        pools.append(make_parsing_pool(config))
+        return pools[-1]
+
+    monkeypatch.setattr(main, "make_parsing_pool", make_pool)
+    dict_tables_first = run(pipeline_config)
+    dict_tables_second = run({**pipeline_config, "parsing": {"workers": 2}})
+
+    assert [pool is None for pool in pools] == [True, False]
+
+    assert len(dict_tables_first["stats_players_historical"]) > 0
+    assert len(dict_tables_first["levels"]) > 0
+    for name, df in dict_tables_first.items():
+        pd.testing.assert_frame_equal(df, dict_tables_second[name])
+
+
+def test_processed_tables_have_compact_dtypes(site_archive, pipeline_config, tmp_path):
+    log = structlog.get_logger()
+    transport = ReplayTransport(HTMLArchive(site_archive))
+    dict_tables = scrape(
+        pipeline_config, log_main=log, transport=transport, dir_logs=tmp_path
+    )
+
+    # the categories survive assembling the tables of all competitions and teams
+    for name, df in dict_tables.items():
+        for col in df.columns.intersection(list(DTYPES)):
+            if DTYPES[col] == "category":
+                assert str(df[col].dtype) == "category", (name, col)
+
+    dict_tables = process_data(pipeline_config, dict_tables, log, geocode=False)
+    for name, df in dict_tables.items():
+        for col in df.columns.intersection(list(DTYPES)):
+            assert str(df[col].dtype) == DTYPES[col], (name, col)
+
+    report = memory_report(dict_tables).set_index("table")
+    assert (report["after"] <= report["before"]).all()
+    assert report.loc["stats_players_historical", "after"] < (
+        report.loc["stats_players_historical", "before"] / 2
+    )
+
+
+def test_parsing_workers_output_identical(parser, urls):
+    _, df_competitions_urls = urls
+
+    dfs_inline = parser.parse_competitions_and_teams(df_competitions_urls)
+    parser._parsing = {"workers": 2, "chunksize": 3}
+    pool = make_parsing_pool({"url_base": parser._url_base, "parsing": parser._parsing})
+    parser.parsing_pool = pool
+    dfs_workers = parser.parse_competitions_and_teams(df_competitions_urls)
+    pool.shutdown()
+    del parser._parsing, parser.parsing_pool
+
+    for df_inline, df_workers in zip(dfs_inline, dfs_workers):
+        pd.testing.assert_frame_equal(df_inline, df_workers)
+
+
+def test_backend_and_subtrees_output_identical(parser, urls, monkeypatch):
+    df_sportshalls_urls, df_competitions_urls = urls
+
+    def parse_all():
+        dfs = parser.parse_competitions_and_teams(df_competitions_urls)
+        return dfs + (parser.parse_sportshalls(df_sportshalls_urls),)
+
+    dfs_subtrees = parse_all()
+    parser._parsing = {"backend": "lxml"}
+    dfs_lxml = parse_all()
+    del parser._parsing
+
+    # parse full pages as before
+    for name in ["ONLY_COMPETITION", "ONLY_TEAM", "ONLY_SPORTSHALLS"]:
+        monkeypatch.setattr(lzvcup, name, None)
+    dfs_full = parse_all()
+
+    for df_subtrees, df_lxml, df_full in zip(dfs_subtrees, dfs_lxml, dfs_full):
+        pd.testing.assert_frame_equal(df_subtrees, df_full)
+        pd.testing.assert_frame_equal(df_lxml, df_full)
+
+
+def test_incremental_history_refetches_changed_players(
+    site_archive, pipeline_config, tmp_path
+):
+    log = structlog.get_logger()
+    pipeline_config["incremental"] = {**pipeline_config["incremental"], "players": True}
+
+    def run():
+        transport = ReplayTransport(HTMLArchive(site_archive))
+        dict_tables = scrape(
+            pipeline_config, log_main=log, transport=transport, dir_logs=tmp_path
+        )
+        fetches = transport.stats.report().loc["/players/detail/*", "requests"]
+        return process_data(pipeline_config, dict_tables, log, geocode=False), fetches
+
+    dict_tables_full, fetches_full = run()
+    store(pipeline_config, dict_tables_full, log)
+
+    # one player changed since the previous run and one was not stored before
+    db = SQLiteDB(pipeline_config["database"])
+    with db.cursor() as cursor:
+        cursor.execute(
+            "UPDATE fact_stats_players SET goals = 99 WHERE name = 'Speler 0000'"
+        )
+        cursor.execute("DELETE FROM fact_stats_players WHERE name = 'Speler 1111'")
+    db.close()
+
+    dict_tables_incremental, fetches_incremental = run()
+
+    assert fetches_full == dict_tables_full["stats_players"]["url"].nunique()
+    assert fetches_incremental == 2
+    for df_full, df_incremental in [
+        (dict_tables_full[name], dict_tables_incremental[name])
+        for name in ["stats_players", "stats_players_historical"]
+    ]:
+        pd.testing.assert_frame_equal(
+            df_full.astype(str).reset_index(drop=True),
+            df_incremental.astype(str).reset_index(drop=True),
+        )
+
+
+def test_incremental_competitions_skip_unchanged(site, tmp_path):
+    config = {
+        "url_base": site.url_base,
+        "area": "VLAAMS BRABANT",
+        "url_area": "results/5",
+        "incremental": {"competitions": True, "dir_state": str(tmp_path)},
+    }
+
+    def run(config):
+        parser = LZVCupParser(config)
+        _, df_competitions_urls = parser.parse_region_cards()
+        site.requests.clear()
+        return parser.parse_competitions_and_teams(df_competitions_urls)
+
+    run(config)
+
+    # a single result changed since the previous run
+    path = "/results/5/0/1"
+    site.pages[path] = re.sub(r"\d - \d", "10 - 10", site.pages[path], count=1)
+    dfs_incremental = run(config)
+    requests_teams = [r for r in site.requests if r.startswith("/teams/")]
+    dfs_full = run({**config, "incremental": {}})
+
+    assert requests_teams == [f"/teams/detail/01{t}" for t in range(4)]
+    for df_incremental, df_full in zip(dfs_incremental, dfs_full):
+        pd.testing.assert_frame_equal(df_incremental, df_full)
+
+
+@pytest.mark.parametrize("mode, max_in_flight", [("sequential", 1), ("async", 4)])
+def test_parallel_areas_share_budget(
+    site, pipeline_config, tmp_path, mode, max_in_flight
+):
+    config = {
+        **pipeline_config,
+        "url_base": site.url_base,
+        "areas": {f"AREA {i}": "results/5" for i in range(3)},
+        "fetch": {"mode": mode, "max_concurrency": 4, "max_per_host": 4},
+        "incremental": {},
+        "checkpoint": {},
+        "steps": {"historical_players": False},
+    }
+
+    def run(areas_parallel):
+        return scrape(
+            {**config, "areas_parallel": areas_parallel},
+            log_main=structlog.get_logger(),
+            dir_logs=tmp_path,
+        )
+
+    dict_tables_sequential = run({"mode": "sequential"})
+    site.max_in_flight = 0
+    dict_tables_threads = run({"mode": "threads", "workers": 3})
+
+    assert min(2, max_in_flight) <= site.max_in_flight <= max_in_flight
+    assert (tmp_path / "AREA 2.log").exists()
+    assert list(dict_tables_threads["teams"]["area"].unique()) == list(config["areas"])
+    for name, df in dict_tables_sequential.items():
+        if df is not None:
+            pd.testing.assert_frame_equal(df, dict_tables_threads[name])
+
+
+def test_sequential_mode_fetches_player_history_concurrently(
+    site, pipeline_config, tmp_path
+):
+    config = {
+        **pipeline_config,
+        "url_base": site.url_base,
+        "areas": {"VLAAMS BRABANT": "results/5"},
+        "fetch": {"mode": "sequential", "history_workers": 4},
+        "incremental": {},
+        "checkpoint": {},
+        "steps": {"historical_players": False},
+    }
+    log = structlog.get_logger()
+
+    # the crawl of the pages is sequential
+    scrape(config, log_main=log, dir_logs=tmp_path)
+    assert site.max_in_flight == 1
+
+    # but not the player histories, which are counted as any other fetch
+    site.max_in_flight = 0
+    transport = make_transport(config)
+    dict_tables = scrape(
+        {**config, "steps": {"historical_players": True}},
+        log_main=log,
+        transport=transport,
+        dir_logs=tmp_path,
+    )
+    assert 2 <= site.max_in_flight <= 4
+    assert len(dict_tables["stats_players_historical"]) > 0
+    n_players = dict_tables["stats_players"]["url"].nunique()
+    report = transport.stats.report()
+    assert report["requests"].sum() >= n_players
+    transport.close()
+
+
+def test_streaming_pipeline_builds_same_database(
+    site_archive, pipeline_config, tmp_path
+):
+    log = structlog.get_logger()
+
+    def read_tables(path2db):
+        db = SQLiteDB(path2db)
+        dict_tables = {
+            table.name: db.query(f"SELECT * FROM {table.name}")
+            .drop(columns="id")
+            .astype(str)
+            for table in db.get_table_classes()
+        }
+        db.close()
+        return dict_tables
+
+    transport = ReplayTransport(HTMLArchive(site_archive))
+    dict_tables = scrape(
+        pipeline_config, log_main=log, transport=transport, dir_logs=tmp_path
+    )
+    store(pipeline_config, process_data(pipeline_config, dict_tables, log, False), log)
+    dict_tables_memory = read_tables(pipeline_config["database"])
+
+    transport = ReplayTransport(HTMLArchive(site_archive))
+    staging = str(tmp_path / "staging.db")
+    scrape_to_staging(
+        pipeline_config, log, staging, transport=transport, dir_logs=tmp_path
+    )
+    process_staging(pipeline_config, staging, log, geocode=False)
+    dict_tables_streaming = read_tables(pipeline_config["database"])
+
+    assert len(dict_tables_streaming["stats_players_historical"]) > 0
+    for name, df in dict_tables_memory.items():
+        if name == "locations":  # sorted by team only, so ties may differ
+            df = df.sort_values(list(df.columns))
+            dict_tables_streaming[name] = dict_tables_streaming[name].sort_values(
+                list(df.columns)
+            )
+        pd.testing.assert_frame_equal(
+            df.reset_index(drop=True),
+            dict_tables_streaming[name].reset_index(drop=True),
+            obj=name,
+        )
+
+
+def test_streaming_stores_competitions_in_chunks(
+    site_archive, pipeline_config, tmp_path, monkeypatch
+):
+    log = structlog.get_logger()
+    pipeline_config["streaming"] = {**pipeline_config["streaming"], "chunksize": 1}
+    pipeline_config["steps"] = {**pipeline_config["steps"], "historical_players": False}
+
+    appended = []
+    append = StagingDB.append
+
+    def append_spy(self, name, df, unit=0):
+        if df is not None and len(df) > 0:
+            appended.append(name)
+        append(self, name, df, unit=unit)
+
+    monkeypatch.setattr(StagingDB, "append", append_spy)
+    transport = ReplayTransport(HTMLArchive(site_archive))
+    staging = str(tmp_path / "staging.db")
+    scrape_to_staging(
+        pipeline_config, log, staging, transport=transport, dir_logs=tmp_path
+    )
+
+    # the rows of each competition are stored as soon as it is parsed
+    staging_db = StagingDB(staging)
+    n_competitions = staging_db.read("competitions")["url"].nunique()
+    staging_db.close()
+    assert n_competitions > 1
+    assert appended.count("schedules") == n_competitions
+
+
+def test_parquet_export_is_typed_and_partitioned(
+    site_archive, pipeline_config, tmp_path
+):
+    log = structlog.get_logger()
+    pipeline_config["steps"] = {**pipeline_config["steps"], "parquet": True}
+    root = f"{pipeline_config['dir_output']}/parquet"
+
+    transport = ReplayTransport(HTMLArchive(site_archive))
+    dict_tables = scrape(
+        pipeline_config, log_main=log, transport=transport, dir_logs=tmp_path
+    )
+    dict_tables = process_data(pipeline_config, dict_tables, log, geocode=False)
+    store(pipeline_config, dict_tables, log)
+
+    manifest = DataStorage.load_json(f"{root}/manifest.json")
+    for name, df in dict_tables.items():
+        assert manifest["tables"][name]["rows"] == len(df)
+
+    schema = pq.ParquetDataset(f"{root}/schedules").schema
+    assert str(schema.field("goals1").type) == "int64"
+    assert str(schema.field("date").type) == "date32[day]"
+    df_schedules = ParquetExport.read(root, "schedules")
+    assert df_schedules["date"].equals(
+        pd.to_datetime(dict_tables["schedules"]["date"]).dt.date
+    )
+
+    # only some columns of a single partition
+    df_teams = ParquetExport.read(
+        root, "teams", columns=["team", "url"], area="VLAAMS BRABANT"
+    )
+    assert list(df_teams.columns) == ["team", "url"]
+    assert len(df_teams) == len(dict_tables["teams"])
+    assert len(ParquetExport.read(root, "teams", area="LIMBURG")) == 0
+
+    # the streaming pipeline exports the same rows for the same date
+    transport = ReplayTransport(HTMLArchive(site_archive))
+    staging = str(tmp_path / "staging.db")
+    scrape_to_staging(
+        pipeline_config, log, staging, transport=transport, dir_logs=tmp_path
+    )
+    process_staging(pipeline_config, staging, log, geocode=False)
+    manifest_streaming = DataStorage.load_json(f"{root}/manifest.json")
+    assert manifest_streaming == manifest
+
+
+def test_parquet_export_nulls_text_in_numeric_columns(tmp_path):
+    df = pd.DataFrame(
+        {
+            "area": ["LIMBURG"] * 3,
+            "date": ["2024-01-05"] * 3,
+            "hour": ["20:30", "21", None],
+            "goals1": ["", "3", 4],
+            "goals2": [1, "x", "2.0"],
+        }
+    )
+    export = ParquetExport(str(tmp_path), scrape_date="2024-01-06")
+    export.write("schedules", df)
+    export.close()
+
+    df_schedules = ParquetExport.read(str(tmp_path), "schedules")
+    for col, expected in {
+        "hour": [None, 21, None],
+        "goals1": [None, 3, 4],
+        "goals2": [1, None, 2],
+    }.items():
+        assert (
+            df_schedules[col]
+            .astype(object)
+            .where(df_schedules[col].notna(), None)
+            .tolist()
+            == expected
+        )
+
+
+def test_interrupted_run_resumes_from_checkpoint(site, pipeline_config, tmp_path):
+    config = {
+        **pipeline_config,
+        "url_base": site.url_base,
+        "fetch": {"mode": "sequential", "retries": 0},
+        "incremental": {},
+        "checkpoint": {
+            **pipeline_config["checkpoint"],
+            "enabled": True,
+            "chunksize": 4,
+        },
+        "steps": {"historical_players": False},
+    }
+    log = structlog.get_logger()
+
+    # the run fails halfway on a broken competition page
+    def broken(server, request):
+        return (500, {}) if request.path == "/results/5/3/1" else (200, {})
+
+    site.hook = broken
+    with pytest.raises(FetchError):
+        scrape(config, log_main=log, dir_logs=tmp_path)
+
+    site.hook = None
+    site.requests.clear()
+    dict_tables_resumed = scrape(config, log_main=log, dir_logs=tmp_path, resume=True)
+    requests_resumed = list(site.requests)
+    dict_tables_full = scrape(config, log_main=log, dir_logs=tmp_path)
+
+    # the first chunk of competitions completed and is not fetched again
+    requests_competitions = [
+        r for r in requests_resumed if re.fullmatch(r"/results/5/\d/\d", r)
+    ]
+    assert requests_competitions == [
+        f"/results/5/{r}/{c}" for r in range(2, 6) for c in range(2)
+    ]
+    for name, df in dict_tables_full.items():
+        if df is not None:
+            pd.testing.assert_frame_equal(df, dict_tables_resumed[name])
+
+
+class InterruptedTransport(Transport):
+    def __init__(self, transport, batches) -> None:
+        """Fails the player pages after serving 'batches' batches of them."""
+        self.transport = transport
+        self.stats = transport.stats
+        self.batches = batches
+
+    def get_many(self, urls, headers=None):
+        if any("/players/" in url for url in urls):
+            if self.batches == 0:
+                raise FetchError(urls[0])
+            self.batches -= 1
+        return self.transport.get_many(urls, headers=headers)
+
+
+def test_streaming_run_resumes_player_history(site_archive, pipeline_config, tmp_path):
+    config = {
+        **pipeline_config,
+        "incremental": {},
+        "checkpoint": {**pipeline_config["checkpoint"], "enabled": True},
+        "streaming": {"batchsize_players": 50},
+    }
+    log = structlog.get_logger()
+    staging = str(tmp_path / "staging.db")
+
+    def run(transport, resume=False):
+        scrape_to_staging(
+            config, log, staging, transport=transport, dir_logs=tmp_path, resume=resume
+        )
+        staging_db = StagingDB(staging)
+        df = staging_db.read("stats_players_historical")
+        n_players = staging_db.read("stats_players")["url"].nunique()
+        staging_db.close()
+        return df, n_players
+
+    # the run fails after two batches of player pages
+    transport = InterruptedTransport(ReplayTransport(HTMLArchive(site_archive)), 2)
+    with pytest.raises(FetchError):
+        run(transport)
+
+    transport = ReplayTransport(HTMLArchive(site_archive))
+    df_resumed, n_players = run(transport, resume=True)
+    fetches_resumed = transport.stats.report().loc["/players/detail/*", "requests"]
+    df_full, _ = run(ReplayTransport(HTMLArchive(site_archive)))
+
+    assert fetches_resumed == n_players - 2 * 50
+    pd.testing.assert_frame_equal(df_full, df_resumed)
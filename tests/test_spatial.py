@@ -0,0 +1,52 @@
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+from geopy.distance import distance
+
+# the webapp modules import each other as top-level modules
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(__file__)), "webapp"))
+
+from spatial import TOLERANCE, SpatialIndex, haversine
+
+
+@pytest.fixture(scope="module")
+def halls():
+    # random sportshalls all over Belgium, some without coordinates
+    rng = np.random.default_rng(0)
+    df = pd.DataFrame(
+        {
+            "latitude": rng.uniform(49.5, 51.5, 2000),
+            "longitude": rng.uniform(2.5, 6.4, 2000),
+        }
+    )
+    df.loc[::100, ["latitude", "longitude"]] = np.nan
+    return df
+
+
+def test_haversine_matches_geopy_within_tolerance(halls):
+    df = halls.dropna().head(200)
+    target = (50.85, 4.35)
+
+    km = haversine(df["latitude"], df["longitude"], *target)
+    km_geopy = [distance(p, target).km for p in zip(df["latitude"], df["longitude"])]
+
+    np.testing.assert_allclose(km, km_geopy, rtol=TOLERANCE)
+
+
+@pytest.mark.parametrize("km", [1.0, 10.0, 50.0, 1000.0])
+def test_index_finds_same_halls_as_brute_force(halls, km):
+    index = SpatialIndex(halls)
+    points = halls.dropna()
+
+    for target in [(50.85, 4.35), (51.2, 3.2), (49.6, 5.8)]:
+        df = index.query(*target, km)
+        expected = haversine(points["latitude"], points["longitude"], *target) <= km
+
+        assert len(df) == expected.sum()
+        assert df["distance"].is_monotonic_increasing
+        assert set(zip(df["latitude"], df["longitude"])) == set(
+            zip(points["latitude"][expected], points["longitude"][expected])
+        )
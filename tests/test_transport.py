@@ -0,0 +1,133 @@
+import time
+
+import pandas as pd
+import pytest
+
+from scraper.parsers.lzvcup import LZVCupParser
+from scraper.utils.transport import (
+    AiohttpTransport,
+    FetchError,
+    RateController,
+    RequestsTransport,
+    Transport,
+)
+
+
+def parse_all(config):
+    parser = LZVCupParser(config)
+    _, df_competitions_urls = parser.parse_region_cards()
+    return parser.parse_competitions_and_teams(df_competitions_urls)
+
+
+def test_async_output_identical_to_sequential(site_config):
+    dfs_sequential = parse_all({**site_config, "fetch": {"mode": "sequential"}})
+    dfs_async = parse_all({**site_config, "fetch": {"mode": "async"}})
+
+    for df_sequential, df_async in zip(dfs_sequential, dfs_async):
+        pd.testing.assert_frame_equal(df_sequential, df_async)
+
+
+@pytest.mark.parametrize("transport_class", [AiohttpTransport, RequestsTransport])
+def test_transport_respects_per_host_cap(site, transport_class):
+    urls = [f"{site.url_base}{path}" for path in site.pages][:40]
+
+    transport = transport_class(max_concurrency=16, max_per_host=3)
+    pages = transport.get_many(urls)
+
+    assert list(pages) == urls
+    assert all(page.status == 200 for page in pages.values())
+    assert 1 < site.max_in_flight <= 3
+    assert transport.stats.report()["requests"].sum() == 40
+
+
+@pytest.mark.parametrize("mode", ["async", "sequential"])
+def test_transport_retries_transient_errors(site, mode):
+    failures = {}
+
+    def flaky(server, request):
+        failures[request.path] = failures.get(request.path, 0) + 1
+        return (503, {}) if failures[request.path] <= 2 else (200, {})
+
+    site.hook = flaky
+    transport = Transport.from_config({"mode": mode, "backoff": 0.01})
+    page = transport.get(f"{site.url_base}/results/5")
+
+    assert page.status == 200
+    assert "Regio Leuven" in page.text
+    assert transport.stats.report().loc["/results/*", "retries"] == 2
+
+
+@pytest.mark.parametrize("transport_class", [AiohttpTransport, RequestsTransport])
+def test_transport_reuses_connections(site, transport_class):
+    transport = transport_class(max_concurrency=4, max_per_host=4)
+    for path in list(site.pages)[:10]:
+        assert transport.get(f"{site.url_base}{path}").status == 200
+    transport.close()
+
+    assert site.connections == 1
+
+
+def test_unknown_fetch_mode_raises():
+    with pytest.raises(ValueError):
+        Transport.from_config({"mode": "threads"})
+
+
+def test_missing_page_raises(site_config):
+    parser = LZVCupParser({**site_config, "fetch": {"retries": 0}})
+
+    with pytest.raises(FetchError):
+        parser.make_soup(parser.convert_to_full_url("does/not/exist"))
+
+    assert parser.fetch_pages(
+        [parser.convert_to_full_url("does/not/exist")], missing_ok=True
+    ) == {parser.convert_to_full_url("does/not/exist"): None}
+
+
+@pytest.mark.parametrize("transport_class", [AiohttpTransport, RequestsTransport])
+def test_rate_controller_backs_off_when_throttled(site, transport_class):
+    urls = [f"{site.url_base}{path}" for path in site.pages][:150]
+
+    def throttle(server, request):
+        return (429, {}) if server.in_flight > 4 else (200, {})
+
+    site.hook = throttle
+    retries = {}
+    for adaptive in [False, True]:
+        transport = transport_class(
+            max_concurrency=16, max_per_host=16, backoff=0.01, adaptive=adaptive
+        )
+        pages = transport.get_many(urls)
+        retries[adaptive] = transport.stats.report()["retries"].sum()
+
+    assert all(page.status == 200 for page in pages.values())
+    assert transport.budget.decreases > 0
+    assert retries[True] < retries[False] / 2
+
+
+def test_rate_controller_adapts_to_feedback():
+    controller = RateController(16)
+    assert controller.limit == 4  # starts at a quarter of the limit
+
+    # one more request in flight per round of successful requests
+    for _ in range(4 + 5 + 1):
+        controller.feedback(0.01, 200)
+    assert controller.limit == 6
+
+    # halve on throttling and on a latency spike, once per average latency
+    controller.feedback(0.01, 429)
+    controller.feedback(0.01, 503)
+    assert controller.limit == 3
+    time.sleep(0.02)
+    controller.feedback(1.0, 200)
+    assert controller.limit == 1
+    assert controller.decreases == 2
+
+
+def test_rate_controller_respects_max_rps(site):
+    urls = [f"{site.url_base}{path}" for path in site.pages][:60]
+
+    transport = RequestsTransport(max_concurrency=16, max_per_host=16, max_rps=100)
+    start = time.perf_counter()
+    transport.get_many(urls)
+    assert time.perf_counter() - start >= 59 / 100
+    assert isinstance(transport.budget, RateController)
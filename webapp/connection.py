@@ -0,0 +1,44 @@
+import sqlite3
+import threading
+
+import pandas as pd
+
+
+class SQLiteConnection:
+    def __init__(self, path2db, cached_statements=128) -> None:
+        """
+        Shares one read-only connection to the SQLite database at path2db between
+        all sessions. Queries take their values as bound parameters, such that
+        the same SQL text is used for e.g. every team and its compiled statement
+        is reused from the cache of the last 'cached_statements' statements.
+        """
+        self.path2db = path2db
+        self.cached_statements = cached_statements
+        self._connection = None
+        self._lock = threading.Lock()
+
+    @property
+    def connection(self):
+        if self._connection is None:
+            self._connection = sqlite3.connect(
+                f"file:{self.path2db}?mode=ro",
+                uri=True,
+                check_same_thread=False,
+                cached_statements=self.cached_statements,
+            )
+        return self._connection
+
+    def query(self, sql, params=()):
+        """Runs a query with its parameters and returns the results as a DataFrame."""
+        with self._lock:
+            cursor = self.connection.execute(sql, params)
+            columns = [column[0] for column in cursor.description]
+            rows = cursor.fetchall()
+        return pd.DataFrame(rows, columns=columns)
+
+    def reset(self):
+        """Closes the connection, so the next query opens the current database file."""
+        with self._lock:
+            if self._connection is not None:
+                self._connection.close()
+                self._connection = None
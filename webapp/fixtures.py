@@ -0,0 +1,73 @@
+import numpy as np
+import pandas as pd
+
+
+def to_day(date):
+    """Converts a date, e.g. "2023-10-16" or a datetime.date, to a datetime64[D]."""
+    return np.datetime64(date, "D")
+
+
+class FixtureCalendar:
+    def __init__(self, df) -> None:
+        """
+        Indexes the games still to be played by every team, given as a DataFrame
+        with a row per team and game (team, date, opponent), such as the
+        fixture_calendar table. Every team gets a sorted array of its game dates,
+        and the number of games of all teams up to every day is kept as a
+        cumulative count, so the games in any period take two binary searches.
+        """
+        df = df.dropna(subset=["date"])
+        df = df.assign(date=pd.to_datetime(df["date"])).sort_values(
+            ["team", "date"], kind="stable"
+        )
+
+        self.teams = df["team"].unique()
+        self._codes = {team: i for i, team in enumerate(self.teams)}
+        codes = df["team"].map(self._codes).to_numpy()
+        self.dates = df["date"].to_numpy(dtype="datetime64[D]")
+        self.opponents = df["opponent"].to_numpy()
+
+        # the games of team i are at positions offsets[i]:offsets[i + 1]
+        self.offsets = np.searchsorted(codes, np.arange(len(self.teams) + 1))
+
+        # games[i, j] is the number of games of team i before days[j]
+        self.days = np.unique(self.dates)
+        counts = np.zeros((len(self.teams), len(self.days) + 1), dtype=np.int32)
+        np.add.at(counts, (codes, np.searchsorted(self.days, self.dates) + 1), 1)
+        self.games = counts.cumsum(axis=1)
+
+    def count_games(self, start, end):
+        """
+        Counts the games of every team from 'start' to 'end' (both included) as a
+        DataFrame with the team and its number of games, for teams with games.
+        """
+        i = np.searchsorted(self.days, to_day(start), side="left")
+        j = np.searchsorted(self.days, to_day(end), side="right")
+        games = self.games[:, j] - self.games[:, i]
+        keep = games > 0
+        return pd.DataFrame({"team": self.teams[keep], "games": games[keep]})
+
+    def fixtures(self, team):
+        """Returns the dates and opponents of the games of a team, in order."""
+        i = self._codes.get(team)
+        if i is None:
+            return pd.DataFrame({"date": [], "opponent": []})
+        start, end = self.offsets[i], self.offsets[i + 1]
+        return pd.DataFrame(
+            {"date": self.dates[start:end], "opponent": self.opponents[start:end]}
+        )
+
+    def next_game(self, team, since=None):
+        """
+        Returns the (date, opponent) of the first game of a team on or after
+        'since' (by default its first game still to be played), or None.
+        """
+        i = self._codes.get(team)
+        if i is None:
+            return None
+        start, end = self.offsets[i], self.offsets[i + 1]
+        if since is not None:
+            start += np.searchsorted(self.dates[start:end], to_day(since))
+        if start == end:
+            return None
+        return self.dates[start], self.opponents[start]
@@ -0,0 +1,140 @@
+import os
+import sqlite3
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+
+import pandas as pd
+from geopy.exc import GeopyError
+
+PATH_GAZETTEER = os.path.join(os.path.dirname(__file__), "gazetteer.csv")
+
+
+def normalize(text):
+    """Normalizes a place name for lookups, e.g. ' Sint-Truiden ' to 'sint truiden'."""
+    text = unicodedata.normalize("NFKD", str(text))
+    text = "".join(c for c in text if not unicodedata.combining(c)).lower()
+    for char in "-',.":
+        text = text.replace(char, " ")
+    return " ".join(text.split())
+
+
+def load_gazetteer(path=PATH_GAZETTEER):
+    """
+    Loads the town centres as {normalized name: (latitude, longitude)}. Names
+    starting with 'Sint-' can also be looked up abbreviated, e.g. 'St-Truiden'.
+    """
+    df = pd.read_csv(path)
+    gazetteer = {}
+    for name, lat, lon in zip(df["name"], df["latitude"], df["longitude"]):
+        key = normalize(name)
+        gazetteer[key] = (lat, lon)
+        if key.startswith("sint "):
+            gazetteer.setdefault(f"st {key[5:]}", (lat, lon))
+    return gazetteer
+
+
+class GeocodeCache:
+    def __init__(self, path2db, maxsize=1024, negative_ttl=24 * 3600) -> None:
+        """
+        Caches geocoding results under a normalized key, in memory for the
+        'maxsize' most recently used keys and in the SQLite database at path2db
+        for all of them, such that the results are shared by all sessions and
+        survive restarts. Addresses that could not be found are cached as None
+        for 'negative_ttl' seconds.
+        """
+        self.maxsize = maxsize
+        self.negative_ttl = negative_ttl
+        self._lru = OrderedDict()
+        self._lock = threading.Lock()
+
+        if os.path.dirname(path2db):
+            os.makedirs(os.path.dirname(path2db), exist_ok=True)
+        self.connection = sqlite3.connect(path2db, check_same_thread=False)
+        with self.connection:
+            self.connection.execute("""
+                CREATE TABLE IF NOT EXISTS geocodes (
+                    key TEXT PRIMARY KEY,
+                    latitude REAL,
+                    longitude REAL,
+                    created REAL
+                )
+                """)
+        self.stats = {"hits": 0, "misses": 0}
+
+    def get(self, key):
+        """Returns (True, coordinates or None) for a cached key, else (False, None)."""
+        with self._lock:
+            if key in self._lru:
+                self._lru.move_to_end(key)
+                entry = self._lru[key]
+            else:
+                entry = self.connection.execute(
+                    "SELECT latitude, longitude, created FROM geocodes WHERE key = ?",
+                    (key,),
+                ).fetchone()
+                if entry is not None:
+                    self._remember(key, entry)
+
+            if entry is None or (
+                entry[0] is None and time.time() - entry[2] > self.negative_ttl
+            ):
+                self.stats["misses"] += 1
+                return False, None
+
+            self.stats["hits"] += 1
+            return True, None if entry[0] is None else (entry[0], entry[1])
+
+    def set(self, key, coordinates):
+        """Caches the coordinates for a key, where None means not found."""
+        lat, lon = (None, None) if coordinates is None else coordinates
+        entry = (lat, lon, time.time())
+        with self._lock, self.connection:
+            self.connection.execute(
+                "INSERT OR REPLACE INTO geocodes VALUES (?, ?, ?, ?)", (key, *entry)
+            )
+            self._remember(key, entry)
+
+    def _remember(self, key, entry):
+        self._lru[key] = entry
+        self._lru.move_to_end(key)
+        if len(self._lru) > self.maxsize:
+            self._lru.popitem(last=False)
+
+    def close(self):
+        """Shuts down database connection."""
+        self.connection.close()
+
+
+class Geocoder:
+    def __init__(self, geocode, cache, gazetteer=None, timeout=3) -> None:
+        """
+        Looks up the (latitude, longitude) of addresses with the 'geocode'
+        function (e.g. of geopy's Nominatim) through a GeocodeCache. If the address
+        is not found, or the geocoder fails or takes longer than 'timeout' seconds,
+        the centre of the town from the 'gazetteer' is returned instead (if known).
+        """
+        self.geocode = geocode
+        self.cache = cache
+        self.gazetteer = load_gazetteer() if gazetteer is None else gazetteer
+        self.timeout = timeout
+
+    def __call__(self, address, city, country="Belgium"):
+        key = normalize(f"{address}, {city}, {country}")
+        hit, coordinates = self.cache.get(key)
+        if not hit:
+            try:
+                location = self.geocode(
+                    f"{address}, {city}, {country}", timeout=self.timeout
+                )
+            except GeopyError:  # not cached, the address may well exist
+                pass
+            else:
+                if location is not None:
+                    coordinates = (location.latitude, location.longitude)
+                self.cache.set(key, coordinates)
+
+        if coordinates is None:
+            return self.gazetteer.get(normalize(city))
+        return coordinates
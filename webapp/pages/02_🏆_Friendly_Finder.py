@@ -43,16 +43,14 @@ max_date = (
 st.markdown("#### Potential play partners 🥰")
 
 with st.spinner("Finding teams..."):
-    st.cache_data.clear()
-
     # query tables for specified parameters
-    df_levels = queries.CONNECTION.query(
-        f"select team from levels where level = {levels[level]};"
-    )
-    df_n_games = queries.query_nbr_next_games(dates=[today, max_date])
+    df_levels = queries.query_levels(level=levels[level])
+    df_n_games = queries.get_fixture_calendar().count_games(today, max_date)
 
     # filter teams based on remaining parameters
-    df_out = utils.filter_teams(df_teams, city, address, km)
+    df_out = utils.filter_teams(
+        df_teams, city, address, km, index=queries.get_spatial_index()
+    )
 
     # join tables together
     df_out = (
@@ -30,10 +30,10 @@ km = col3.number_input(
 st.markdown("#### Possible teams to join 🤩")
 
 with st.spinner("Finding teams..."):
-    st.cache_data.clear()
-
     # filter teams based on parameters
-    df_out = utils.filter_teams(df_teams, city, address, km)
+    df_out = utils.filter_teams(
+        df_teams, city, address, km, index=queries.get_spatial_index()
+    )
 
     if len(df_out) == 0:
         st.warning("No teams found for the specified parameters. Try something else!")
@@ -64,8 +64,7 @@ def prepare_prompt_team_context(dict_info):
 
 
 def lets_chat():
-    st.cache_data.clear()
-    st.cache_resource.clear()
+    load_chain.clear()
 
     st.session_state["lets_chat"] = True
 
@@ -88,8 +87,6 @@ if "lets_chat" not in st.session_state:
 
 # ask for team first
 if not st.session_state["lets_chat"]:
-    st.cache_data.clear()
-
     teams_all = queries.query_list_teams()["team"].tolist()
 
     col1, _, _ = st.columns(3)
@@ -149,17 +146,21 @@ if st.session_state["lets_chat"]:
 
     df_stats_players = queries.query_stats_players(team=team)
 
-    oponnent_1 = [who for who in df_schedule.loc[0][1:].tolist() if who != team][0]
-    df_stats_players_oponnent_1 = queries.query_stats_players(team=oponnent_1)
-
     df_standings = queries.query_standings(team=team)
 
     dict_info = {
         "Competition standings": df_standings,
         "Schedule": df_schedule,
         "Player statistics": df_stats_players,
-        "Player statistics next opponent": df_stats_players_oponnent_1,
     }
+
+    next_game = queries.get_fixture_calendar().next_game(team)
+    if next_game is not None:
+        _, oponnent_1 = next_game
+        dict_info["Player statistics next opponent"] = queries.query_stats_players(
+            team=oponnent_1
+        )
+
     context = prepare_prompt_team_context(dict_info)
 
     # configure chain
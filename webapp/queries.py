@@ -1,145 +1,222 @@
+import functools
+import os
+import threading
+
+import pandas as pd
 import streamlit as st
+from connection import SQLiteConnection
+from fixtures import FixtureCalendar
+from spatial import SpatialIndex
+from streamlit.logger import get_logger
 
-TTL = 0  # cache time to live in seconds
+LOGGER = get_logger(__name__)
 
-CONNECTION = st.connection("futsalfriend_db", type="sql", ttl=0)
+# the scraper writes a new token here every time it swaps in a new database
+PATH_DB = "database/futsalfriend.db"
+PATH_DB_VERSION = f"{PATH_DB}.version"
 
+# one connection for all sessions, which reuses the statements of the queries
+CONNECTION = SQLiteConnection(PATH_DB)
+_VERSION = None
 
-def query_nbr_next_games(dates):
-    q = f"""
-        with 
-        horizon_set as 
-        (select
-            date,
-            team1,
-            team2
-        from
-        schedules
-        where goals1 is NULL and date >= '{dates[0]}' and date <= '{dates[1]}'
-        order by team1)
-
-        select 
-            team,
-            sum(n) as games
-        from 
-        (
-        select team1 as team, count(*) as n from horizon_set group by team1
-        union all
-        select team2 as team, count(*) as n from horizon_set group by team2
-        )
-        group by team;  
+# the functions decorated with cached() and how often they were served from cache
+QUERIES = {}
+CACHE_STATS = {}
+
+# guards _VERSION and CACHE_STATS, which are shared by the threads of all sessions
+_LOCK = threading.RLock()
+
+
+def read_db_version():
+    """
+    Reads the version token of the published database, or falls back to the
+    modification time of the database file if there is no token.
     """
+    if os.path.exists(PATH_DB_VERSION):
+        with open(PATH_DB_VERSION, "r") as f:
+            return f.read().strip()
+    if os.path.exists(PATH_DB):
+        return str(os.path.getmtime(PATH_DB))
+    return None
 
-    df = CONNECTION.query(q)
 
-    return df
+def check_db_version():
+    """
+    Returns the version of the database, after reconnecting and dropping all
+    cached query results if a new version was published since the last call.
+    """
+    global _VERSION
+    version = read_db_version()
+    with _LOCK:
+        if version != _VERSION:
+            if _VERSION is not None:
+                LOGGER.info(
+                    f"Database version {version} replaces {_VERSION}, query cache "
+                    f"stats so far:\n{cache_stats().to_string()}"
+                )
+            CONNECTION.reset()
+            st.cache_data.clear()
+            _VERSION = version
+    return version
+
+
+def get_connection():
+    """
+    Returns the database connection, reconnecting first if a new version of the
+    database was published since the last call. The old database file stays
+    readable until its connections are closed, so queries never see a swap.
+    """
+    check_db_version()
+    return CONNECTION
+
+
+@st.cache_data(show_spinner=False)
+def _run_cached(version, name, args, kwargs):
+    with _LOCK:
+        CACHE_STATS[name]["misses"] += 1
+    return QUERIES[name](*args, **kwargs)
+
+
+def cached(func):
+    """
+    Caches the results of a query function per database version, such that they
+    are shared by all sessions until a new version of the database is published.
+    """
+    QUERIES[func.__name__] = func
+    CACHE_STATS[func.__name__] = {"calls": 0, "misses": 0}
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        with _LOCK:
+            CACHE_STATS[func.__name__]["calls"] += 1
+        return _run_cached(check_db_version(), func.__name__, args, kwargs)
 
+    return wrapper
 
-@st.cache_data(show_spinner=False, ttl=TTL)
+
+def cache_stats():
+    """Returns the number of cache hits and misses of every cached query."""
+    with _LOCK:
+        stats = {name: dict(counts) for name, counts in CACHE_STATS.items()}
+    df = pd.DataFrame.from_dict(stats, orient="index", columns=["calls", "misses"])
+    df.insert(0, "hits", df["calls"] - df["misses"])
+    return df.drop(columns="calls")
+
+
+@cached
 def query_teams():
     q = """
         select
-            t.area,
-            t.region,
-            t.competition,
-            t.team,
-            t.url as url_team,
-            s.sportshall,
-            s.address,
-            s.phone,
-            s.email,
-            s.url_sportshall,
-            s.latitude,
-            s.longitude,
-            p.players as 'total players',
-            p.players_active as 'active players'
-        from
-        teams t 
-        inner join locations l on t.team = l.team
-        inner join (
-            select distinct sportshall, address, phone, email, url_sportshall,
-                            latitude, longitude
-            from sportshalls
-        ) s on l.sportshall = s.sportshall
-        left join (
-            select team, count(name) as players, sum(wedstrijden > 0) as players_active
-            from stats_players
-            group by team
-        ) p on t.team = p.team
-        order by t.team;
+            area,
+            region,
+            competition,
+            team,
+            url_team,
+            sportshall,
+            address,
+            phone,
+            email,
+            url_sportshall,
+            latitude,
+            longitude,
+            players as 'total players',
+            players_active as 'active players'
+        from team_directory;
     """
 
-    df = CONNECTION.query(q)
+    df = get_connection().query(q)
 
     return df
 
 
-@st.cache_data(show_spinner=False, ttl=TTL)
+@st.cache_resource(show_spinner=False, max_entries=1)
+def _build_spatial_index(version):
+    return SpatialIndex(query_teams())
+
+
+def get_spatial_index():
+    """Returns the SpatialIndex over all sportshalls, built once per db version."""
+    return _build_spatial_index(check_db_version())
+
+
+@st.cache_resource(show_spinner=False, max_entries=1)
+def _build_fixture_calendar(version):
+    return FixtureCalendar(
+        get_connection().query("select team, date, opponent from fixture_calendar;")
+    )
+
+
+def get_fixture_calendar():
+    """Returns the FixtureCalendar of all teams, built once per database version."""
+    return _build_fixture_calendar(check_db_version())
+
+
+@cached
 def query_players():
     q = """
-        select distinct
-            t.area as Area,
-            t.region as Region,
-            t.competition as Competition,
-            c.team as Team,
-            c.name as Name
-        from
-        -- deduplicate because some players appear twice due to errors in source data
-        (select distinct name, team from stats_players) c
-        join teams t on c.team = t.team
-        order by t.area, t.region, t.competition, c.team;
+        select
+            area as Area,
+            region as Region,
+            competition as Competition,
+            team as Team,
+            name as Name
+        from player_facets;
     """
 
-    df = CONNECTION.query(q)
+    df = get_connection().query(q)
 
     return df
 
 
-@st.cache_data(show_spinner=False, ttl=TTL)
+@cached
 def query_stats_agg():
     q = """
-        select distinct
-            c.name as Name,
-            c.team as Team,
-            sum(h.wedstrijden) as Games,
-            sum(h.goals) as Goals,
-            sum(h.assists) as Assists,
-            (sum(h.goals * 1.0) + sum(h.assists)) / sum(h.wedstrijden) as '(G+A)/W'
-        from
-        (select distinct name, team from stats_players) c
-        join stats_players_historical h on c.name = h.name and c.team = h.team
-        group by c.name, c.team;
+        select
+            name as Name,
+            team as Team,
+            games as Games,
+            goals as Goals,
+            assists as Assists,
+            ga_per_game as '(G+A)/W'
+        from player_aggregates;
     """
 
-    df = CONNECTION.query(q)
+    df = get_connection().query(q)
 
     return df
 
 
-@st.cache_data(show_spinner=False, ttl=TTL)
+@cached
+def query_levels(level):
+    return get_connection().query(
+        "select team from levels where level = :level;", {"level": level}
+    )
+
+
+@cached
 def query_list_teams():
-    return CONNECTION.query("select distinct team from teams;")
+    return get_connection().query("select distinct team from teams;")
 
 
-@st.cache_data(show_spinner=False, ttl=TTL)
+@cached
 def query_schedule(team):
-    q = f"""
+    q = """
         select
             date,
             team1 as 'team home', 
             team2 as 'team away'
         from schedules
-        where (goals1 is NULL) and (team1 = '{team}' or team2 = '{team}');
+        where (goals1 is NULL) and (team1 = :team or team2 = :team);
     """
 
-    df = CONNECTION.query(q)
+    df = get_connection().query(q, {"team": team})
 
     return df
 
 
-@st.cache_data(show_spinner=False, ttl=TTL)
+@cached
 def query_stats_players(team):
-    q = f"""
+    q = """
         select
             team,
             name,
@@ -147,17 +224,17 @@ def query_stats_players(team):
             goals,
             assists
         from stats_players
-        where team = '{team}';
+        where team = :team;
     """
 
-    df = CONNECTION.query(q)
+    df = get_connection().query(q, {"team": team})
 
     return df
 
 
-@st.cache_data(show_spinner=False, ttl=TTL)
+@cached
 def query_standings(team):
-    q = f"""
+    q = """
         select
             positie as position,
             team,
@@ -170,11 +247,11 @@ def query_standings(team):
             punten as points
         from standings s
         join (
-            select distinct region, competition from teams where team = '{team}'
+            select distinct region, competition from teams where team = :team
         ) t
         on s.region = t.region and s.competition = t.competition;
     """
 
-    df = CONNECTION.query(q)
+    df = get_connection().query(q, {"team": team})
 
     return df
@@ -0,0 +1,92 @@
+import math
+from collections import defaultdict
+
+import numpy as np
+import pandas as pd
+
+# mean radius of the earth, such that haversine distances stay within 0.5% of the
+# geodesic distances on the WGS-84 ellipsoid that geopy computes (within 0.35% for
+# distances in Belgium)
+EARTH_RADIUS_KM = 6371.0088
+TOLERANCE = 0.005
+
+
+def haversine(lat, lon, lat0, lon0):
+    """Computes km distances between (arrays of) points and a (lat0, lon0) point."""
+    lat, lon = np.radians(lat), np.radians(lon)
+    lat0, lon0 = np.radians(lat0), np.radians(lon0)
+    a = (
+        np.sin((lat - lat0) / 2) ** 2
+        + np.cos(lat) * np.cos(lat0) * np.sin((lon - lon0) / 2) ** 2
+    )
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.clip(a, 0, 1)))
+
+
+class SpatialIndex:
+    def __init__(self, df, cell_km=5.0) -> None:
+        """
+        Indexes the distinct (latitude, longitude) points in a DataFrame, e.g. the
+        sportshalls of all teams, in a grid of cells of about 'cell_km' wide. A
+        radius query only computes the distances to the points in the cells that
+        overlap with the radius, so it stays fast however many points there are.
+        Points without coordinates are left out.
+        """
+        points = df[["latitude", "longitude"]].dropna().drop_duplicates()
+        self.latitudes = points["latitude"].to_numpy(dtype=float)
+        self.longitudes = points["longitude"].to_numpy(dtype=float)
+
+        # cells are equally high everywhere, and as wide at the widest latitude
+        self.cell_lat = math.degrees(cell_km / EARTH_RADIUS_KM)
+        lat_max = min(np.abs(self.latitudes).max(initial=0) + self.cell_lat, 89.0)
+        self.cell_lon = self.cell_lat / math.cos(math.radians(lat_max))
+
+        cells = defaultdict(list)
+        for i, key in enumerate(zip(*self._cells(self.latitudes, self.longitudes))):
+            cells[key].append(i)
+        self.cells = {key: np.array(value) for key, value in cells.items()}
+
+    def __len__(self):
+        return len(self.latitudes)
+
+    def _cells(self, lat, lon):
+        return (
+            np.floor(np.asarray(lat) / self.cell_lat).astype(int),
+            np.floor(np.asarray(lon) / self.cell_lon).astype(int),
+        )
+
+    def query(self, lat, lon, km):
+        """
+        Finds all points within 'km' of (lat, lon) as a DataFrame with their
+        latitude, longitude and distance (in km), sorted from near to far.
+        """
+        # bounding box of the radius, wider in longitude towards the poles
+        dlat = math.degrees(km / EARTH_RADIUS_KM)
+        cos_lat = math.cos(math.radians(min(abs(lat) + dlat, 89.0)))
+        dlon = min(dlat / cos_lat, 180.0)
+
+        (i_min, i_max), (j_min, j_max) = self._cells(
+            [lat - dlat, lat + dlat], [lon - dlon, lon + dlon]
+        )
+        if (i_max - i_min + 1) * (j_max - j_min + 1) <= len(self.cells):
+            keys = [
+                (i, j) for i in range(i_min, i_max + 1) for j in range(j_min, j_max + 1)
+            ]
+        else:  # a large radius, cheaper to go over the occupied cells
+            keys = [
+                (i, j)
+                for i, j in self.cells
+                if i_min <= i <= i_max and j_min <= j <= j_max
+            ]
+        candidates = [self.cells[key] for key in keys if key in self.cells]
+        idx = np.concatenate(candidates) if candidates else np.array([], dtype=int)
+
+        distances = haversine(self.latitudes[idx], self.longitudes[idx], lat, lon)
+        keep = distances <= km
+        df = pd.DataFrame(
+            {
+                "latitude": self.latitudes[idx][keep],
+                "longitude": self.longitudes[idx][keep],
+                "distance": distances[keep],
+            }
+        )
+        return df.sort_values("distance", kind="stable", ignore_index=True)
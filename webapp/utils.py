@@ -1,28 +1,29 @@
 import streamlit as st
-from geopy.distance import distance
+from geocode import GeocodeCache, Geocoder
 from geopy.extra.rate_limiter import RateLimiter
 from geopy.geocoders import Nominatim
-
-
-geolocator = RateLimiter(
-    Nominatim(user_agent="address_finder_futsalfriend_app").geocode,
-    min_delay_seconds=1,
+from spatial import SpatialIndex
+
+# geocoded addresses are cached in a local database shared by all sessions
+PATH_GEOCODES = "database/geocodes.db"
+
+geolocator = Geocoder(
+    RateLimiter(
+        Nominatim(user_agent="address_finder_futsalfriend_app").geocode,
+        min_delay_seconds=1,
+        max_retries=0,
+        swallow_exceptions=False,  # errors are handled (and not cached) by Geocoder
+    ),
+    GeocodeCache(PATH_GEOCODES),
 )
 
 
 def get_coordinates(address, city, country="Belgium"):
-    """Gets coordinates from user input address as (latitude, longitude)."""
-    location = geolocator(f"{address}, {city}, {country}")
-    if location is not None:
-        return location.latitude, location.longitude
-
-
-def compute_distance(lat, lon, address_target: tuple):
-    """Computes km distance between a (latitude, longitude) point and target address."""
-    try:
-        return distance((lat, lon), address_target).km
-    except ValueError:
-        return None
+    """
+    Gets coordinates from user input address as (latitude, longitude), or those
+    of the centre of the town if the address cannot be found (quickly enough).
+    """
+    return geolocator(address, city, country)
 
 
 def make_clickable(url, name):
@@ -30,17 +31,23 @@ def make_clickable(url, name):
     return f"<a href='{url}' rel='noopener noreferrer' target='_blank'>{name}</a>"
 
 
-def filter_teams(df, city, address, km):
-    """Filters teams based on distance from target address."""
+def filter_teams(df, city, address, km, index=None):
+    """
+    Filters teams based on distance from target address. The distances are looked
+    up in a SpatialIndex over the sportshalls of 'df', which is built on the fly
+    if no 'index' is given, and match geopy's within spatial.TOLERANCE.
+    """
     # get coordinates of target address
     address_target = get_coordinates(address, city)
 
-    # filter teams based on distance
-    df["distance"] = df.apply(
-        lambda x: compute_distance(x["latitude"], x["longitude"], address_target),
-        axis=1,
-    )
-    df_out = df[df["distance"] <= km].copy()
+    # filter teams based on distance of their sportshalls
+    if address_target is None:
+        df_out = df.iloc[:0].assign(distance=0.0)
+    else:
+        if index is None:
+            index = SpatialIndex(df)
+        df_near = index.query(*address_target, km)
+        df_out = df.merge(df_near, on=["latitude", "longitude"], how="inner")
 
     # finetune team selection
     df_out = (